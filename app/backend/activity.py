@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import case, or_, update
+
+from app.backend.batching import BatchFlusher
+from app.backend.db import async_session_maker
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_TRACKING_ENABLED = os.getenv('ACTIVITY_TRACKING_ENABLED', '1') == '1'
+# Сколько секунд отметок теряется при падении процесса
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 5))
+# Столько разных пользователей ждут записи - пишем, не дожидаясь интервала
+ACTIVITY_MAX_PENDING = int(os.getenv('ACTIVITY_MAX_PENDING', 50_000))
+# Пользователей в одном UPDATE: по два параметра на каждого в каждом CASE
+ACTIVITY_FLUSH_CHUNK_SIZE = int(os.getenv('ACTIVITY_FLUSH_CHUNK_SIZE', 1000))
+
+
+def _newer(column, values: dict[int, datetime]):
+    # Отметка только двигается вперёд: другой воркер мог уже записать более позднее время
+    new_value = case(values, value=User.id)
+    return case((or_(column.is_(None), column < new_value), new_value), else_=column)
+
+
+def activity_update(logins: dict[int, datetime], seen: dict[int, datetime]):
+    """One UPDATE for a chunk of users; ``seen`` must include every id in ``logins``."""
+    values = {User.last_seen_at: _newer(User.last_seen_at, seen)}
+    if logins:
+        values[User.last_login_at] = _newer(User.last_login_at, logins)
+    return (
+        update(User)
+        .where(User.id.in_(list(seen)))
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class ActivityTracker(BatchFlusher):
+    """Latest login and request time per user, written to ``users`` in batches.
+
+    The request path only stores a timestamp in a dict, so a busy account
+    costs one row update per flush instead of one per request. Whatever has
+    not been flushed is lost if the process dies: at most ``flush_interval``
+    seconds of activity.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int, chunk_size: int, enabled: bool = True):
+        super().__init__(flush_interval, enabled)
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self._logins: dict[int, float] = {}
+        self._seen: dict[int, float] = {}
+        self.flushes = 0
+        self.rows = 0
+        self.write_failures = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._seen) + len(self._logins)
+
+    def login(self, user_id: int):
+        if self.enabled:
+            self._logins[user_id] = time.time()
+            self._check_pending(self._logins)
+
+    def seen(self, user_id: int):
+        if self.enabled:
+            self._seen[user_id] = time.time()
+            self._check_pending(self._seen)
+
+    def _check_pending(self, pending: dict):
+        if len(pending) >= self.max_pending:
+            self.wake()
+
+    def _take(self) -> tuple[dict[int, float], dict[int, float]]:
+        # Подменяем словари целиком: отметки, пришедшие во время записи, попадут в следующую пачку
+        logins, self._logins = self._logins, {}
+        seen, self._seen = self._seen, {}
+        # Вход - тоже активность
+        for user_id, stamp in logins.items():
+            if stamp > seen.get(user_id, 0):
+                seen[user_id] = stamp
+        return logins, seen
+
+    def _restore(self, logins: dict[int, float], seen: dict[int, float]):
+        for pending, failed in ((self._logins, logins), (self._seen, seen)):
+            for user_id, stamp in failed.items():
+                if len(pending) >= self.max_pending:
+                    self.dropped += 1
+                elif stamp > pending.get(user_id, 0):
+                    pending[user_id] = stamp
+
+    async def flush(self):
+        if not self._seen and not self._logins:
+            return
+        logins, seen = self._take()
+        user_ids = list(seen)
+        for start in range(0, len(user_ids), self.chunk_size):
+            chunk = user_ids[start:start + self.chunk_size]
+            chunk_seen = {user_id: _as_datetime(seen[user_id]) for user_id in chunk}
+            chunk_logins = {user_id: _as_datetime(logins[user_id]) for user_id in chunk if user_id in logins}
+            try:
+                async with async_session_maker() as db:
+                    await db.execute(activity_update(chunk_logins, chunk_seen))
+                    await db.commit()
+            except Exception:
+                self.write_failures += 1
+                logger.exception(f'Failed to write activity of {len(user_ids) - start} users')
+                rest = user_ids[start:]
+                self._restore({user_id: logins[user_id] for user_id in rest if user_id in logins},
+                              {user_id: seen[user_id] for user_id in rest})
+                return
+            self.rows += len(chunk)
+        self.flushes += 1
+
+    def stats(self) -> dict:
+        return {
+            'pending': self.pending,
+            'flushes': self.flushes,
+            'rows': self.rows,
+            'write_failures': self.write_failures,
+            'dropped': self.dropped,
+        }
+
+
+def _as_datetime(stamp: float) -> datetime:
+    return datetime.fromtimestamp(stamp, timezone.utc)
+
+
+activity = ActivityTracker(
+    ACTIVITY_FLUSH_INTERVAL,
+    ACTIVITY_MAX_PENDING,
+    ACTIVITY_FLUSH_CHUNK_SIZE,
+    enabled=ACTIVITY_TRACKING_ENABLED,
+)
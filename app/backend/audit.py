@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app.backend.batching import BatchFlusher
+from app.backend.db import async_session_maker
+from app.backend.metrics import AUDIT_EVENTS_DROPPED, AUDIT_RECORDED, AUDIT_WRITTEN
+from app.models.audit import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', '1') == '1'
+# db - пачками в audit_events из этого процесса, celery - пачки уходят воркеру (app.backend.audit_worker)
+AUDIT_SINK = os.getenv('AUDIT_SINK', 'db')
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10_000))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))
+AUDIT_CELERY_BROKER_URL = os.getenv('AUDIT_CELERY_BROKER_URL', 'redis://localhost:6379/1')
+AUDIT_CELERY_TASK = 'audit.record_events'
+
+LOGIN = 'login'
+LOGIN_FAILED = 'login_failed'
+SIGNUP = 'signup'
+REFRESH = 'refresh'
+LOGOUT = 'logout'
+REVOKE_ALL = 'revoke_all'
+ADMIN_GRANTED = 'admin_granted'
+ADMIN_REVOKED = 'admin_revoked'
+USER_DELETED = 'user_deleted'
+BULK_PERMISSION = 'bulk_permission'
+
+
+def insert_events(events: list[dict]):
+    # Один INSERT ... VALUES (...), (...) на пачку, а не executemany построчно
+    return insert(AuditEvent).values(events)
+
+
+class DatabaseSink:
+    async def write(self, events: list[dict]):
+        async with async_session_maker() as db:
+            await db.execute(insert_events(events))
+            await db.commit()
+
+    async def close(self):
+        pass
+
+
+class CelerySink:
+    """Hands batches to a Celery worker, which writes them; needs the ``celery`` package."""
+
+    def __init__(self, broker_url: str = AUDIT_CELERY_BROKER_URL):
+        try:
+            from celery import Celery
+        except ImportError:
+            raise RuntimeError('AUDIT_SINK=celery requires the celery package')
+        self._celery = Celery('auth-audit', broker=broker_url)
+
+    async def write(self, events: list[dict]):
+        payload = [{**event, 'occurred_at': event['occurred_at'].isoformat()} for event in events]
+        # send_task ходит в брокер синхронно
+        await asyncio.to_thread(self._celery.send_task, AUDIT_CELERY_TASK, args=[payload])
+
+    async def close(self):
+        self._celery.close()
+
+
+class AuditLog(BatchFlusher):
+    """Security events buffered in memory and written in batches by a background task.
+
+    ``record`` never waits: a full buffer drops the event and counts it, so a
+    slow sink cannot stall logins. A batch goes out once ``batch_size``
+    events are waiting or ``flush_interval`` seconds have passed.
+    """
+
+    def __init__(self, sink, capacity: int, batch_size: int, flush_interval: float, enabled: bool = True):
+        super().__init__(flush_interval, enabled)
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self._buffer: deque[dict] = deque()
+        self.dropped = {'queue_full': 0, 'write_failed': 0}
+        self.flushes = 0
+        self.write_failures = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, event: str, *, user_id: int | None = None, actor_id: int | None = None,
+               username: str | None = None, ip: str | None = None, **detail):
+        if not self.enabled:
+            return
+        if len(self._buffer) >= self.capacity:
+            self._drop('queue_full', 1)
+            return
+
+        self._buffer.append({
+            'occurred_at': datetime.now(timezone.utc),
+            'event': event,
+            'user_id': user_id,
+            'actor_id': actor_id,
+            'username': username,
+            'ip': ip,
+            'detail': detail or None,
+        })
+        AUDIT_RECORDED.inc()
+        if len(self._buffer) >= self.batch_size:
+            self.wake()
+
+    async def flush(self):
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await self.sink.write(batch)
+            except Exception:
+                self.write_failures += 1
+                logger.exception(f'Failed to write {len(batch)} audit events')
+                # Возвращаем пачку в начало очереди, сколько поместится, и ждём следующего срабатывания
+                room = self.capacity - len(self._buffer)
+                if room < len(batch):
+                    self._drop('write_failed', len(batch) - room)
+                self._buffer.extendleft(reversed(batch[:max(room, 0)]))
+                return
+            self.flushes += 1
+            AUDIT_WRITTEN.inc(len(batch))
+
+    async def close(self):
+        """Stop the background task and write whatever is still buffered."""
+        await super().close()
+        if self._buffer:
+            logger.warning(f'{len(self._buffer)} audit events were not written before shutdown')
+        await self.sink.close()
+
+    def _drop(self, reason: str, count: int):
+        self.dropped[reason] += count
+        AUDIT_EVENTS_DROPPED.labels(reason).inc(count)
+
+    def stats(self) -> dict:
+        return {
+            'pending': self.pending,
+            'capacity': self.capacity,
+            'flushes': self.flushes,
+            'write_failures': self.write_failures,
+            'dropped_queue_full': self.dropped['queue_full'],
+            'dropped_write_failed': self.dropped['write_failed'],
+        }
+
+
+def create_sink(name: str):
+    if name == 'celery':
+        return CelerySink()
+    return DatabaseSink()
+
+
+audit_log = AuditLog(
+    create_sink(AUDIT_SINK) if AUDIT_ENABLED else DatabaseSink(),
+    AUDIT_QUEUE_SIZE,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    enabled=AUDIT_ENABLED,
+)
@@ -0,0 +1,27 @@
+"""Celery worker for ``AUDIT_SINK=celery``: writes audit batches sent by the web workers.
+
+    celery -A app.backend.audit_worker worker
+"""
+from datetime import datetime
+
+from celery import Celery
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from app.backend.audit import AUDIT_CELERY_BROKER_URL, AUDIT_CELERY_TASK, insert_events
+from app.backend.db import DATABASE_URL
+
+# Воркер синхронный - тот же адрес базы, но с синхронным драйвером
+SYNC_DRIVERS = {'asyncpg': 'psycopg2', 'aiosqlite': 'pysqlite'}
+
+celery_app = Celery('auth-audit', broker=AUDIT_CELERY_BROKER_URL)
+url = make_url(DATABASE_URL)
+engine = create_engine(url.set(drivername=f'{url.get_backend_name()}+{SYNC_DRIVERS.get(url.get_driver_name(), url.get_driver_name())}'))
+
+
+@celery_app.task(name=AUDIT_CELERY_TASK)
+def record_events(events: list[dict]):
+    with engine.begin() as conn:
+        conn.execute(insert_events([
+            {**event, 'occurred_at': datetime.fromisoformat(event['occurred_at'])} for event in events
+        ]))
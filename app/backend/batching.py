@@ -0,0 +1,49 @@
+import asyncio
+
+
+class BatchFlusher:
+    """Background task that calls ``flush`` every ``flush_interval`` seconds, or sooner after ``wake``.
+
+    Subclasses buffer work in memory on the request path and write it out in
+    ``flush``; ``close`` stops the task and flushes whatever is left.
+    """
+
+    def __init__(self, flush_interval: float, enabled: bool = True):
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def wake(self):
+        # Буфер заполнился - пишем, не дожидаясь интервала
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        raise NotImplementedError
+
+    async def close(self):
+        """Stop the background task and flush what is still buffered."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
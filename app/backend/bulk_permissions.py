@@ -0,0 +1,130 @@
+import os
+from typing import AsyncIterator
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backend import audit
+from app.backend.audit import audit_log
+from app.backend.token_versions import token_versions
+from app.models.user import User
+from app.schemas import UserFilter
+
+BULK_PERMISSION_CHUNK_SIZE = int(os.getenv('BULK_PERMISSION_CHUNK_SIZE', 1000))
+BULK_PERMISSION_MAX_IDS = int(os.getenv('BULK_PERMISSION_MAX_IDS', 100_000))
+
+CHANGED = 'changed'
+ALREADY = 'already'
+NOT_FOUND = 'not_found'
+FORBIDDEN_ADMIN = 'forbidden_admin'
+
+
+class BulkAction:
+    """A permission change: the precondition for the UPDATE and how to explain a skipped row."""
+
+    def __init__(self, name: str, where: list, values: dict):
+        self.name = name
+        self.where = where
+        self.values = values
+
+    def classify(self, is_active: bool, is_admin: bool) -> str:
+        if self.name == 'delete':
+            return FORBIDDEN_ADMIN if is_admin else ALREADY
+        # Как и в одиночных ручках, деактивированный пользователь считается ненайденным
+        return ALREADY if is_active else NOT_FOUND
+
+
+ACTIONS = {
+    'set-admin-permission': BulkAction('set-admin-permission', [User.is_active, User.is_admin.is_(False)], {'is_admin': True}),
+    'revoke-admin-permission': BulkAction('revoke-admin-permission', [User.is_active, User.is_admin], {'is_admin': False}),
+    'delete': BulkAction('delete', [User.is_active, User.is_admin.is_(False)], {'is_active': False}),
+}
+
+
+def filter_clauses(user_filter: UserFilter) -> list:
+    clauses = []
+    if user_filter.is_active is not None:
+        clauses.append(User.is_active.is_(user_filter.is_active))
+    if user_filter.is_admin is not None:
+        clauses.append(User.is_admin.is_(user_filter.is_admin))
+    if user_filter.is_verified is not None:
+        clauses.append(User.is_verified.is_(user_filter.is_verified))
+    if user_filter.username_prefix:
+        clauses.append(User.username.startswith(user_filter.username_prefix, autoescape=True))
+    if user_filter.email_domain:
+        clauses.append(User.email.endswith(f'@{user_filter.email_domain}', autoescape=True))
+    if user_filter.inactive_since is not None:
+        clauses.append(or_(User.last_seen_at.is_(None), User.last_seen_at < user_filter.inactive_since))
+    return clauses
+
+
+class BulkPermissionUpdater:
+    """Applies one permission change to many users, one chunk per transaction.
+
+    Every chunk is a single ``UPDATE ... WHERE id IN (...) AND <precondition>
+    RETURNING id``; only the ids it skipped are looked up again to tell
+    "already in state" from "not found" and "admin".
+    """
+
+    def __init__(self, db: AsyncSession, action: BulkAction, chunk_size: int = BULK_PERMISSION_CHUNK_SIZE,
+                 actor_id: int | None = None):
+        self.db = db
+        self.action = action
+        self.actor_id = actor_id
+        self.chunk_size = chunk_size
+        self.summary = {CHANGED: 0, ALREADY: 0, NOT_FOUND: 0, FORBIDDEN_ADMIN: 0}
+
+    async def run_ids(self, user_ids: list[int]) -> AsyncIterator[list[dict]]:
+        user_ids = list(dict.fromkeys(user_ids))
+        for start in range(0, len(user_ids), self.chunk_size):
+            yield await self._apply(user_ids[start:start + self.chunk_size])
+
+    async def run_filter(self, user_filter: UserFilter) -> AsyncIterator[list[dict]]:
+        # Keyset по id: следующая пачка не зависит от того, что изменила предыдущая
+        clauses = filter_clauses(user_filter)
+        if not clauses:
+            raise ValueError('Refusing to apply a bulk action to every user')
+        last_id = 0
+        while True:
+            chunk = (await self.db.scalars(
+                select(User.id).where(User.id > last_id, *clauses).order_by(User.id).limit(self.chunk_size)
+            )).all()
+            if not chunk:
+                return
+            last_id = chunk[-1]
+            yield await self._apply(chunk)
+            if len(chunk) < self.chunk_size:
+                return
+
+    async def _apply(self, chunk: list[int]) -> list[dict]:
+        changed = dict((await self.db.execute(
+            update(User)
+            .where(User.id.in_(chunk), *self.action.where)
+            .values(**self.action.values, token_version=User.token_version + 1)
+            .returning(User.id, User.token_version)
+            .execution_options(synchronize_session=False)
+        )).all())
+        skipped = [user_id for user_id in chunk if user_id not in changed]
+        states = {}
+        if skipped:
+            rows = await self.db.execute(select(User.id, User.is_active, User.is_admin).where(User.id.in_(skipped)))
+            states = {user_id: (is_active, is_admin) for user_id, is_active, is_admin in rows}
+        await self.db.commit()
+
+        if changed:
+            token_versions.bumped_many(changed)
+            # Одно событие на пачку: сотни тысяч строчных событий переполнили бы очередь аудита
+            audit_log.record(audit.BULK_PERMISSION, actor_id=self.actor_id, action=self.action.name,
+                             user_ids=list(changed))
+
+        results = []
+        for user_id in chunk:
+            if user_id in changed:
+                outcome = CHANGED
+            elif user_id in states:
+                outcome = self.action.classify(*states[user_id])
+            else:
+                outcome = NOT_FOUND
+            self.summary[outcome] += 1
+            results.append({'user_id': user_id, 'outcome': outcome})
+        return results
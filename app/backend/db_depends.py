@@ -1,8 +1,66 @@
+import os
+import time
+from collections import OrderedDict
 from typing import AsyncGenerator
-from app.backend.db import async_session_maker
+from app.backend.db import async_session_maker, async_read_session_maker
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# Сколько секунд после записи строку может не быть на реплике
+READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', 5))
+READ_YOUR_WRITES_SIZE = int(os.getenv('READ_YOUR_WRITES_SIZE', 10_000))
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the read replica, for handlers that only read."""
+    async with async_read_session_maker() as session:
+        yield session
+
+
+async def scalar_read_your_writes(read_db: AsyncSession, statement):
+    """Look a row up on the replica and, if it isn't there, on the primary.
+
+    A row written moments ago (a fresh signup logging in) may not have
+    reached the replica yet. Every miss costs a primary query, so use it only
+    for keys in ``RecentWrites``.
+    """
+    result = await read_db.scalar(statement)
+    if result is None and read_db.bind is not async_session_maker.kw['bind']:
+        async with async_session_maker() as db:
+            result = await db.scalar(statement)
+    return result
+
+
+class RecentWrites:
+    """Keys this worker wrote in the last ``window`` seconds.
+
+    Only lookups of such keys are worth double-checking on the primary with
+    ``scalar_read_your_writes``; everything else is read from the replica.
+    """
+
+    def __init__(self, window: float, maxsize: int):
+        self.window = window
+        self.maxsize = maxsize
+        self._deadlines: OrderedDict[object, float] = OrderedDict()
+
+    def add(self, key):
+        self._deadlines[key] = time.monotonic() + self.window
+        self._deadlines.move_to_end(key)
+        while len(self._deadlines) > self.maxsize:
+            self._deadlines.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        deadline = self._deadlines.get(key)
+        if deadline is None:
+            return False
+        if deadline <= time.monotonic():
+            del self._deadlines[key]
+            return False
+        return True
+
+    def clear(self):
+        self._deadlines.clear()
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import secrets
+import statistics
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+from passlib.hash import argon2, bcrypt
+
+from app.backend.metrics import PASSWORD_HASH, PASSWORD_VERIFY
+from app.backend.timing import Span
+
+logger = logging.getLogger(__name__)
+
+# process - пул процессов (по умолчанию), thread - пул потоков, inline - прямо в event loop
+PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', PASSWORD_HASH_WORKERS * 4))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))
+# Массовое хеширование (импорт) занимает не больше стольких воркеров - остальные остаются логинам
+PASSWORD_HASH_BACKGROUND_WORKERS = int(os.getenv('PASSWORD_HASH_BACKGROUND_WORKERS',
+                                                 max(PASSWORD_HASH_WORKERS // 2, 1)))
+
+# bcrypt | argon2 (argon2id, нужен пакет argon2-cffi)
+PASSWORD_HASH_SCHEME = os.getenv('PASSWORD_HASH_SCHEME', 'bcrypt')
+PASSWORD_HASH_ROUNDS = int(os.getenv('PASSWORD_HASH_ROUNDS', 12))
+# Хеши с cost в пределах +-tolerance от текущего не перехешируются,
+# иначе воркеры с чуть разной калибровкой перехешировали бы друг за другом
+PASSWORD_HASH_ROUNDS_TOLERANCE = int(os.getenv('PASSWORD_HASH_ROUNDS_TOLERANCE', 1))
+PASSWORD_HASH_CALIBRATE = os.getenv('PASSWORD_HASH_CALIBRATE', '0') == '1'
+PASSWORD_HASH_BUDGET_MS = float(os.getenv('PASSWORD_HASH_BUDGET_MS', 250))
+
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 64 * 1024))  # KiB
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 3))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+MAX_ARGON2_TIME_COST = 10
+
+
+class PasswordHashingOverloaded(Exception):
+    """Raised when every hashing worker is busy and the wait queue is full."""
+
+
+def default_settings() -> dict:
+    return {
+        'scheme': PASSWORD_HASH_SCHEME,
+        'bcrypt_rounds': PASSWORD_HASH_ROUNDS,
+        'argon2_memory_cost': ARGON2_MEMORY_COST,
+        'argon2_time_cost': ARGON2_TIME_COST,
+        'argon2_parallelism': ARGON2_PARALLELISM,
+    }
+
+
+def build_context(settings: dict) -> CryptContext:
+    scheme = settings['scheme']
+    if scheme == 'argon2' and not argon2.has_backend():
+        logger.warning('argon2 requested but argon2-cffi is not installed, falling back to bcrypt')
+        scheme = 'bcrypt'
+
+    rounds = settings['bcrypt_rounds']
+    schemes = ['argon2', 'bcrypt'] if scheme == 'argon2' else ['bcrypt']
+    if scheme == 'bcrypt' and argon2.has_backend():
+        # Уже выданные argon2-хеши должны проверяться и после возврата на bcrypt
+        schemes.append('argon2')
+
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated='auto',
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=max(4, rounds - PASSWORD_HASH_ROUNDS_TOLERANCE),
+        bcrypt__max_rounds=min(31, rounds + PASSWORD_HASH_ROUNDS_TOLERANCE),
+        argon2__type='ID',
+        argon2__memory_cost=settings['argon2_memory_cost'],
+        argon2__time_cost=settings['argon2_time_cost'],
+        argon2__parallelism=settings['argon2_parallelism'],
+    )
+
+
+settings = default_settings()
+crypt_context = build_context(settings)
+
+
+def _init_worker(worker_settings: dict):
+    global settings, crypt_context
+    settings = worker_settings
+    crypt_context = build_context(worker_settings)
+
+
+def _hash(password: str) -> str:
+    return crypt_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return crypt_context.verify(password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # Разбирает только заголовок хеша, дешево вызывать в event loop
+    return crypt_context.needs_update(hashed_password)
+
+
+def _measure_ms(handler, samples: int = 3) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash('calibration-password')
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(budget_ms: float, base: dict | None = None) -> tuple[dict, float]:
+    """Pick the highest cost whose hash time fits into ``budget_ms`` on this host.
+
+    Returns the new settings together with the measured hash time in ms.
+    """
+    calibrated = dict(base or settings)
+
+    if calibrated['scheme'] == 'argon2' and argon2.has_backend():
+        chosen, chosen_ms = 1, None
+        for time_cost in range(1, MAX_ARGON2_TIME_COST + 1):
+            elapsed = _measure_ms(argon2.using(
+                type='ID',
+                memory_cost=calibrated['argon2_memory_cost'],
+                time_cost=time_cost,
+                parallelism=calibrated['argon2_parallelism'],
+            ))
+            if chosen_ms is not None and elapsed > budget_ms:
+                break
+            chosen, chosen_ms = time_cost, elapsed
+        calibrated['argon2_time_cost'] = chosen
+        return calibrated, chosen_ms
+
+    # Каждый раунд bcrypt удваивает время, поэтому достаточно одного замера и проверки
+    probe_rounds = MIN_BCRYPT_ROUNDS
+    probe_ms = _measure_ms(bcrypt.using(rounds=probe_rounds))
+    rounds = probe_rounds + math.floor(math.log2(max(budget_ms, 1) / max(probe_ms, 0.001)))
+    rounds = max(MIN_BCRYPT_ROUNDS, min(MAX_BCRYPT_ROUNDS, rounds))
+
+    elapsed = _measure_ms(bcrypt.using(rounds=rounds))
+    while rounds > MIN_BCRYPT_ROUNDS and elapsed > budget_ms:
+        rounds -= 1
+        elapsed = _measure_ms(bcrypt.using(rounds=rounds))
+
+    calibrated['bcrypt_rounds'] = rounds
+    return calibrated, elapsed
+
+
+class PasswordHasher:
+    """Runs password hashing off the event loop with a bounded number of queued jobs.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more wait
+    for a free worker; anything beyond that fails fast with
+    ``PasswordHashingOverloaded`` instead of piling up latency. Background
+    jobs (``run_background``) hold at most ``background_workers`` of them.
+    """
+
+    def __init__(self, executor: str, workers: int, queue_size: int, background_workers: int | None = None):
+        self.executor = executor
+        self.workers = max(workers, 1)
+        self.queue_size = max(queue_size, 0)
+        self.background_workers = max(min(background_workers or self.workers, self.workers), 1)
+        self.pending = 0
+        self._pool: Executor | None = None
+        self._background_slots: asyncio.Semaphore | None = None
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def start(self):
+        if self._pool is not None or self.executor == 'inline':
+            return
+        if self.executor == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        else:
+            # spawn: форкать процесс с работающим event loop и открытыми соединениями небезопасно
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(settings,),
+            )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args):
+        if self.executor == 'inline':
+            return fn(*args)
+
+        if self.pending >= self.capacity:
+            raise PasswordHashingOverloaded()
+
+        self.start()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        except BrokenProcessPool:
+            # Воркер упал (OOM, kill) - пересоздаём пул для следующих запросов
+            self.shutdown()
+            raise
+        finally:
+            self.pending -= 1
+
+    async def run_background(self, fn, *args):
+        """``run`` for work nobody is waiting on: a full queue means wait and retry, not fail."""
+        if self._background_slots is None:
+            self._background_slots = asyncio.Semaphore(self.background_workers)
+        async with self._background_slots:
+            while True:
+                try:
+                    return await self.run(fn, *args)
+                except PasswordHashingOverloaded:
+                    await asyncio.sleep(PASSWORD_HASH_RETRY_AFTER)
+
+
+hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE,
+                        PASSWORD_HASH_BACKGROUND_WORKERS)
+
+# Хеш случайного пароля с текущими параметрами - для проверки несуществующих пользователей
+_dummy_hash: str | None = None
+
+
+def configure(new_settings: dict):
+    """Switch hashing parameters; worker processes are restarted to pick them up."""
+    global settings, crypt_context, _dummy_hash
+    settings = new_settings
+    _dummy_hash = None
+    crypt_context = build_context(new_settings)
+    hasher.shutdown()
+
+
+async def calibrate_on_startup():
+    if not PASSWORD_HASH_CALIBRATE:
+        return
+    calibrated, elapsed = await asyncio.to_thread(calibrate, PASSWORD_HASH_BUDGET_MS)
+    logger.info(f'Password hashing calibrated: {calibrated} ({elapsed:.1f} ms per hash)')
+    configure(calibrated)
+
+
+async def hash_password(password: str) -> str:
+    with PASSWORD_HASH.time(), Span('hash'):
+        return await hasher.run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    with PASSWORD_VERIFY.time(), Span('hash'):
+        return await hasher.run(_verify, password, hashed_password)
+
+
+async def _ensure_dummy_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+
+async def verify_dummy_password(password: str) -> bool:
+    """Spend the same time as a real verify, so unknown usernames can't be told apart by latency."""
+    await verify_password(password, await _ensure_dummy_hash())
+    return False
+
+
+async def warm_up():
+    """Hash once at startup: starts the worker processes and prepares the hash for unknown usernames."""
+    await _ensure_dummy_hash()
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash a batch for a background job, one password per pool job.
+
+    Each finished hash frees its worker, so a login queued meanwhile gets
+    in before the next password of the batch; the batch never holds more
+    than ``background_workers`` workers.
+    """
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(hasher.run_background(_hash, password)) for password in passwords]
+    return [task.result() for task in tasks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password hashing utilities')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    calibrate_parser = subcommands.add_parser('calibrate', help='measure hash time and suggest a cost factor')
+    calibrate_parser.add_argument('--budget-ms', type=float, default=PASSWORD_HASH_BUDGET_MS)
+    calibrate_parser.add_argument('--scheme', choices=['bcrypt', 'argon2'], default=PASSWORD_HASH_SCHEME)
+    args = parser.parse_args()
+
+    calibrated, elapsed = calibrate(args.budget_ms, dict(settings, scheme=args.scheme))
+    print(f'{elapsed:.1f} ms per hash within a {args.budget_ms:.0f} ms budget')
+    if calibrated['scheme'] == 'argon2' and argon2.has_backend():
+        print('PASSWORD_HASH_SCHEME=argon2')
+        print(f'ARGON2_TIME_COST={calibrated["argon2_time_cost"]}')
+    else:
+        print('PASSWORD_HASH_SCHEME=bcrypt')
+        print(f'PASSWORD_HASH_ROUNDS={calibrated["bcrypt_rounds"]}')
+
+
+if __name__ == '__main__':
+    main()
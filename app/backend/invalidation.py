@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+from app.backend.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# postgres - LISTEN/NOTIFY, воркеры на разных машинах; socket - unix-сокеты в одном каталоге,
+# воркеры одной машины; none - один процесс; auto - postgres для Postgres, иначе socket
+INVALIDATION_TRANSPORT = os.getenv('INVALIDATION_TRANSPORT', 'auto')
+# LISTEN не работает через pgbouncer в transaction mode - тогда здесь адрес самой базы
+INVALIDATION_DATABASE_URL = os.getenv('INVALIDATION_DATABASE_URL', DATABASE_URL)
+INVALIDATION_CHANNEL = os.getenv('INVALIDATION_CHANNEL', 'auth_invalidation')
+# Общий каталог для воркеров одной базы
+INVALIDATION_SOCKET_DIR = os.getenv(
+    'INVALIDATION_SOCKET_DIR',
+    os.path.join(tempfile.gettempdir(), f'auth-invalidation-{hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:12]}'),
+)
+# Как часто проверять соединение LISTEN; обрыв = возможно пропущенные события = resync
+INVALIDATION_PING_INTERVAL = float(os.getenv('INVALIDATION_PING_INTERVAL', 10))
+INVALIDATION_RECONNECT_DELAY = float(os.getenv('INVALIDATION_RECONNECT_DELAY', 1))
+INVALIDATION_CLOSE_TIMEOUT = float(os.getenv('INVALIDATION_CLOSE_TIMEOUT', 5))
+
+JTI_REVOKED = 'jti_revoked'
+USER_CHANGED = 'user_changed'
+KEY_ROTATED = 'key_rotated'
+
+
+class PostgresTransport:
+    """NOTIFY to publish, LISTEN on a dedicated asyncpg connection to receive."""
+
+    name = 'postgres'
+
+    def __init__(self, url: str, channel: str):
+        # asyncpg понимает обычный postgresql:// без имени драйвера
+        self.dsn = make_url(url).set(drivername='postgresql').render_as_string(hide_password=False)
+        self.channel = channel
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.connected = False
+
+    async def start(self, on_message: Callable[[str], None], on_reconnect: Callable[[], None]):
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+        await self._connect()
+        self._task = asyncio.create_task(self._watch())
+
+    async def _connect(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.channel, lambda conn, pid, channel, payload: self._on_message(payload))
+        self.connected = True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(INVALIDATION_PING_INTERVAL)
+            try:
+                async with self._lock:
+                    await self._conn.execute('SELECT 1')
+                continue
+            except Exception:
+                logger.warning('Invalidation listener connection lost, reconnecting')
+                self.connected = False
+            while not self.connected:
+                try:
+                    async with self._lock:
+                        await self._close_connection()
+                        await self._connect()
+                except Exception:
+                    logger.exception('Failed to reconnect invalidation listener')
+                    await asyncio.sleep(INVALIDATION_RECONNECT_DELAY)
+            # Пока соединения не было, уведомления уходили мимо
+            self._on_reconnect()
+
+    async def send(self, payload: str):
+        async with self._lock:
+            if self._conn is None:
+                # Разовая публикация из CLI, без LISTEN
+                import asyncpg
+                self._conn = await asyncpg.connect(self.dsn)
+            await self._conn.execute('SELECT pg_notify($1, $2)', self.channel, payload)
+
+    async def _close_connection(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                await conn.close(timeout=1)
+            except Exception:
+                conn.terminate()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close_connection()
+        self.connected = False
+
+
+class SocketTransport:
+    """Local stand-in: every process binds a datagram socket in a shared directory.
+
+    Publishing sends the message to every other socket found there, so it
+    reaches the workers of one host without a broker.
+    """
+
+    name = 'socket'
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.path: Path | None = None
+        self._sock: socket.socket | None = None
+        self.connected = False
+        self.undelivered = 0
+
+    async def start(self, on_message: Callable[[str], None], on_reconnect: Callable[[], None]):
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path = self.directory / f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock'
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(str(self.path))
+        self._sock.setblocking(False)
+        self._on_message = on_message
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._read)
+        self.connected = True
+
+    def _read(self):
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._on_message(data.decode())
+
+    async def send(self, payload: str):
+        data = payload.encode()
+        sender = self._sock or socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            for peer in self.directory.glob('*.sock'):
+                if peer == self.path:
+                    continue
+                try:
+                    sender.sendto(data, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Сокет остался от упавшего процесса
+                    peer.unlink(missing_ok=True)
+                except BlockingIOError:
+                    # Очередь получателя переполнена: он увидит разрыв в номерах и сделает resync
+                    self.undelivered += 1
+        finally:
+            if sender is not self._sock:
+                sender.close()
+
+    async def close(self):
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+            self.path.unlink(missing_ok=True)
+        self.connected = False
+
+
+class InvalidationBus:
+    """Broadcasts changes to auth state so every worker can drop what it cached.
+
+    Each process publishes with its own origin id and a sequence number that
+    grows by one per event. A receiver that sees a gap, or whose transport
+    reconnected, cannot know what it missed and runs the resync handlers
+    instead: they reload or clear the affected caches. Handlers may be plain
+    functions or coroutines; they run one at a time in arrival order.
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport
+        self.origin = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.started_at = time.time()
+        self._seq = 0
+        self._handlers: dict[str, list[Callable]] = {}
+        self._resync_handlers: list[Callable] = []
+        self._last_seq: dict[str, int] = {}
+        self._outbox: asyncio.Queue | None = None
+        self._inbox: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._resync_pending = False
+        self.subscribed_at: float | None = None
+        self.published = 0
+        self.publish_failures = 0
+        self.received = 0
+        self.gaps = 0
+        self.resyncs = 0
+        self.handler_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def subscribe(self, event_type: str, handler: Callable[[dict], object]):
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def on_resync(self, handler: Callable[[], object]):
+        self._resync_handlers.append(handler)
+
+    def _message(self, event_type: str, data: dict) -> str:
+        self._seq += 1
+        return json.dumps({
+            'origin': self.origin, 'started': self.started_at, 'seq': self._seq, 'type': event_type, **data,
+        })
+
+    def publish(self, event_type: str, **data):
+        """Queue an event for the other workers; this worker has already applied it."""
+        if not self.running:
+            return
+        self._outbox.put_nowait(self._message(event_type, data))
+
+    async def publish_once(self, event_type: str, **data):
+        """Send one event without subscribing, e.g. from a management command."""
+        if self.transport is None:
+            return
+        try:
+            await self.transport.send(self._message(event_type, data))
+        finally:
+            await self.transport.close()
+
+    async def start(self):
+        if self.transport is None or self.running:
+            return
+        self._outbox = asyncio.Queue()
+        self._inbox = asyncio.Queue()
+        self.subscribed_at = time.time()
+        await self.transport.start(self._received, self._request_resync)
+        self._tasks = [asyncio.create_task(self._send_loop()), asyncio.create_task(self._dispatch_loop())]
+        logger.info(f'Invalidation bus started over {self.transport.name}')
+
+    async def close(self):
+        if not self.running:
+            return
+        # Отправляем то, что уже опубликовано, - остальные воркеры продолжают работать
+        try:
+            await asyncio.wait_for(self._outbox.join(), INVALIDATION_CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f'{self._outbox.qsize()} invalidation events were not published before shutdown')
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.transport.close()
+
+    async def _send_loop(self):
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self.transport.send(message)
+                self.published += 1
+            except Exception:
+                # Номер уже занят: получатели увидят разрыв и сделают resync
+                self.publish_failures += 1
+                logger.exception('Failed to publish invalidation event')
+            finally:
+                self._outbox.task_done()
+
+    def _received(self, payload: str):
+        try:
+            event = json.loads(payload)
+            origin, seq = event['origin'], event['seq']
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed invalidation message')
+            return
+        if origin == self.origin:
+            return
+        self.received += 1
+
+        last = self._last_seq.get(origin)
+        if last is None:
+            # Незнакомый отправитель: если он запустился после нас, мы должны были видеть всё с первого номера
+            gap = event.get('started', 0) >= self.subscribed_at and seq != 1
+        elif seq <= last:
+            return
+        else:
+            gap = seq != last + 1
+        self._last_seq[origin] = seq
+
+        self._inbox.put_nowait(event)
+        if gap:
+            self.gaps += 1
+            logger.warning(f'Missed invalidation events from {origin}, resyncing')
+            self._request_resync()
+
+    def _request_resync(self):
+        if not self._resync_pending and self._inbox is not None:
+            self._resync_pending = True
+            self._inbox.put_nowait(None)
+
+    async def _dispatch_loop(self):
+        while True:
+            event = await self._inbox.get()
+            if event is None:
+                self._resync_pending = False
+                self.resyncs += 1
+                for handler in self._resync_handlers:
+                    await self._call(handler)
+            else:
+                for handler in self._handlers.get(event['type'], ()):
+                    await self._call(handler, event)
+
+    async def _call(self, handler: Callable, *args):
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            self.handler_errors += 1
+            logger.exception('Invalidation handler failed')
+
+    def stats(self) -> dict:
+        return {
+            'connected': bool(self.transport and self.transport.connected),
+            'published': self.published,
+            'publish_failures': self.publish_failures,
+            'received': self.received,
+            'gaps': self.gaps,
+            'resyncs': self.resyncs,
+            'handler_errors': self.handler_errors,
+            'known_origins': len(self._last_seq),
+        }
+
+
+def create_transport(name: str = INVALIDATION_TRANSPORT):
+    if name == 'auto':
+        name = 'postgres' if make_url(INVALIDATION_DATABASE_URL).get_backend_name() == 'postgresql' else 'socket'
+    if name == 'postgres':
+        return PostgresTransport(INVALIDATION_DATABASE_URL, INVALIDATION_CHANNEL)
+    if name == 'socket':
+        return SocketTransport(INVALIDATION_SOCKET_DIR)
+    return None
+
+
+invalidation_bus = InvalidationBus(create_transport())
@@ -0,0 +1,265 @@
+import argparse
+import asyncio
+import fcntl
+import logging
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from app.backend.invalidation import invalidation_bus, KEY_ROTATED
+from app.backend.metrics import JWT_DECODE, JWT_ENCODE
+from app.backend.timing import Span
+
+logger = logging.getLogger(__name__)
+
+# EdDSA | RS256 - асимметричная подпись с публикацией ключей в JWKS, HS256 - общий секрет
+JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'EdDSA')
+JWT_KEYS_DIR = os.getenv('JWT_KEYS_DIR', 'keys')
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', '30ee8e1faadb9974647186858ad7eedab17d859ae2180c6c3da1a4781bb13c62')
+# Принимать старые HS256-токены без kid, пока они не истекут после перехода на EdDSA/RS256
+JWT_ACCEPT_LEGACY_HS256 = os.getenv('JWT_ACCEPT_LEGACY_HS256', '0') == '1'
+# Сколько клиенты могут кешировать JWKS
+JWKS_MAX_AGE = int(os.getenv('JWKS_MAX_AGE', 300))
+# Новый ключ сначала только публикуется в JWKS и начинает подписывать токены
+# не раньше, чем клиенты гарантированно перечитают JWKS
+JWT_KEY_ACTIVATION_DELAY = int(os.getenv('JWT_KEY_ACTIVATION_DELAY', JWKS_MAX_AGE))
+JWT_KEYS_RELOAD_INTERVAL = int(os.getenv('JWT_KEYS_RELOAD_INTERVAL', 60))
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: object
+    public_key: object
+    created_at: float
+
+
+def _algorithm_for(private_key) -> str:
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return 'EdDSA'
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return 'RS256'
+    raise ValueError(f'Unsupported key type: {type(private_key).__name__}')
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    raise ValueError(f'Cannot generate keys for {algorithm}')
+
+
+class KeyRing:
+    """Signing keys loaded from ``<keys_dir>/<kid>.pem``.
+
+    kids start with a UTC timestamp, so sorting by name gives creation order.
+    The newest key older than ``activation_delay`` signs new tokens; every
+    other key in the directory keeps verifying until it is pruned.
+    """
+
+    def __init__(self, keys_dir: str, algorithm: str, activation_delay: int):
+        self.keys_dir = Path(keys_dir)
+        self.algorithm = algorithm
+        self.activation_delay = activation_delay
+        self._keys: dict[str, SigningKey] = {}
+        self._active: SigningKey | None = None
+        self._jwks: dict = {'keys': []}
+        self._loaded = False
+
+    @property
+    def symmetric(self) -> bool:
+        return self.algorithm == 'HS256'
+
+    def load(self):
+        if self.symmetric:
+            self._loaded = True
+            return
+
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        # Несколько воркеров стартуют одновременно - ключ должен сгенерировать только один
+        with open(self.keys_dir / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            keys = self._read_keys()
+            if not any(key.algorithm == self.algorithm for key in keys.values()):
+                key = self._write_new_key()
+                keys[key.kid] = key
+                logger.info(f'Generated initial {self.algorithm} signing key {key.kid}')
+
+        self._keys = keys
+        self._active = self._pick_active()
+        self._jwks = {'keys': [self._to_jwk(key) for key in keys.values()]}
+        self._loaded = True
+
+    def reload(self):
+        active = self.active_kid
+        self.load()
+        if self.active_kid != active:
+            logger.info(f'Signing key switched to {self.active_kid}')
+
+    def rotate(self) -> str:
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.keys_dir / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            key = self._write_new_key()
+        self.load()
+        return key.kid
+
+    def prune(self, max_age: float) -> list[str]:
+        """Delete keys that stopped signing more than ``max_age`` seconds ago."""
+        self._ensure_loaded()
+        ordered = sorted(self._keys.values(), key=lambda key: key.kid)
+        removed = []
+        for key, successor in zip(ordered, ordered[1:]):
+            if key is self._active:
+                break
+            retired_at = successor.created_at + self.activation_delay
+            if time.time() - retired_at > max_age:
+                (self.keys_dir / f'{key.kid}.pem').unlink(missing_ok=True)
+                removed.append(key.kid)
+        if removed:
+            self.load()
+        return removed
+
+    def encode(self, payload: dict) -> str:
+        self._ensure_loaded()
+        if self.symmetric:
+            return jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
+        key = self._active
+        return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={'kid': key.kid})
+
+    def decode(self, token: str) -> dict:
+        self._ensure_loaded()
+        if self.symmetric:
+            return jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None and JWT_ACCEPT_LEGACY_HS256:
+            return jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f'Unknown signing key {kid!r}')
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        self._ensure_loaded()
+        return self._jwks
+
+    def keys(self) -> list[SigningKey]:
+        self._ensure_loaded()
+        return sorted(self._keys.values(), key=lambda key: key.kid)
+
+    @property
+    def active_kid(self) -> str | None:
+        return self._active.kid if self._active else None
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _read_keys(self) -> dict[str, SigningKey]:
+        keys = {}
+        for path in sorted(self.keys_dir.glob('*.pem')):
+            private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+            keys[path.stem] = SigningKey(
+                kid=path.stem,
+                algorithm=_algorithm_for(private_key),
+                private_key=private_key,
+                public_key=private_key.public_key(),
+                created_at=path.stat().st_mtime,
+            )
+        return keys
+
+    def _write_new_key(self) -> SigningKey:
+        private_key = _generate_private_key(self.algorithm)
+        kid = f'{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}-{secrets.token_hex(4)}'
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        path = self.keys_dir / f'{kid}.pem'
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(pem)
+        return SigningKey(kid, self.algorithm, private_key, private_key.public_key(), path.stat().st_mtime)
+
+    def _pick_active(self) -> SigningKey:
+        candidates = sorted(
+            (key for key in self._keys.values() if key.algorithm == self.algorithm),
+            key=lambda key: key.kid,
+        )
+        now = time.time()
+        ready = [key for key in candidates if now - key.created_at >= self.activation_delay]
+        # Самый первый ключ активируется сразу, иначе подписывать было бы нечем
+        return ready[-1] if ready else candidates[0]
+
+    @staticmethod
+    def _to_jwk(key: SigningKey) -> dict:
+        if key.algorithm == 'EdDSA':
+            jwk = OKPAlgorithm.to_jwk(key.public_key, as_dict=True)
+        else:
+            jwk = RSAAlgorithm.to_jwk(key.public_key, as_dict=True)
+        return {**jwk, 'kid': key.kid, 'alg': key.algorithm, 'use': 'sig'}
+
+
+keyring = KeyRing(JWT_KEYS_DIR, JWT_ALGORITHM, JWT_KEY_ACTIVATION_DELAY)
+
+
+def encode_token(payload: dict) -> str:
+    with JWT_ENCODE.time(), Span('jwt'):
+        return keyring.encode(payload)
+
+
+def decode_token(token: str) -> dict:
+    with JWT_DECODE.time(), Span('jwt'):
+        return keyring.decode(token)
+
+
+async def reload_keys_periodically():
+    # Подхватывает ключи, добавленные `rotate` из другого процесса, до их активации
+    while True:
+        await asyncio.sleep(JWT_KEYS_RELOAD_INTERVAL)
+        try:
+            await asyncio.to_thread(keyring.reload)
+        except Exception:
+            logger.exception('Failed to reload signing keys')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage JWT signing keys')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('list', help='show keys and which one is signing')
+    subcommands.add_parser('rotate', help='add a new key; it starts signing after the activation delay')
+    prune_parser = subcommands.add_parser('prune', help='delete keys whose tokens have all expired')
+    prune_parser.add_argument('--max-age', type=float, required=True, help='seconds, e.g. the refresh token lifetime')
+    args = parser.parse_args()
+
+    if args.command == 'rotate':
+        kid = keyring.rotate()
+        print(f'Added key {kid}')
+        # Воркеры перечитают каталог сразу, а не через JWT_KEYS_RELOAD_INTERVAL
+        asyncio.run(invalidation_bus.publish_once(KEY_ROTATED, added=[kid]))
+    elif args.command == 'prune':
+        removed = keyring.prune(args.max_age)
+        for kid in removed:
+            print(f'Removed key {kid}')
+        if removed:
+            asyncio.run(invalidation_bus.publish_once(KEY_ROTATED, removed=removed))
+    else:
+        for key in keyring.keys():
+            marker = '*' if key.kid == keyring.active_kid else ' '
+            print(f'{marker} {key.kid} {key.algorithm}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from app.backend.profiler import profiler
+from app.backend.timing import RequestTiming, current_timing, record, SERVER_TIMING_ENABLED
+
+# Модуль импортируется и в процессах пула хеширования, поэтому здесь
+# только определения метрик - без импорта движка БД и роутеров.
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+REQUEST_LATENCY = Histogram(
+    'auth_http_request_duration_seconds', 'HTTP request latency by route',
+    ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('auth_http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status'])
+
+PASSWORD_HASH_SECONDS = Histogram(
+    'auth_password_hash_duration_seconds', 'Password hash/verify time including queueing for a worker',
+    ['operation'], buckets=LATENCY_BUCKETS,
+)
+JWT_SECONDS = Histogram('auth_jwt_duration_seconds', 'JWT encode/decode time', ['operation'], buckets=FAST_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    'auth_db_query_duration_seconds', 'Database round trip time by statement type',
+    ['statement'], buckets=LATENCY_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'auth_db_pool_wait_seconds', 'Time spent waiting for a pooled connection', buckets=FAST_BUCKETS,
+)
+LOGINS = Counter('auth_logins_total', 'Login attempts by result and failure reason', ['result', 'reason'])
+AUDIT_EVENTS = Counter('auth_audit_events_total', 'Audit events accepted into the queue and written by the sink',
+                       ['stage'])
+AUDIT_EVENTS_DROPPED = Counter('auth_audit_events_dropped_total', 'Audit events lost, by reason', ['reason'])
+
+# Заранее созданные дочерние метрики: на горячем пути не ищем их по меткам
+PASSWORD_HASH = PASSWORD_HASH_SECONDS.labels('hash')
+PASSWORD_VERIFY = PASSWORD_HASH_SECONDS.labels('verify')
+JWT_ENCODE = JWT_SECONDS.labels('encode')
+JWT_DECODE = JWT_SECONDS.labels('decode')
+LOGIN_SUCCESS = LOGINS.labels('success', '')
+AUDIT_RECORDED = AUDIT_EVENTS.labels('recorded')
+AUDIT_WRITTEN = AUDIT_EVENTS.labels('written')
+
+
+def login_failed(reason: str):
+    LOGINS.labels('failure', reason).inc()
+
+
+class StatsCollector:
+    """Exposes ``stats()`` dicts of in-process components as gauges at scrape time."""
+
+    def __init__(self):
+        self._sources: dict[str, callable] = {}
+
+    def add(self, name: str, stats):
+        self._sources[name] = stats
+
+    def collect(self):
+        for name, stats in self._sources.items():
+            for key, value in stats().items():
+                if value is None or isinstance(value, str):
+                    continue
+                yield GaugeMetricFamily(f'auth_{name}_{key}', f'{name} {key.replace("_", " ")}', value=float(value))
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].lower() if statement else 'other'
+        if verb not in ('select', 'insert', 'update', 'delete'):
+            verb = 'other'
+        elapsed = time.perf_counter() - context._query_started
+        DB_QUERY_SECONDS.labels(verb).observe(elapsed)
+        record('db', elapsed)
+
+    wait_observers = getattr(engine.pool, 'wait_observers', None)
+    if wait_observers is not None:
+        wait_observers.append(DB_POOL_WAIT_SECONDS.observe)
+
+
+class MetricsMiddleware:
+    """Per-route latency and status counters, labelled by the route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            REQUEST_LATENCY.labels(scope['method'], path).observe(time.perf_counter() - started)
+            REQUESTS.labels(scope['method'], path, str(status_code)).inc()
+
+
+class TimingMiddleware:
+    """Times the stages of a request; adds ``Server-Timing`` and feeds the profiler.
+
+    Does nothing per request unless ``SERVER_TIMING_ENABLED`` is set or the
+    profiler is armed.
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not (self.server_timing or profiler.armed):
+            return await self.app(scope, receive, send)
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        # Кадр этой корутины - корень стеков, которые снимает профилировщик
+        capture = profiler.begin(scope, sys._getframe())
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if self.server_timing:
+                    message['headers'] = [*message.get('headers', ()), (b'server-timing', timing.header().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timing.reset(token)
+            if capture is not None:
+                profiler.end(capture, status_code, timing.elapsed(), timing.breakdown())
+
+
+def metrics_registry():
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Несколько воркеров uvicorn: складываем значения из общих mmap-файлов
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+        return registry
+    return REGISTRY
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from app.backend.db import async_read_session_maker, async_session_maker
+from app.models.user import User
+
+PRINCIPAL_CACHE_ENABLED = os.getenv('PRINCIPAL_CACHE_ENABLED', '1') == '1'
+# Страховка на случай пропущенной инвалидации; обычно запись сбрасывает изменивший пользователя код
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 100_000))
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+    is_verified: bool
+    # Меняется вместе с паролем, правами и деактивацией - с ним сверяется ``ver`` токена
+    token_version: int
+
+
+PRINCIPAL_COLUMNS = [User.id, User.username, User.is_active, User.is_admin, User.is_verified, User.token_version]
+
+
+class PrincipalCache:
+    """Read-through cache of the user fields the token paths need, keyed by id.
+
+    Entries live for ``ttl`` seconds and are dropped as soon as this or
+    another worker changes the user (``invalidate``, wired to token version
+    bumps). The bumped version is remembered for ``ttl`` as well: a lagging
+    replica row older than it is re-read from the primary and never cached.
+    Concurrent misses for the same user share one query; missing users are
+    not cached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, enabled: bool = True):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = enabled and maxsize > 0
+        self._entries: OrderedDict[int, tuple[UserPrincipal, float]] = OrderedDict()
+        self._inflight: dict[int, asyncio.Future] = {}
+        # Версия после последнего известного bump: строки старше - с отстающей реплики
+        self._min_versions: OrderedDict[int, tuple[int, float]] = OrderedDict()
+        # Растёт при каждой инвалидации: строки, прочитанные до неё, в кеш не кладём
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cached(self, user_id: int) -> UserPrincipal | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    async def get(self, user_id: int) -> UserPrincipal | None:
+        principal = self._cached(user_id)
+        if principal is not None:
+            return principal
+
+        self.misses += 1
+        future = self._inflight.get(user_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            principal = (await self._load([user_id])).get(user_id)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            future.set_result(principal)
+        finally:
+            del self._inflight[user_id]
+        return principal
+
+    async def get_many(self, user_ids: set[int]) -> dict[int, UserPrincipal]:
+        """Cached principals plus one query for all the misses."""
+        found = {}
+        missing = []
+        for user_id in user_ids:
+            principal = self._cached(user_id)
+            if principal is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = principal
+        if missing:
+            self.misses += len(missing)
+            found.update(await self._load(missing))
+        return found
+
+    async def _load(self, user_ids: list[int]) -> dict[int, UserPrincipal]:
+        query = select(*PRINCIPAL_COLUMNS).where(User.id.in_(user_ids))
+        generation = self._generation
+        async with async_read_session_maker() as db:
+            rows = (await db.execute(query)).all()
+        if len(rows) < len(user_ids) and async_read_session_maker.kw['bind'] is not async_session_maker.kw['bind']:
+            # Только что созданного пользователя может ещё не быть на реплике
+            async with async_session_maker() as db:
+                rows = (await db.execute(query)).all()
+
+        principals = {row.id: UserPrincipal(*row) for row in rows}
+        stale = [principal.id for principal in principals.values() if self._is_stale(principal)]
+        if stale and async_read_session_maker.kw['bind'] is not async_session_maker.kw['bind']:
+            async with async_session_maker() as db:
+                rows = (await db.execute(select(*PRINCIPAL_COLUMNS).where(User.id.in_(stale)))).all()
+            principals.update((row.id, UserPrincipal(*row)) for row in rows)
+
+        if generation == self._generation:
+            for principal in principals.values():
+                if not self._is_stale(principal):
+                    self.put(principal)
+        return principals
+
+    def _is_stale(self, principal: UserPrincipal) -> bool:
+        entry = self._min_versions.get(principal.id)
+        if entry is None:
+            return False
+        if entry[1] <= time.monotonic():
+            del self._min_versions[principal.id]
+            return False
+        return principal.token_version < entry[0]
+
+    def put(self, principal: UserPrincipal):
+        if not self.enabled:
+            return
+        self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, version: int | None = None):
+        """Drop the user; with ``version``, also refuse rows older than it for ``ttl`` seconds."""
+        self._generation += 1
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+        if version is not None:
+            self._min_versions[user_id] = (version, time.monotonic() + self.ttl)
+            self._min_versions.move_to_end(user_id)
+            while len(self._min_versions) > self.maxsize:
+                self._min_versions.popitem(last=False)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._min_versions.clear()
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_ENABLED)
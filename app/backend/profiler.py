@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', 5))
+PROFILER_MAX_PROFILES = int(os.getenv('PROFILER_MAX_PROFILES', 50))
+# Глубже не ищем кадр middleware в стеке потока
+MAX_STACK_DEPTH = 256
+# Скрейпы, healthcheck и сам профилировщик не тратят места под профили
+EXCLUDED_PATHS = ('/metrics', '/health/', '/admin/profiler')
+
+_ROOT = str(Path(__file__).resolve().parents[2]) + os.sep
+_STDLIB = sysconfig.get_paths()['stdlib'] + os.sep
+_labels: dict = {}
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    prefix = _labels.get(code)
+    if prefix is None:
+        filename = code.co_filename
+        if 'site-packages' + os.sep in filename:
+            filename = filename.rsplit('site-packages' + os.sep, 1)[1]
+        elif filename.startswith(_ROOT):
+            filename = filename[len(_ROOT):]
+        elif filename.startswith(_STDLIB):
+            filename = filename[len(_STDLIB):]
+        prefix = _labels[code] = f'{getattr(code, "co_qualname", code.co_name)} ({filename}'
+    return f'{prefix}:{frame.f_lineno})'
+
+
+class Capture:
+    """Stack samples of one request, folded as ``frame;frame;frame`` -> count."""
+
+    __slots__ = ('id', 'task', 'root', 'method', 'path', 'started_at', 'stacks', 'samples')
+
+    def __init__(self, capture_id: int, task: asyncio.Task, root, method: str, path: str):
+        self.id = capture_id
+        self.task = task
+        self.root = root
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def sample(self, loop_frame):
+        # Задача сейчас выполняется - берём стек потока от кадра middleware вглубь,
+        # включая синхронный код (подпись, сериализацию); иначе - цепочку await, на которой она ждёт
+        stack = []
+        frame = loop_frame
+        while frame is not None and frame is not self.root and len(stack) < MAX_STACK_DEPTH:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is self.root:
+            stack.append(frame)
+            stack.reverse()
+            leaf = None
+        else:
+            stack = self._awaiting()
+            leaf = '[await]'
+        if not stack:
+            return
+        labels = [_label(frame) for frame in stack]
+        if leaf:
+            labels.append(leaf)
+        self.stacks[';'.join(labels)] += 1
+        self.samples += 1
+
+    def _awaiting(self) -> list:
+        chain = []
+        coro = self.task.get_coro()
+        while coro is not None:
+            frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+            if frame is None:
+                break
+            chain.append(frame)
+            coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+        for position, frame in enumerate(chain):
+            if frame is self.root:
+                return chain[position:]
+        return []
+
+
+class Profiler:
+    """Samples the stacks of selected requests from a background thread.
+
+    An admin arms it for the next ``requests`` requests, or for requests
+    slower than ``min_duration_ms`` (keeping up to ``requests`` of them).
+    While armed, every ``interval_ms`` the thread records where each
+    profiled request is: the running Python stack, or the chain of awaits
+    it is suspended on. When nothing is armed the thread does not run.
+    Profiles are per worker process.
+    """
+
+    def __init__(self, interval_ms: float, max_profiles: int):
+        self.interval = interval_ms / 1000
+        self.profiles: deque[dict] = deque(maxlen=max_profiles)
+        self.remaining = 0
+        self.min_duration: float | None = None
+        self.path: str | None = None
+        self.expires_at: float | None = None
+        self._active: dict[int, Capture] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._next_id = 1
+        self.discarded = 0
+
+    @property
+    def armed(self) -> bool:
+        return self.remaining > 0
+
+    def arm(self, requests: int, min_duration_ms: float | None = None, path: str | None = None,
+            duration: float | None = None, interval_ms: float | None = None):
+        self.remaining = requests
+        self.min_duration = min_duration_ms / 1000 if min_duration_ms is not None else None
+        self.path = path
+        self.expires_at = time.monotonic() + duration if duration else None
+        if interval_ms is not None:
+            self.interval = interval_ms / 1000
+        self._loop_thread_id = threading.get_ident()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+            self._thread.start()
+        logger.info(f'Profiler armed for {requests} requests'
+                    + (f' slower than {min_duration_ms} ms' if min_duration_ms is not None else ''))
+
+    def disarm(self):
+        self.remaining = 0
+        self._active.clear()
+        self._stop_thread()
+
+    def _stop_thread(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def begin(self, scope: dict, root) -> Capture | None:
+        if self.remaining <= 0:
+            return None
+        if self.expires_at is not None and time.monotonic() > self.expires_at:
+            self.disarm()
+            return None
+        if self.path is not None and scope['path'] != self.path:
+            return None
+        if scope['path'].startswith(EXCLUDED_PATHS):
+            return None
+        if self.min_duration is None:
+            # Режим "следующие N запросов": место занимается сразу
+            self.remaining -= 1
+        capture = Capture(self._next_id, asyncio.current_task(), root, scope['method'], scope['path'])
+        self._next_id += 1
+        self._active[capture.id] = capture
+        return capture
+
+    def end(self, capture: Capture, status_code: int, duration: float, breakdown: dict):
+        if self._active.pop(capture.id, None) is None:
+            # Профилировщик выключили, пока шёл запрос
+            return
+        if self.min_duration is not None:
+            if duration < self.min_duration or self.remaining <= 0:
+                self.discarded += 1
+                return
+            self.remaining -= 1
+        self.profiles.append({
+            'id': capture.id,
+            'method': capture.method,
+            'path': capture.path,
+            'status': status_code,
+            'started_at': capture.started_at,
+            'duration_ms': duration * 1000,
+            'samples': capture.samples,
+            'timing': breakdown,
+            'stacks': capture.stacks,
+        })
+        if self.remaining <= 0 and not self._active:
+            self._stop_thread()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            loop_frame = sys._current_frames().get(self._loop_thread_id)
+            for capture in list(self._active.values()):
+                try:
+                    capture.sample(loop_frame)
+                except Exception:
+                    # Стек меняется прямо во время обхода - пропускаем отсчёт
+                    continue
+
+    def get(self, profile_id: int) -> dict | None:
+        return next((profile for profile in self.profiles if profile['id'] == profile_id), None)
+
+    @staticmethod
+    def folded(profile: dict) -> str:
+        """Collapsed stacks, one ``frame;frame;frame count`` per line (flamegraph.pl, speedscope)."""
+        return ''.join(f'{stack} {count}\n' for stack, count in profile['stacks'].most_common())
+
+    def status(self) -> dict:
+        return {
+            'armed': self.armed,
+            'remaining': self.remaining,
+            'min_duration_ms': self.min_duration * 1000 if self.min_duration is not None else None,
+            'path': self.path,
+            'interval_ms': self.interval * 1000,
+            'in_flight': len(self._active),
+            'discarded': self.discarded,
+            'profiles': [
+                {key: value for key, value in profile.items() if key != 'stacks'} for profile in self.profiles
+            ],
+        }
+
+    def stats(self) -> dict:
+        return {
+            'armed': int(self.armed),
+            'remaining': self.remaining,
+            'in_flight': len(self._active),
+            'profiles': len(self.profiles),
+            'discarded': self.discarded,
+        }
+
+
+profiler = Profiler(PROFILER_INTERVAL_MS, PROFILER_MAX_PROFILES)
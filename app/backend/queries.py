@@ -0,0 +1,19 @@
+from sqlalchemy import lambda_stmt, select
+
+from app.models.tokens import RevokedToken
+from app.models.user import User
+
+# Запросы горячих путей. lambda_stmt кеширует построенное выражение по месту
+# объявления лямбды, поэтому на запрос остаётся только подстановка параметров.
+
+
+def user_by_username(username: str):
+    return lambda_stmt(lambda: select(User).where(User.username == username))
+
+
+def user_by_id(user_id: int):
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def revoked_token_by_jti(jti: str):
+    return lambda_stmt(lambda: select(RevokedToken).where(RevokedToken.jti == jti))
@@ -0,0 +1,18 @@
+import time
+
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+
+from app.backend.timing import current_timing
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    """``ORJSONResponse`` that reports its serialization time as the ``ser`` span."""
+
+    def render(self, content) -> bytes:
+        timing = current_timing.get()
+        if timing is None:
+            return super().render(content)
+        started = time.perf_counter()
+        body = super().render(content)
+        timing.add('ser', time.perf_counter() - started)
+        return body
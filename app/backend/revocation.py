@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+from app.backend.db import async_session_maker
+from app.models.tokens import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_INDEX_ENABLED = os.getenv('REVOCATION_INDEX_ENABLED', '1') == '1'
+REVOCATION_SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_INTERVAL', 2))
+# Строки, закоммиченные чуть позже, могут иметь revoked_at меньше уже виденного -
+# поэтому каждый опрос перечитывает небольшое окно перед последней меткой
+REVOCATION_SYNC_OVERLAP = float(os.getenv('REVOCATION_SYNC_OVERLAP', 30))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100_000))
+REVOCATION_BLOOM_FP_RATE = float(os.getenv('REVOCATION_BLOOM_FP_RATE', 0.001))
+
+REVOKED_TOKENS_SWEEP_INTERVAL = float(os.getenv('REVOKED_TOKENS_SWEEP_INTERVAL', 300))
+# Удаляем маленькими порциями в отдельных транзакциях, чтобы не держать долгих блокировок
+REVOKED_TOKENS_SWEEP_BATCH = int(os.getenv('REVOKED_TOKENS_SWEEP_BATCH', 1000))
+REVOKED_TOKENS_SWEEP_PAUSE = float(os.getenv('REVOKED_TOKENS_SWEEP_PAUSE', 0.1))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class RevocationIndex:
+    """In-memory copy of ``revoked_tokens`` for the refresh path.
+
+    A Bloom filter answers the common "not revoked" case; its positives are
+    confirmed against the exact set, so a lookup never needs the database
+    once the index has been loaded. Entries are dropped once the refresh
+    token itself has expired, on every worker, whether or not it ran the
+    sweeper.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.fp_rate = fp_rate
+        self._bloom = BloomFilter(capacity, fp_rate)
+        # jti -> expires_at (None у строк, записанных до появления колонки)
+        self._revoked: dict[str, datetime | None] = {}
+        self._expiry: list[tuple[datetime, str]] = []
+        self._watermark: datetime | None = None
+        self.loaded = False
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self.false_positives = 0
+        self.last_sync: float | None = None
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def contains(self, jti: str) -> bool | None:
+        """``None`` means the index is not loaded and the caller must ask the database."""
+        if not self.loaded:
+            return None
+
+        self.lookups += 1
+        if jti not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        if jti in self._revoked:
+            return True
+        self.false_positives += 1
+        return False
+
+    def add(self, jti: str, revoked_at: datetime | None = None, expires_at: datetime | None = None):
+        if expires_at is not None and expires_at.tzinfo is None:
+            # SQLite отдаёт время без пояса; пишем всегда в UTC
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if jti not in self._revoked:
+            self._revoked[jti] = expires_at
+            self._bloom.add(jti)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild(self._bloom.capacity * 2)
+        elif expires_at is None or self._revoked[jti] is not None:
+            expires_at = None
+        else:
+            # Событие с шины пришло без срока - его принесёт sync
+            self._revoked[jti] = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, jti))
+        if revoked_at is not None and (self._watermark is None or revoked_at > self._watermark):
+            self._watermark = revoked_at
+
+    def discard(self, jtis: list[str]):
+        # Из фильтра Блума удалять нельзя - пересобираем его, когда устаревших битов много
+        for jti in jtis:
+            self._revoked.pop(jti, None)
+        if self._bloom.count > 2 * max(len(self._revoked), 1) and self._bloom.count > 1000:
+            self._rebuild(max(REVOCATION_BLOOM_CAPACITY, len(self._revoked) * 2))
+
+    def prune(self, now: datetime | None = None) -> int:
+        """Forget tokens that have expired: a refresh with them is rejected before the index is asked."""
+        now = now or datetime.now(timezone.utc)
+        expired = []
+        while self._expiry and self._expiry[0][0] < now:
+            expires_at, jti = heapq.heappop(self._expiry)
+            if self._revoked.get(jti) == expires_at:
+                expired.append(jti)
+        if expired:
+            self.discard(expired)
+        return len(expired)
+
+    def _rebuild(self, capacity: int):
+        bloom = BloomFilter(capacity, self.fp_rate)
+        for jti in self._revoked:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    async def load(self):
+        query = select(RevokedToken.jti, RevokedToken.revoked_at, RevokedToken.expires_at).where(
+            (RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at >= datetime.now(timezone.utc))
+        )
+        async with async_session_maker() as db:
+            rows = (await db.execute(query)).all()
+
+        self._revoked = {}
+        self._expiry = []
+        self._watermark = None
+        self._rebuild(max(REVOCATION_BLOOM_CAPACITY, len(rows) * 2))
+        for jti, revoked_at, expires_at in rows:
+            self.add(jti, revoked_at, expires_at)
+        self.loaded = True
+        self.last_sync = time.time()
+        logger.info(f'Revocation index loaded: {len(rows)} revoked tokens')
+
+    async def sync(self):
+        """Pick up rows written by other workers since the last poll and drop expired ones."""
+        query = select(RevokedToken.jti, RevokedToken.revoked_at, RevokedToken.expires_at)
+        if self._watermark is not None:
+            query = query.where(
+                RevokedToken.revoked_at >= self._watermark - timedelta(seconds=REVOCATION_SYNC_OVERLAP)
+            )
+        async with async_session_maker() as db:
+            rows = (await db.execute(query)).all()
+        for jti, revoked_at, expires_at in rows:
+            self.add(jti, revoked_at, expires_at)
+        self.prune()
+        self.last_sync = time.time()
+
+    def memory_bytes(self) -> int:
+        strings = sum(sys.getsizeof(jti) for jti in self._revoked)
+        return sys.getsizeof(self._bloom.bits) + sys.getsizeof(self._revoked) + sys.getsizeof(self._expiry) + strings
+
+    def stats(self) -> dict:
+        return {
+            'loaded': self.loaded,
+            'entries': len(self._revoked),
+            'bloom_bits': self._bloom.size,
+            'bloom_hashes': self._bloom.hash_count,
+            'estimated_fp_rate': self._bloom.estimated_fp_rate,
+            'observed_fp_rate': self.false_positives / max(self.bloom_negatives + self.false_positives, 1),
+            'memory_bytes': self.memory_bytes(),
+            'lookups': self.lookups,
+            'false_positives': self.false_positives,
+            'last_sync': self.last_sync,
+        }
+
+
+revocation_index = RevocationIndex(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_FP_RATE)
+
+
+class RevokedTokenSweeper:
+    """Deletes rows whose refresh token has expired, one bounded batch per transaction."""
+
+    def __init__(self, batch_size: int, pause: float):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.running = False
+        self.runs = 0
+        self.deleted_total = 0
+        self.last_run_deleted = 0
+        self.last_run_started: float | None = None
+        self.last_run_finished: float | None = None
+
+    async def sweep(self) -> int:
+        self.running = True
+        self.runs += 1
+        self.last_run_started = time.time()
+        self.last_run_deleted = 0
+        cutoff = datetime.now(timezone.utc)
+        try:
+            while True:
+                expired = (
+                    select(RevokedToken.jti)
+                    .where(RevokedToken.expires_at < cutoff)
+                    .limit(self.batch_size)
+                    .scalar_subquery()
+                )
+                async with async_session_maker() as db:
+                    result = await db.execute(
+                        delete(RevokedToken)
+                        .where(RevokedToken.jti.in_(expired))
+                        .returning(RevokedToken.jti)
+                        .execution_options(synchronize_session=False)
+                    )
+                    deleted = result.scalars().all()
+                    await db.commit()
+
+                self.last_run_deleted += len(deleted)
+                self.deleted_total += len(deleted)
+                if len(deleted) < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        finally:
+            self.running = False
+            self.last_run_finished = time.time()
+
+        if self.last_run_deleted:
+            logger.info(f'Swept {self.last_run_deleted} expired revoked tokens')
+        return self.last_run_deleted
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'runs': self.runs,
+            'deleted_total': self.deleted_total,
+            'last_run_deleted': self.last_run_deleted,
+            'last_run_started': self.last_run_started,
+            'last_run_finished': self.last_run_finished,
+        }
+
+
+revoked_token_sweeper = RevokedTokenSweeper(REVOKED_TOKENS_SWEEP_BATCH, REVOKED_TOKENS_SWEEP_PAUSE)
+
+
+async def sync_revocations_periodically():
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_INTERVAL)
+        try:
+            if revocation_index.loaded:
+                await revocation_index.sync()
+            else:
+                await revocation_index.load()
+        except Exception:
+            logger.exception('Failed to sync revocation index')
+
+
+async def sweep_revoked_tokens_periodically():
+    while True:
+        try:
+            await revoked_token_sweeper.sweep()
+        except Exception:
+            logger.exception('Failed to sweep revoked tokens')
+        await asyncio.sleep(REVOKED_TOKENS_SWEEP_INTERVAL)
@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.backend.db import engine
+from app.backend.keys import keyring
+
+logger = logging.getLogger(__name__)
+
+# create - create_all и индексы при каждом старте (локальная разработка, тесты);
+# check - схему ведут миграции, приложение только сверяет ревизию и не стартует, если она отстала
+DB_SCHEMA_MODE = os.getenv('DB_SCHEMA_MODE', 'create')
+# Хеш пароля и подпись токена до первого запроса, чтобы его не ждал пользователь
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', '1') == '1'
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / 'migrations'
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the newest migration revision."""
+
+
+def migration_heads() -> set[str]:
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS_DIR))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def check_schema(target: AsyncEngine = engine):
+    """Compare ``alembic_version`` with the newest migration; one query, no reflection."""
+    expected = migration_heads()
+    async with target.connect() as conn:
+        current = set(await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+        ))
+    if current != expected:
+        raise SchemaOutOfDate(
+            f'Database schema is at {", ".join(sorted(current)) or "no revision"}, '
+            f'expected {", ".join(sorted(expected))}; run `alembic upgrade head`'
+        )
+
+
+def warm_tokens():
+    # Первая подпись и проверка платят за ленивые импорты PyJWT/cryptography и разбор ключа;
+    # напрямую через keyring, чтобы не попасть в метрики encode/decode
+    keyring.decode(keyring.encode({'sub': 'warm-up', 'id': 0, 'exp': int(time.time()) + 60}))
+
+
+class Readiness:
+    """Whether startup has finished, and how long each of its steps took."""
+
+    def __init__(self):
+        self.ready = False
+        self.steps: dict[str, float] = {}
+        self._started: float | None = None
+        self.startup_seconds: float | None = None
+
+    def begin(self):
+        self.ready = False
+        self.steps.clear()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+    def mark_ready(self):
+        self.startup_seconds = time.perf_counter() - self._started
+        self.ready = True
+        logger.info(f'Ready in {self.startup_seconds:.2f}s ('
+                    + ', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.steps.items()) + ')')
+
+    def mark_stopping(self):
+        # Балансировщик перестаёт слать запросы, пока уходят фоновые задачи
+        self.ready = False
+
+    def stats(self) -> dict:
+        return {
+            'ready': int(self.ready),
+            'seconds': self.startup_seconds,
+            **{f'{name}_seconds': seconds for name, seconds in self.steps.items()},
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+LOGIN_THROTTLE_ENABLED = os.getenv('LOGIN_THROTTLE_ENABLED', '1') == '1'
+# memory - счётчики в процессе (один воркер), redis - общие для всех воркеров,
+# sqlite - локальная замена redis для нескольких воркеров на одной машине
+LOGIN_THROTTLE_BACKEND = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory')
+LOGIN_THROTTLE_WINDOW = float(os.getenv('LOGIN_THROTTLE_WINDOW', 300))
+LOGIN_THROTTLE_USERNAME_LIMIT = int(os.getenv('LOGIN_THROTTLE_USERNAME_LIMIT', 10))
+LOGIN_THROTTLE_IP_LIMIT = int(os.getenv('LOGIN_THROTTLE_IP_LIMIT', 100))
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv('LOGIN_THROTTLE_MAX_KEYS', 100_000))
+LOGIN_THROTTLE_REDIS_URL = os.getenv('LOGIN_THROTTLE_REDIS_URL', 'redis://localhost:6379/0')
+LOGIN_THROTTLE_SQLITE_PATH = os.getenv(
+    'LOGIN_THROTTLE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'auth-login-throttle.sqlite3')
+)
+# За балансировщиком адрес клиента берём из X-Forwarded-For
+LOGIN_THROTTLE_TRUST_FORWARDED = os.getenv('LOGIN_THROTTLE_TRUST_FORWARDED', '0') == '1'
+
+
+class LoginThrottled(Exception):
+    def __init__(self, scope: str, retry_after: int):
+        super().__init__(f'Too many login attempts per {scope}')
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class MemoryThrottleBackend:
+    """Per-process counters: ``key -> [window, previous count, current count]``."""
+
+    def __init__(self, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters: OrderedDict[str, list[int]] = OrderedDict()
+
+    async def hit(self, key: str, window: int) -> tuple[int, int]:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [window, 0, 0]
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            if counter[0] != window:
+                counter[1] = counter[2] if counter[0] == window - 1 else 0
+                counter[0], counter[2] = window, 0
+        counter[2] += 1
+        return counter[1], counter[2]
+
+    async def clear(self, key: str):
+        self._counters.pop(key, None)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {'keys': len(self._counters)}
+
+
+class SqliteThrottleBackend:
+    """Counters in a local SQLite file shared by all workers on the host.
+
+    Stands in for Redis when several uvicorn workers run on one machine
+    without a shared cache.
+    """
+
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, path: str = LOGIN_THROTTLE_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS login_throttle ('
+            'key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, '
+            'PRIMARY KEY (key, window)) WITHOUT ROWID'
+        )
+
+    def _hit(self, key: str, window: int) -> tuple[int, int]:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                current = self._conn.execute(
+                    'INSERT INTO login_throttle (key, window, count) VALUES (?, ?, 1) '
+                    'ON CONFLICT (key, window) DO UPDATE SET count = count + 1 RETURNING count',
+                    (key, window),
+                ).fetchone()[0]
+                previous = self._conn.execute(
+                    'SELECT count FROM login_throttle WHERE key = ? AND window = ?', (key, window - 1)
+                ).fetchone()
+                self._hits += 1
+                if self._hits % self.CLEANUP_EVERY == 0:
+                    self._conn.execute('DELETE FROM login_throttle WHERE window < ?', (window - 1,))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return (previous[0] if previous else 0), current
+
+    def _clear(self, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM login_throttle WHERE key = ?', (key,))
+
+    async def hit(self, key: str, window: int) -> tuple[int, int]:
+        return await asyncio.to_thread(self._hit, key, window)
+
+    async def clear(self, key: str):
+        await asyncio.to_thread(self._clear, key)
+
+    async def close(self):
+        self._conn.close()
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RedisThrottleBackend:
+    """Counters shared by every worker and replica; needs the ``redis`` package."""
+
+    def __init__(self, url: str = LOGIN_THROTTLE_REDIS_URL, prefix: str = 'login-throttle:'):
+        try:
+            import redis.asyncio
+        except ImportError:
+            raise RuntimeError('LOGIN_THROTTLE_BACKEND=redis requires the redis package')
+        self.prefix = prefix
+        self.ttl = math.ceil(LOGIN_THROTTLE_WINDOW * 2)
+        self._redis = redis.asyncio.from_url(url)
+
+    async def hit(self, key: str, window: int) -> tuple[int, int]:
+        current_key = f'{self.prefix}{key}:{window}'
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, self.ttl)
+            pipe.get(f'{self.prefix}{key}:{window - 1}')
+            current, _, previous = await pipe.execute()
+        return int(previous or 0), int(current)
+
+    async def clear(self, key: str):
+        found = [name async for name in self._redis.scan_iter(f'{self.prefix}{key}:*')]
+        if found:
+            await self._redis.delete(*found)
+
+    async def close(self):
+        await self._redis.aclose()
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LoginThrottle:
+    """Sliding-window limits on login attempts per username and per client IP.
+
+    Every attempt is counted before the password is looked at, so a burst
+    over the limit is rejected without spending any hashing time. The
+    sliding window is approximated from the current and previous fixed
+    windows, which needs only two counters per key.
+    """
+
+    def __init__(self, backend, window: float, username_limit: int, ip_limit: int, enabled: bool = True):
+        self.backend = backend
+        self.window = window
+        self.limits = {'username': username_limit, 'ip': ip_limit}
+        self.enabled = enabled
+        self.rejected = {'username': 0, 'ip': 0}
+
+    def _estimate(self, previous: int, current: int, elapsed: float) -> float:
+        return previous * (1 - elapsed / self.window) + current
+
+    def _retry_after(self, previous: int, current: int, elapsed: float, limit: int) -> int:
+        # Сколько ждать, пока оценка опустится до лимита, если новых попыток не будет
+        if current <= limit:
+            wait = self.window * (1 - (limit - current) / previous) - elapsed
+        else:
+            wait = self.window - elapsed + self.window * (1 - limit / current)
+        return max(1, math.ceil(wait))
+
+    async def check(self, username: str, ip: str | None):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        window = int(now // self.window)
+        elapsed = now - window * self.window
+        keys = {'username': f'user:{username.lower()}', 'ip': f'ip:{ip}' if ip else None}
+
+        for scope, key in keys.items():
+            limit = self.limits[scope]
+            if key is None or limit <= 0:
+                continue
+            previous, current = await self.backend.hit(key, window)
+            if self._estimate(previous, current, elapsed) > limit:
+                self.rejected[scope] += 1
+                raise LoginThrottled(scope, self._retry_after(previous, current, elapsed, limit))
+
+    async def reset(self, username: str):
+        """Forget failed attempts for a user after a successful login."""
+        if self.enabled:
+            await self.backend.clear(f'user:{username.lower()}')
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            'rejected_username': self.rejected['username'],
+            'rejected_ip': self.rejected['ip'],
+            **self.backend.stats(),
+        }
+
+
+def create_backend(name: str):
+    if name == 'redis':
+        return RedisThrottleBackend()
+    if name == 'sqlite':
+        return SqliteThrottleBackend()
+    return MemoryThrottleBackend()
+
+
+def client_ip(request) -> str | None:
+    if LOGIN_THROTTLE_TRUST_FORWARDED:
+        forwarded = request.headers.get('x-forwarded-for')
+        if forwarded:
+            return forwarded.split(',', 1)[0].strip()
+    return request.client.host if request.client else None
+
+
+login_throttle = LoginThrottle(
+    create_backend(LOGIN_THROTTLE_BACKEND) if LOGIN_THROTTLE_ENABLED else MemoryThrottleBackend(),
+    LOGIN_THROTTLE_WINDOW,
+    LOGIN_THROTTLE_USERNAME_LIMIT,
+    LOGIN_THROTTLE_IP_LIMIT,
+    enabled=LOGIN_THROTTLE_ENABLED,
+)
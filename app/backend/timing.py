@@ -0,0 +1,73 @@
+import os
+import time
+from contextvars import ContextVar
+
+# Заголовок Server-Timing с разбивкой времени запроса: db, hash, jwt, ser, total
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', '0') == '1'
+
+SPAN_DESCRIPTIONS = {
+    'db': 'database queries',
+    'hash': 'password hashing',
+    'jwt': 'token signing and verification',
+    'ser': 'response serialization',
+}
+
+
+class RequestTiming:
+    """Time spent per stage within one request: total seconds and number of spans."""
+
+    __slots__ = ('started', 'spans')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: dict[str, list] = {}
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> dict[str, dict]:
+        return {name: {'ms': seconds * 1000, 'count': count} for name, (seconds, count) in self.spans.items()}
+
+    def header(self) -> str:
+        parts = [
+            f'{name};dur={seconds * 1000:.2f};desc="{SPAN_DESCRIPTIONS.get(name, name)} x{count}"'
+            for name, (seconds, count) in self.spans.items()
+        ]
+        parts.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(parts)
+
+
+# None, пока ни Server-Timing, ни профилировщик не включены: тогда замеры - одна проверка
+current_timing: ContextVar[RequestTiming | None] = ContextVar('current_timing', default=None)
+
+
+def record(name: str, seconds: float):
+    timing = current_timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+class Span:
+    """``with Span('jwt'):`` adds the block's duration to the current request, if it is being timed."""
+
+    __slots__ = ('name', 'timing', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timing = current_timing.get()
+        if self.timing is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.timing is not None:
+            self.timing.add(self.name, time.perf_counter() - self.started)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+TOKEN_CACHE_ENABLED = os.getenv('TOKEN_CACHE_ENABLED', '1') == '1'
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10_000))
+
+
+class TokenCache:
+    """LRU of already verified access tokens.
+
+    Keys are digests of the raw token, so the cache never holds a usable
+    credential. Entries expire together with the token's own ``exp`` and
+    can be dropped per user when their account changes.
+    """
+
+    def __init__(self, maxsize: int, enabled: bool = True):
+        self.maxsize = maxsize
+        self.enabled = enabled and maxsize > 0
+        self._entries: OrderedDict[bytes, tuple[dict, int, int]] = OrderedDict()
+        self._by_user: dict[int, set[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str) -> dict | None:
+        entry = self.get_versioned(token)
+        return entry[0] if entry is not None else None
+
+    def get_versioned(self, token: str) -> tuple[dict, int] | None:
+        """The cached principal together with the token version it was issued with."""
+        if not self.enabled:
+            return None
+
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        principal, expire, version = entry
+        if expire <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return principal, version
+
+    def put(self, token: str, principal: dict, expire: int, version: int = 0):
+        if not self.enabled:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (principal, expire, version)
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(principal['id'], set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        for key in self._by_user.pop(user_id, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key: bytes):
+        principal, _, _ = self._entries.pop(key)
+        keys = self._by_user.get(principal['id'])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal['id']]
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_ENABLED)
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from app.backend.db import async_read_session_maker
+from app.backend.invalidation import invalidation_bus, USER_CHANGED
+from app.backend.principal_cache import principal_cache
+from app.backend.token_cache import token_cache
+from app.models.user import User
+
+# Сколько секунд доверяем закешированной версии; столько же другие воркеры
+# могут принимать токены пользователя после "выйти везде"
+TOKEN_VERSION_TTL = float(os.getenv('TOKEN_VERSION_TTL', 5))
+TOKEN_VERSION_CACHE_SIZE = int(os.getenv('TOKEN_VERSION_CACHE_SIZE', 100_000))
+# Пользователей в одном событии USER_CHANGED: NOTIFY в Postgres ограничен 8000 байт
+USER_CHANGED_BATCH_SIZE = int(os.getenv('USER_CHANGED_BATCH_SIZE', 300))
+
+
+class TokenVersions:
+    """Cached ``users.token_version`` per user.
+
+    Tokens carry the version they were issued with (``ver``); bumping the
+    column invalidates every outstanding token of the user at once. Lookups
+    for the same user that miss together share one query.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._versions: OrderedDict[int, tuple[int | None, float]] = OrderedDict()
+        self._inflight: dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._versions)
+
+    async def current(self, user_id: int) -> int | None:
+        """``None`` means there is no such user."""
+        entry = self._versions.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._versions.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        future = self._inflight.get(user_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            version = await self._load(user_id)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Исключение уже отдано вызывающему - не даём future ругаться, что его не прочитали
+            future.exception()
+            raise
+        else:
+            future.set_result(version)
+        finally:
+            del self._inflight[user_id]
+
+        self.observe(user_id, version)
+        return version
+
+    async def current_many(self, user_ids) -> dict[int, int | None]:
+        """``current`` for several users: every miss is read in one ``IN`` query."""
+        now = time.monotonic()
+        versions: dict[int, int | None] = {}
+        waiting: dict[int, asyncio.Future] = {}
+        missing: list[int] = []
+        for user_id in set(user_ids):
+            entry = self._versions.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._versions.move_to_end(user_id)
+                self.hits += 1
+                versions[user_id] = entry[0]
+                continue
+            self.misses += 1
+            if user_id in self._inflight:
+                waiting[user_id] = self._inflight[user_id]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {user_id: loop.create_future() for user_id in missing}
+            self._inflight.update(futures)
+            try:
+                loaded = await self._load_many(missing)
+            except BaseException as exc:
+                for future in futures.values():
+                    future.set_exception(exc)
+                    future.exception()
+                raise
+            else:
+                for user_id, future in futures.items():
+                    future.set_result(loaded.get(user_id))
+            finally:
+                for user_id in missing:
+                    del self._inflight[user_id]
+            for user_id in missing:
+                versions[user_id] = self.observe(user_id, loaded.get(user_id))
+
+        for user_id, future in waiting.items():
+            versions[user_id] = await asyncio.shield(future)
+        return versions
+
+    async def _load_many(self, user_ids: list[int]) -> dict[int, int]:
+        async with async_read_session_maker() as db:
+            rows = await db.execute(select(User.id, User.token_version).where(User.id.in_(user_ids)))
+            return {user_id: version for user_id, version in rows}
+
+    async def _load(self, user_id: int) -> int | None:
+        async with async_read_session_maker() as db:
+            return await db.scalar(select(User.token_version).where(User.id == user_id))
+
+    def observe(self, user_id: int, version: int | None) -> int | None:
+        """Record a version read from the database; returns the newest one known."""
+        # Версия только растёт: отстающая реплика не должна откатить значение после bump
+        entry = self._versions.get(user_id)
+        if entry is not None and entry[0] is not None and version is not None:
+            version = max(version, entry[0])
+        self._versions[user_id] = (version, time.monotonic() + self.ttl)
+        self._versions.move_to_end(user_id)
+        while len(self._versions) > self.maxsize:
+            self._versions.popitem(last=False)
+        return version
+
+    def bumped(self, user_id: int, version: int):
+        """Record a bump made by this worker and tell the other workers about it."""
+        self.changed(user_id, version)
+        invalidation_bus.publish(USER_CHANGED, user_id=user_id, version=version)
+
+    def bumped_many(self, versions: dict[int, int]):
+        """``bumped`` for many users: one event per ``USER_CHANGED_BATCH_SIZE`` of them."""
+        users = list(versions.items())
+        for user_id, version in users:
+            self.changed(user_id, version)
+        for start in range(0, len(users), USER_CHANGED_BATCH_SIZE):
+            invalidation_bus.publish(USER_CHANGED, users=users[start:start + USER_CHANGED_BATCH_SIZE])
+
+    def on_user_changed(self, event: dict):
+        """Bus handler: one ``user_id``/``version`` or ``users`` as ``[user_id, version]`` pairs."""
+        users = event['users'] if 'users' in event else [(event['user_id'], event['version'])]
+        for user_id, version in users:
+            self.changed(user_id, version)
+
+    def changed(self, user_id: int, version: int):
+        """Apply a bump made here or by another worker: new version, nothing cached for the user."""
+        self.observe(user_id, version)
+        token_cache.invalidate_user(user_id)
+        principal_cache.invalidate(user_id, version)
+
+    def clear(self):
+        self._versions.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._versions),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+token_versions = TokenVersions(TOKEN_VERSION_TTL, TOKEN_VERSION_CACHE_SIZE)
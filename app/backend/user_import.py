@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+from typing import AsyncIterator, BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backend.hashing import hash_passwords
+from app.models.user import User
+from app.schemas import CreateUser
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+IMPORT_MAX_LINE_BYTES = int(os.getenv('IMPORT_MAX_LINE_BYTES', 64 * 1024))
+
+USER_COLUMNS = ['first_name', 'last_name', 'username', 'email', 'hashed_password', 'is_active', 'is_admin', 'is_verified']
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes | LineTooLong]:
+    """Split a byte stream into lines without ever buffering more than one line."""
+    buffer = b''
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line, buffer = buffer[:end], buffer[end + 1:]
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > IMPORT_MAX_LINE_BYTES:
+                yield LineTooLong(f'Line longer than {IMPORT_MAX_LINE_BYTES} bytes')
+                continue
+            yield line.rstrip(b'\r')
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            # Хвост слишком длинной строки отбрасываем до следующего перевода строки
+            yield LineTooLong(f'Line longer than {IMPORT_MAX_LINE_BYTES} bytes')
+            buffer = b''
+            skipping = True
+    if buffer and not skipping:
+        yield buffer.rstrip(b'\r')
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, dict | Exception]]:
+    header = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if isinstance(line, Exception):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            decoded = line.decode('utf-8')
+            if fmt == 'csv':
+                values = next(csv.reader([decoded]))
+                if header is None:
+                    header = values
+                    continue
+                yield line_no, dict(zip(header, values))
+            else:
+                record = json.loads(decoded)
+                if not isinstance(record, dict):
+                    raise ValueError('Expected a JSON object')
+                yield line_no, record
+        except ValueError as exc:
+            yield line_no, exc
+
+
+def _validation_errors(exc: Exception) -> list[dict]:
+    if isinstance(exc, ValidationError):
+        return [{'loc': list(error['loc']), 'msg': error['msg']} for error in exc.errors()]
+    return [{'loc': [], 'msg': str(exc)}]
+
+
+class UserImporter:
+    """Validates, hashes and inserts users batch by batch.
+
+    Only the current batch is kept in memory; per-row results are written
+    to ``report`` as NDJSON as soon as their batch is committed.
+    """
+
+    def __init__(self, db: AsyncSession, report: BinaryIO, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.report = report
+        self.batch_size = batch_size
+        self.summary = {'created': 0, 'duplicate': 0, 'invalid': 0}
+        self._batch: list[tuple[int, CreateUser]] = []
+
+    def _write(self, result: dict):
+        self.summary[result['status']] += 1
+        self.report.write(json.dumps(result, ensure_ascii=False).encode() + b'\n')
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> dict:
+        async for line_no, record in iter_records(chunks, fmt):
+            if isinstance(record, Exception):
+                self._write({'line': line_no, 'status': 'invalid', 'errors': _validation_errors(record)})
+                continue
+            try:
+                self._batch.append((line_no, CreateUser.model_validate(record)))
+            except ValidationError as exc:
+                self._write({'line': line_no, 'status': 'invalid', 'errors': _validation_errors(exc)})
+                continue
+            if len(self._batch) >= self.batch_size:
+                await self._flush()
+        await self._flush()
+        self.report.write(json.dumps({'summary': self.summary}).encode() + b'\n')
+        return self.summary
+
+    async def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        # Дубликаты внутри пачки и уже существующие пользователи - одним запросом
+        seen_usernames, seen_emails = set(), set()
+        existing = await self.db.execute(
+            select(User.username, User.email).where(or_(
+                User.username.in_([user.username for _, user in batch]),
+                User.email.in_([user.email for _, user in batch]),
+            ))
+        )
+        for username, email in existing:
+            seen_usernames.add(username)
+            seen_emails.add(email)
+
+        pending = []
+        for line_no, user in batch:
+            if user.username in seen_usernames:
+                self._write({'line': line_no, 'status': 'duplicate', 'target': 'username'})
+            elif user.email in seen_emails:
+                self._write({'line': line_no, 'status': 'duplicate', 'target': 'email'})
+            else:
+                seen_usernames.add(user.username)
+                seen_emails.add(user.email)
+                pending.append((line_no, user))
+        if not pending:
+            return
+
+        # Импорт может подождать свободного воркера, в отличие от логина
+        hashed = await hash_passwords([user.password for _, user in pending])
+        rows = [
+            {
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'username': user.username,
+                'email': user.email,
+                'hashed_password': hashed_password,
+                'is_active': True,
+                'is_admin': False,
+                'is_verified': False,
+            }
+            for (_, user), hashed_password in zip(pending, hashed)
+        ]
+        created = await self._insert(rows)
+        await self.db.commit()
+
+        for line_no, user in pending:
+            user_id = created.get(user.username)
+            if user_id is None:
+                # Пользователя успели создать параллельно, между проверкой и вставкой
+                self._write({'line': line_no, 'status': 'duplicate', 'target': 'username'})
+            else:
+                self._write({'line': line_no, 'status': 'created', 'user_id': user_id})
+
+    async def _insert(self, rows: list[dict]) -> dict[str, int]:
+        dialect = self.db.bind.dialect
+        if dialect.name == 'postgresql' and dialect.driver == 'asyncpg':
+            return await self._copy_insert(rows)
+
+        if dialect.name == 'postgresql':
+            statement = pg_insert(User)
+        elif dialect.name == 'sqlite':
+            statement = sqlite_insert(User)
+        else:
+            statement = insert(User)
+        if hasattr(statement, 'on_conflict_do_nothing'):
+            statement = statement.on_conflict_do_nothing()
+        result = await self.db.execute(statement.values(rows).returning(User.username, User.id))
+        return dict(result.all())
+
+    async def _copy_insert(self, rows: list[dict]) -> dict[str, int]:
+        # COPY во временную таблицу, затем одна вставка с пропуском конфликтов
+        columns = ', '.join(USER_COLUMNS)
+        await self.db.execute(text(
+            'CREATE TEMP TABLE IF NOT EXISTS users_import ON COMMIT DELETE ROWS '
+            f'AS SELECT {columns} FROM users WITH NO DATA'
+        ))
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            'users_import',
+            records=[tuple(row[column] for column in USER_COLUMNS) for row in rows],
+            columns=USER_COLUMNS,
+        )
+        result = await self.db.execute(text(
+            f'INSERT INTO users ({columns}) SELECT {columns} FROM users_import '
+            'ON CONFLICT DO NOTHING RETURNING username, id'
+        ))
+        return dict(result.all())
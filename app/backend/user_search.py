@@ -0,0 +1,114 @@
+import logging
+import os
+import sys
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateIndex
+
+from app.backend.bulk_permissions import filter_clauses
+from app.backend.db import engine
+from app.models.user import SEARCH_INDEXES, User
+from app.schemas import UserFilter
+
+logger = logging.getLogger(__name__)
+
+USERS_PAGE_SIZE = int(os.getenv('USERS_PAGE_SIZE', 50))
+USERS_PAGE_MAX = int(os.getenv('USERS_PAGE_MAX', 500))
+# Postgres: GIN-индексы pg_trgm для поиска по подстроке (match=contains)
+USERS_SEARCH_TRIGRAM = os.getenv('USERS_SEARCH_TRIGRAM', '0') == '1'
+
+SEARCH_FIELDS = {
+    'username': [User.username],
+    'email': [User.email],
+    'name': [User.first_name, User.last_name],
+}
+LISTED_COLUMNS = [
+    User.id, User.username, User.email, User.first_name, User.last_name,
+    User.is_active, User.is_admin, User.is_verified, User.last_login_at, User.last_seen_at,
+]
+
+TRIGRAM_INDEXES = {
+    'ix_users_username_trgm': 'lower(username)',
+    'ix_users_email_trgm': 'lower(email)',
+    'ix_users_first_name_trgm': 'lower(first_name)',
+    'ix_users_last_name_trgm': 'lower(last_name)',
+}
+
+
+class SearchNotSupported(ValueError):
+    pass
+
+
+def trigram_available() -> bool:
+    return USERS_SEARCH_TRIGRAM and engine.dialect.name == 'postgresql'
+
+
+def prefix_condition(dialect: str, column, prefix: str):
+    lowered = func.lower(column)
+    prefix = prefix.lower()
+    if dialect == 'sqlite' and prefix and prefix[-1] != chr(sys.maxunicode):
+        # SQLite не использует индекс по выражению для LIKE - ищем диапазоном по lower(...)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return (lowered >= prefix) & (lowered < upper)
+    # Postgres: LIKE 'abc%' идёт по индексу lower(...) text_pattern_ops; шаблон собираем
+    # здесь, а не конкатенацией в SQL, чтобы планировщик видел постоянный префикс
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return lowered.like(f'{escaped}%', escape='\\')
+
+
+def contains_condition(column, fragment: str):
+    return func.lower(column).contains(fragment.lower(), autoescape=True)
+
+
+async def list_users(db: AsyncSession, user_filter: UserFilter, q: str | None = None, field: str | None = None,
+                     match: str = 'prefix', after: int | None = None, limit: int = USERS_PAGE_SIZE) -> dict:
+    """One page of users ordered by id, starting after the ``after`` cursor.
+
+    Keyset pagination keeps every page an index range scan, so page one
+    million costs the same as page one.
+    """
+    clauses = filter_clauses(user_filter)
+    if after is not None:
+        clauses.append(User.id > after)
+
+    if q:
+        if match == 'contains' and not trigram_available():
+            raise SearchNotSupported('Substring search needs Postgres with USERS_SEARCH_TRIGRAM=1')
+        dialect = db.bind.dialect.name
+        columns = SEARCH_FIELDS[field] if field else [column for group in SEARCH_FIELDS.values() for column in group]
+        if match == 'contains':
+            clauses.append(or_(*(contains_condition(column, q) for column in columns)))
+        else:
+            clauses.append(or_(*(prefix_condition(dialect, column, q) for column in columns)))
+
+    rows = (await db.execute(
+        select(*LISTED_COLUMNS).where(*clauses).order_by(User.id).limit(limit + 1)
+    )).mappings().all()
+
+    users = [dict(row) for row in rows[:limit]]
+    return {
+        'users': users,
+        'next_cursor': users[-1]['id'] if len(rows) > limit else None,
+    }
+
+
+async def ensure_search_indexes():
+    async with engine.begin() as conn:
+        # create_all не добавляет индексы в уже существующую таблицу
+        for index in SEARCH_INDEXES:
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+    await ensure_trigram_indexes()
+
+
+async def ensure_trigram_indexes():
+    # Не в миграциях: расширение нужно не везде, а CREATE EXTENSION требует прав
+    if not trigram_available():
+        return
+    async with engine.begin() as conn:
+        await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for name, expression in TRIGRAM_INDEXES.items():
+            await conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS {name} ON users USING gin ({expression} gin_trgm_ops)'
+            ))
+    logger.info('Trigram search indexes are in place')
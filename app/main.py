@@ -1,13 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, permission
-from app.backend.db import init_db
+from app.backend.responses import ORJSONResponse
+from app.routers import auth, health, metrics, permission, profiler as profiler_router, users, wellknown
+from app.backend.db import engine, read_engine, init_db, pool_stats, warm_pool
+from app.backend.metrics import MetricsMiddleware, TimingMiddleware, instrument_engine, stats_collector
+from app.backend.profiler import profiler
+from app.backend.keys import keyring, reload_keys_periodically
+from app.backend.revocation import (
+    revocation_index,
+    revoked_token_sweeper,
+    sync_revocations_periodically,
+    sweep_revoked_tokens_periodically,
+    REVOCATION_INDEX_ENABLED,
+)
+from app.backend.activity import activity
+from app.backend.audit import audit_log
+from app.backend import invalidation
+from app.backend.invalidation import invalidation_bus
+from app.backend.principal_cache import principal_cache
+from app.backend.token_cache import token_cache
+from app.backend.token_versions import token_versions
+from app.backend.user_search import ensure_search_indexes, ensure_trigram_indexes
+from app.backend.throttling import login_throttle, LoginThrottled
+from app.backend.hashing import (
+    hasher,
+    calibrate_on_startup,
+    warm_up as warm_up_hashing,
+    PasswordHashingOverloaded,
+    PASSWORD_HASH_RETRY_AFTER,
+)
+from app.backend.startup import check_schema, readiness, warm_tokens, DB_SCHEMA_MODE, STARTUP_WARMUP
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Фоновые задачи, живущие всё время работы приложения
+background_tasks: list[asyncio.Task] = []
 
 origins = [
     "http://localhost:3000",
@@ -23,9 +57,66 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TimingMiddleware)
 
 app.include_router(auth.router)
 app.include_router(permission.router)
+app.include_router(users.router)
+app.include_router(wellknown.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
+app.include_router(profiler_router.router)
+
+instrument_engine(engine)
+stats_collector.add('db_pool', pool_stats)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+    stats_collector.add('db_read_pool', lambda: pool_stats(read_engine))
+stats_collector.add('password_hash', lambda: {'pending': hasher.pending, 'capacity': hasher.capacity})
+stats_collector.add('token_cache', token_cache.stats)
+stats_collector.add('token_versions', token_versions.stats)
+stats_collector.add('principal_cache', principal_cache.stats)
+stats_collector.add('revocation_index', revocation_index.stats)
+stats_collector.add('revoked_tokens_sweeper', revoked_token_sweeper.stats)
+stats_collector.add('login_throttle', login_throttle.stats)
+stats_collector.add('startup', readiness.stats)
+stats_collector.add('audit', audit_log.stats)
+stats_collector.add('activity', activity.stats)
+stats_collector.add('invalidation', invalidation_bus.stats)
+stats_collector.add('profiler', profiler.stats)
+
+# Изменения, сделанные другими воркерами; свои уже применены на месте
+invalidation_bus.subscribe(invalidation.JTI_REVOKED, lambda event: revocation_index.add(
+    event['jti'], expires_at=datetime.fromtimestamp(event['exp'], timezone.utc) if 'exp' in event else None
+))
+invalidation_bus.subscribe(invalidation.JTI_REVOKED, lambda event: token_cache.invalidate_user(event['user_id']))
+invalidation_bus.subscribe(invalidation.USER_CHANGED, token_versions.on_user_changed)
+invalidation_bus.subscribe(invalidation.KEY_ROTATED, lambda event: asyncio.to_thread(keyring.reload))
+invalidation_bus.on_resync(token_cache.clear)
+invalidation_bus.on_resync(token_versions.clear)
+invalidation_bus.on_resync(principal_cache.clear)
+invalidation_bus.on_resync(lambda: revocation_index.sync() if revocation_index.loaded else None)
+invalidation_bus.on_resync(lambda: asyncio.to_thread(keyring.reload))
+
+
+@app.exception_handler(PasswordHashingOverloaded)
+async def password_hashing_overloaded_handler(request: Request, exc: PasswordHashingOverloaded):
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': 'Password hashing is overloaded, try again later'},
+        headers={'Retry-After': str(PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(LoginThrottled)
+async def login_throttled_handler(request: Request, exc: LoginThrottled):
+    return ORJSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={'detail': 'Too many login attempts, try again later'},
+        headers={'Retry-After': str(exc.retry_after)},
+    )
+
 
 # Функция для ручного запуска инициализации БД
 async def initialize_database():
@@ -40,4 +131,53 @@ async def initialize_database():
 # Оставляем для совместимости, но добавляем ручную инициализацию
 @app.on_event("startup")
 async def on_startup():
-    await initialize_database()
\ No newline at end of file
+    readiness.begin()
+    with readiness.step('schema'):
+        if DB_SCHEMA_MODE == 'check':
+            # Схему ведут миграции: сверяем ревизию вместо create_all в каждом воркере
+            await check_schema()
+            await ensure_trigram_indexes()
+        else:
+            await initialize_database()
+            await ensure_search_indexes()
+    with readiness.step('db_pool'):
+        await warm_pool()
+        if read_engine is not engine:
+            await warm_pool(target=read_engine)
+    with readiness.step('password_hashing'):
+        await calibrate_on_startup()
+        hasher.start()
+        if STARTUP_WARMUP:
+            await warm_up_hashing()
+    with readiness.step('signing_keys'):
+        keyring.load()
+        if STARTUP_WARMUP:
+            warm_tokens()
+    background_tasks.append(asyncio.create_task(reload_keys_periodically()))
+    # До загрузки индекса отзывов: события, пришедшие во время загрузки, не теряются
+    with readiness.step('invalidation_bus'):
+        await invalidation_bus.start()
+    if REVOCATION_INDEX_ENABLED:
+        with readiness.step('revocation_index'):
+            await revocation_index.load()
+        background_tasks.append(asyncio.create_task(sync_revocations_periodically()))
+    background_tasks.append(asyncio.create_task(sweep_revoked_tokens_periodically()))
+    audit_log.start()
+    activity.start()
+    readiness.mark_ready()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    readiness.mark_stopping()
+    profiler.disarm()
+    await invalidation_bus.close()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    # Дописываем накопленные события, пока соединения с БД ещё открыты
+    await audit_log.close()
+    await activity.close()
+    hasher.shutdown()
+    await login_throttle.close()
@@ -1,12 +1,13 @@
 import os
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from alembic import context
 
+from app.backend.db import Base
+from app.models import audit, tokens, user  # noqa: F401 - регистрируют таблицы в Base.metadata
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -16,11 +17,8 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# add your model's MetaData object here
-# for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+# Модели нужны только для autogenerate: сами миграции описывают схему явно
+target_metadata = Base.metadata
 
 # Get database URL from environment variable or use the one from alembic.ini
 def get_database_url():
@@ -48,6 +46,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        render_as_batch=url.startswith('sqlite'),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -67,15 +66,23 @@ def run_migrations_online() -> None:
     url = get_database_url()
     connectable = create_async_engine(url)
 
-    async def do_run_migrations(connection):
+    def do_run_migrations(connection):
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite не умеет ALTER COLUMN - alembic пересоздаёт таблицу
+            render_as_batch=connection.dialect.name == 'sqlite',
         )
         with context.begin_transaction():
             context.run_migrations()
 
+    async def run_async_migrations():
+        async with connectable.connect() as connection:
+            await connection.run_sync(do_run_migrations)
+        await connectable.dispose()
+
     import asyncio
-    asyncio.run(connectable.run_sync(do_run_migrations))
+    asyncio.run(run_async_migrations())
 
 
 if context.is_offline_mode():
@@ -0,0 +1,42 @@
+"""revoked_tokens: full-length jti, timezone-aware timestamps, expires_at
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 02:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('revoked_tokens') as batch:
+        # uuid4 в jti - 36 символов
+        batch.alter_column('jti', type_=sa.String(length=36), existing_type=sa.String(length=30),
+                           existing_nullable=False)
+        # Наивные значения писались в UTC - не даём Postgres трактовать их в часовом поясе сессии
+        batch.alter_column('revoked_at', type_=sa.DateTime(timezone=True), existing_type=sa.DateTime(),
+                           existing_nullable=True, postgresql_using="revoked_at AT TIME ZONE 'UTC'")
+        batch.add_column(sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+        batch.create_index('ix_revoked_tokens_expires_at', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('revoked_tokens') as batch:
+        batch.drop_index('ix_revoked_tokens_expires_at')
+        batch.drop_column('expires_at')
+        batch.alter_column('revoked_at', type_=sa.DateTime(), existing_type=sa.DateTime(timezone=True),
+                           existing_nullable=True, postgresql_using="revoked_at AT TIME ZONE 'UTC'")
+        batch.alter_column('jti', type_=sa.String(length=30), existing_type=sa.String(length=36),
+                           existing_nullable=False)
@@ -0,0 +1,34 @@
+"""users: lower() indexes for prefix search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 02:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ['username', 'email', 'first_name', 'last_name']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IF NOT EXISTS: раньше эти индексы создавались при старте приложения
+    ops = ' text_pattern_ops' if op.get_context().dialect.name == 'postgresql' else ''
+    for column in COLUMNS:
+        op.execute(sa.text(f'CREATE INDEX IF NOT EXISTS ix_users_{column}_lower ON users (lower({column}){ops})'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in COLUMNS:
+        op.drop_index(f'ix_users_{column}_lower', table_name='users')
@@ -0,0 +1,45 @@
+"""audit_events
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 02:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'audit_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('event', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('ip', sa.String(length=45), nullable=True),
+        sa.Column('detail', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_audit_events_occurred_at', 'audit_events', ['occurred_at'])
+    op.create_index('ix_audit_events_event', 'audit_events', ['event'])
+    op.create_index('ix_audit_events_user_id', 'audit_events', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_events_user_id', table_name='audit_events')
+    op.drop_index('ix_audit_events_event', table_name='audit_events')
+    op.drop_index('ix_audit_events_occurred_at', table_name='audit_events')
+    op.drop_table('audit_events')
@@ -0,0 +1,31 @@
+"""users: last_login_at, last_seen_at
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 03:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Без batch, как и в 0004: иначе SQLite потеряет индексы по выражениям
+    op.drop_column('users', 'last_seen_at')
+    op.drop_column('users', 'last_login_at')
@@ -0,0 +1,20 @@
+from sqlalchemy import JSON, BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.backend.db import Base
+
+
+class AuditEvent(Base):
+    __tablename__ = 'audit_events'
+
+    # В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    occurred_at = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    event: Mapped[str] = mapped_column(String(32), index=True)
+    # Чей аккаунт затронут и кто действовал (админ для смены прав; совпадает для входа и выхода)
+    user_id: Mapped[int | None] = mapped_column(Integer, index=True)
+    actor_id: Mapped[int | None] = mapped_column(Integer)
+    # Для неудачных входов - введённое имя, пользователя с ним может и не быть
+    username: Mapped[str | None] = mapped_column(String(255))
+    ip: Mapped[str | None] = mapped_column(String(45))
+    detail = mapped_column(JSON(none_as_null=True), nullable=True)
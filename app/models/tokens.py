@@ -8,7 +8,10 @@ from app.backend.db import Base
 class RevokedToken(Base):
     __tablename__ = 'revoked_tokens'
 
-    jti: Mapped[str] = mapped_column(String(30), primary_key=True)
-    revoked_at = mapped_column(DateTime, default=datetime.now(timezone.utc))
+    jti: Mapped[str] = mapped_column(String(36), primary_key=True)
+    # По нему RevocationIndex.sync дочитывает новые отзывы
+    revoked_at = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     user_id: Mapped[int] = mapped_column(Integer)
+    # Когда истекает сам refresh-токен: после этого строка больше ничего не блокирует
+    expires_at = mapped_column(DateTime(timezone=True), nullable=True, index=True)
 
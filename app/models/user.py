@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import DateTime, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.backend.db import Base
@@ -26,6 +26,26 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(default=True)
     is_admin: Mapped[bool] = mapped_column(default=False)
     is_verified: Mapped[bool] = mapped_column(default=False)
+    # Увеличивается при "выйти везде", деактивации и смене прав - все выданные токены перестают действовать
+    token_version: Mapped[int] = mapped_column(default=0, server_default='0')
+    # Пишутся пачками из app.backend.activity и могут отставать на ACTIVITY_FLUSH_INTERVAL
+    last_login_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_seen_at = mapped_column(DateTime(timezone=True), nullable=True)
 
     def __repr__(self):
         return f'<User(id={self.id}, username={self.username}, email={self.email})>'
+
+
+def _lower_index(column) -> Index:
+    # Поиск по префиксу без учёта регистра; на Postgres text_pattern_ops,
+    # чтобы LIKE 'abc%' шёл по индексу при любой локали базы
+    label = f'{column.key}_lower'
+    return Index(f'ix_users_{label}', func.lower(column).label(label), postgresql_ops={label: 'text_pattern_ops'})
+
+
+SEARCH_INDEXES = [
+    _lower_index(User.username),
+    _lower_index(User.email),
+    _lower_index(User.first_name),
+    _lower_index(User.last_name),
+]
@@ -1,48 +1,103 @@
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Optional
+import hmac
+import logging
+import os
 import uuid
 
 import jwt
-from fastapi import APIRouter, status, Depends, HTTPException, Response
+from fastapi import APIRouter, BackgroundTasks, status, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
-from sqlalchemy import insert, select
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm.sync import update
 
-from app.backend.db_depends import get_db
+from app.backend import audit
+from app.backend.audit import audit_log
+from app.backend.activity import activity
+from app.backend import invalidation
+from app.backend.invalidation import invalidation_bus
+from app.backend.db import async_session_maker
+from app.backend.db_depends import (
+    get_db, get_read_db, scalar_read_your_writes, RecentWrites, READ_YOUR_WRITES_WINDOW, READ_YOUR_WRITES_SIZE
+)
+from app.backend.metrics import LOGIN_SUCCESS, login_failed
+from app.backend.queries import user_by_username, revoked_token_by_jti
+from app.backend.keys import encode_token, decode_token
+from app.backend.hashing import (
+    hash_password,
+    verify_password,
+    verify_dummy_password,
+    needs_rehash,
+    PasswordHashingOverloaded,
+)
+from app.backend.principal_cache import principal_cache, UserPrincipal
+from app.backend.responses import ORJSONResponse
+from app.backend.revocation import revocation_index
+from app.backend.throttling import login_throttle, client_ip, LoginThrottled
+from app.backend.token_cache import token_cache
+from app.backend.token_versions import token_versions
 from app.models.user import User
 from app.models.tokens import RevokedToken
-from app.schemas import CreateUser
-
-SECRET_KEY = '30ee8e1faadb9974647186858ad7eedab17d859ae2180c6c3da1a4781bb13c62'
-ALGORITHM = 'HS256'
+from app.schemas import (
+    CreateUser,
+    CreateUserResponse,
+    CurrentUserResponse,
+    IntrospectRequest,
+    IntrospectResponse,
+    MessageResponse,
+    RefreshResponse,
+    TokenResponse,
+)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 20
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+INTROSPECT_MAX_TOKENS = int(os.getenv('INTROSPECT_MAX_TOKENS', 100))
+# Секреты ресурсных серверов для /auth/introspect через запятую; без них проверять токены может только админ
+INTROSPECT_CLIENT_SECRETS = [secret for secret in os.getenv('INTROSPECT_CLIENT_SECRETS', '').split(',') if secret]
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+logger = logging.getLogger(__name__)
+
+# Логины, которые этот воркер только что создал: их строки может ещё не быть на реплике
+recent_signups = RecentWrites(READ_YOUR_WRITES_WINDOW, READ_YOUR_WRITES_SIZE)
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=CreateUserResponse)
 async def create_user(
+        request: Request,
         db: Annotated[AsyncSession, Depends(get_db)],
         create_user: CreateUser
 ):
-    # Сначала проверяем существование пользователя
-    existing_user = await db.execute(
-        select(User).where(
-            (User.username == create_user.username) |
-            (User.email == create_user.email)
+    # Уникальность проверяет сама БД: вставка одной командой, без гонки между SELECT и INSERT
+    hashed_password = await hash_password(create_user.password)
+    try:
+        user_id = await db.scalar(
+            insert(User).values(
+                first_name=create_user.first_name,
+                last_name=create_user.last_name,
+                username=create_user.username,
+                email=create_user.email,
+                hashed_password=hashed_password
+            ).returning(User.id)
         )
-    )
-    existing_user = existing_user.scalar_one_or_none()
-
-    if existing_user:
-        if existing_user.username == create_user.username:
+        await db.commit()
+        recent_signups.add(create_user.username)
+        # Новый пользователь скоро придёт за refresh - кладём его сразу
+        principal_cache.put(UserPrincipal(user_id, create_user.username, True, False, False, 0))
+    except IntegrityError:
+        await db.rollback()
+        # Только на пути ошибки: выясняем, какое поле занято
+        taken = (await db.scalars(
+            select(User.username).where(
+                (User.username == create_user.username) |
+                (User.email == create_user.email)
+            )
+        )).all()
+        if create_user.username in taken or not taken:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
@@ -53,160 +108,246 @@ async def create_user(
                     }
                 }
             )
-        elif existing_user.email == create_user.email:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail={
-                    "error": {
-                        "code": "user_already_exists",
-                        "message": "Пользователь с указанным email уже зарегистрирован.",
-                        "target": "email"
-                    }
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "error": {
+                    "code": "user_already_exists",
+                    "message": "Пользователь с указанным email уже зарегистрирован.",
+                    "target": "email"
                 }
-            )
-
-    # Создаем пользователя
-    result = await db.execute(
-        insert(User).values(
-            first_name=create_user.first_name,
-            last_name=create_user.last_name,
-            username=create_user.username,
-            email=create_user.email,
-            hashed_password=bcrypt_context.hash(create_user.password)
+            }
         )
-    )
-    await db.commit()
 
+    audit_log.record(audit.SIGNUP, user_id=user_id, username=create_user.username, ip=client_ip(request))
     return {
         'status_code': status.HTTP_201_CREATED,
         'transaction': 'Successful',
-        'user_id': result.inserted_primary_key[0] if result.inserted_primary_key else None
+        'user_id': user_id
     }
 
 
-async def authenticate_user(db: Annotated[AsyncSession, Depends(get_db)], username: str, password: str):
-    user = await db.scalar(select(User).where(User.username == username))
-    if not user or not bcrypt_context.verify(password, user.hashed_password):
+async def authenticate_user(db: Annotated[AsyncSession, Depends(get_read_db)], username: str, password: str,
+                            ip: str | None = None):
+    # На primary идём только за теми, кто только что зарегистрировался здесь же:
+    # иначе каждый неизвестный логин стоил бы второго запроса к основной базе
+    if username in recent_signups:
+        user = await scalar_read_your_writes(db, user_by_username(username))
+    else:
+        user = await db.scalar(user_by_username(username))
+    try:
+        if user:
+            password_ok = await verify_password(password, user.hashed_password)
+        else:
+            # Та же стоимость, что и для существующего пользователя - без утечки по времени ответа
+            password_ok = await verify_dummy_password(password)
+    except PasswordHashingOverloaded:
+        login_failed('overloaded')
+        raise
+
+    if not user:
+        failure_reason = 'unknown_user'
+    elif not password_ok:
+        failure_reason = 'invalid_password'
+    else:
+        # Деактивированному - тот же ответ, что и при неверном пароле
+        failure_reason = None if user.is_active else 'inactive'
+
+    if failure_reason:
+        login_failed(failure_reason)
+        audit_log.record(audit.LOGIN_FAILED, user_id=user.id if user else None, username=username, ip=ip,
+                         reason=failure_reason)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Invalid authentication credentials',
             headers={"WWW-Authenticate": "Bearer"},
         )
+    LOGIN_SUCCESS.inc()
     return user
 
 
-async def create_access_token(username: str, user_id: int, is_admin: bool, is_verified: bool, expires_delta: timedelta):
+async def rehash_user_password(user_id: int, password: str, old_hash: str):
+    # Запускается после ответа на логин: пароль перехешируется с текущими параметрами
+    try:
+        new_hash = await hash_password(password)
+    except PasswordHashingOverloaded:
+        # Попробуем при следующем логине
+        return
+
+    async with async_session_maker() as db:
+        # Условие по старому хешу не даёт затереть пароль, сменённый параллельно
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+    logger.info(f'Rehashed password for user {user_id}')
+
+
+async def create_access_token(username: str, user_id: int, is_admin: bool, is_verified: bool, expires_delta: timedelta,
+                              token_version: int = 0):
     payload = {
         'sub': username,
         'id': user_id,
         'is_admin': is_admin,
         'is_verified': is_verified,
+        'ver': token_version,
         'exp': datetime.now(timezone.utc) + expires_delta
     }
 
     payload['exp'] = int(payload['exp'].timestamp())
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return encode_token(payload)
 
 
-async def create_refresh_token(username: str, user_id: int, expires_delta: timedelta):
+async def create_refresh_token(username: str, user_id: int, expires_delta: timedelta, token_version: int = 0):
     payload = {
         'sub': username,
         'id': user_id,
         'jti': str(uuid.uuid4()),
         'type': 'refresh',
+        'ver': token_version,
         'exp': datetime.now(timezone.utc) + expires_delta
     }
     payload['exp'] = int(payload['exp'].timestamp())
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return encode_token(payload)
 
 
-@router.post('/token')
-async def login(db: Annotated[AsyncSession, Depends(get_db)],
-                form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
-    user = await authenticate_user(db, form_data.username, form_data.password)
+@router.post('/token', response_model=TokenResponse)
+async def login(request: Request,
+                db: Annotated[AsyncSession, Depends(get_read_db)],
+                form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+                background_tasks: BackgroundTasks):
+    # Лимиты проверяются до хеширования: отказ не тратит CPU на bcrypt
+    ip = client_ip(request)
+    try:
+        await login_throttle.check(form_data.username, ip)
+    except LoginThrottled:
+        login_failed('throttled')
+        audit_log.record(audit.LOGIN_FAILED, username=form_data.username, ip=ip, reason='throttled')
+        raise
+
+    user = await authenticate_user(db, form_data.username, form_data.password, ip)
+    await login_throttle.reset(form_data.username)
+    audit_log.record(audit.LOGIN, user_id=user.id, actor_id=user.id, username=user.username, ip=ip)
+    activity.login(user.id)
+    if needs_rehash(user.hashed_password):
+        background_tasks.add_task(rehash_user_password, user.id, form_data.password, user.hashed_password)
 
     access_token = await create_access_token(
         user.username,
         user.id,
         user.is_admin,
         user.is_verified,
-        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        token_version=user.token_version
     )
 
     refresh_token = await create_refresh_token(
         user.username,
         user.id,
-        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        token_version=user.token_version
     )
 
-    return {
+    # Горячие ручки отдают готовый ответ: response_model остаётся для схемы OpenAPI,
+    # а повторная валидация и jsonable_encoder для собранного здесь же словаря не нужны
+    return ORJSONResponse({
         'access_token': access_token,
         'refresh_token': refresh_token,
         'token_type': 'bearer'
-    }
+    })
 
 
-@router.post('/refresh', status_code=status.HTTP_201_CREATED)
-async def refresh_token(refresh_token: str, db: Annotated[AsyncSession, Depends(get_db)]):
+def decode_refresh_token(refresh_token: str) -> dict:
     try:
-        payload: dict = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-
-        if payload.get('type') != 'refresh':
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Invalid token type'
-            )
+        payload: dict = decode_token(refresh_token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Refresh token expired'
+        )
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Invalid refresh token'
+        )
 
-        current_time = datetime.now(timezone.utc).timestamp()
-        if payload['exp'] < current_time:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Refresh token expired'
-            )
+    if payload.get('type') != 'refresh':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Invalid token type'
+        )
 
-        revoked_token = await db.scalar(
-            select(RevokedToken).where(RevokedToken.jti == payload['jti'])
+    current_time = datetime.now(timezone.utc).timestamp()
+    if payload['exp'] < current_time:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Refresh token expired'
         )
-        if revoked_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Token revoked'
-            )
+    return payload
 
-        user = await db.scalar(select(User).where(User.id == payload['id']))
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='User not found'
-            )
 
-        new_access_token = await create_access_token(
-            user.username,
-            user.id,
-            user.is_admin,
-            user.is_verified,
-            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+@router.post('/refresh', status_code=status.HTTP_201_CREATED, response_model=RefreshResponse)
+async def refresh_token(request: Request, refresh_token: str, db: Annotated[AsyncSession, Depends(get_read_db)]):
+    # С загруженным индексом отзывов и пользователем в principal_cache обходится без БД
+    payload = decode_refresh_token(refresh_token)
+
+    revoked_token = revocation_index.contains(payload['jti'])
+    if revoked_token is None:
+        # Индекс ещё не загружен или отключён
+        revoked_token = await db.scalar(revoked_token_by_jti(payload['jti']))
+    if revoked_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Token revoked'
         )
 
-        return {
-            'access_token': new_access_token,
-            'token_time': 'bearer'
-        }
-    except jwt.ExpiredSignatureError:
+    user = await principal_cache.get(payload['id'])
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Refresh token expired'
+            detail='User not found'
         )
-    except jwt.PyJWTError:
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Invalid refresh token'
+            detail='Inactive user'
+        )
+    # Сверяемся с новейшей известной версией: строка в кеше могла прийти с отстающей реплики
+    if payload.get('ver', 0) != token_versions.observe(user.id, user.token_version):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Token revoked'
         )
 
+    new_access_token = await create_access_token(
+        user.username,
+        user.id,
+        user.is_admin,
+        user.is_verified,
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        token_version=user.token_version
+    )
+
+    audit_log.record(audit.REFRESH, user_id=user.id, actor_id=user.id, username=user.username,
+                     ip=client_ip(request), jti=payload['jti'])
+    activity.seen(user.id)
+    return ORJSONResponse({
+        'access_token': new_access_token,
+        'token_time': 'bearer'
+    }, status_code=status.HTTP_201_CREATED)
+
+
+def _decode_access_token(token: str) -> tuple[dict, int]:
+    # Гейтвеи присылают один и тот же токен много раз подряд - не проверяем подпись повторно
+    cached = token_cache.get_versioned(token)
+    if cached is not None:
+        principal, version = cached
+        return dict(principal), version
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     try:
-        payload: dict = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload: dict = decode_token(token)
         username: str | None = payload.get('sub')
         user_id: int | None = payload.get('id')
         is_admin: bool | None = payload.get('is_admin')
@@ -237,12 +378,15 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
                 detail='Token expired!'
             )
 
-        return {
+        principal = {
             'username': username,
             'id': user_id,
             'is_admin': is_admin,
             'is_verified': is_verified,
         }
+        version = payload.get('ver', 0)
+        token_cache.put(token, principal, expire, version)
+        return dict(principal), version
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -260,25 +404,154 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         )
 
 
-@router.get('/read_current_user')
+async def verify_access_token(token: str) -> dict:
+    principal, version = _decode_access_token(token)
+    # Версия из кеша: "выйти везде" отзывает и access-токены, не дожидаясь их exp
+    if await token_versions.current(principal['id']) != version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Token revoked'
+        )
+    return principal
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    user = await verify_access_token(token)
+    activity.seen(user['id'])
+    return user
+
+
+async def get_admin_user(user: Annotated[dict, Depends(get_current_user)]):
+    if not user.get('is_admin'):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You don't have admin permission"
+        )
+    return user
+
+
+async def get_introspection_client(token: Annotated[str, Depends(oauth2_scheme)]) -> dict:
+    """Callers of /auth/introspect: a resource server with a shared secret, or an admin (RFC 7662, 2.1)."""
+    if any(hmac.compare_digest(token.encode(), secret.encode()) for secret in INTROSPECT_CLIENT_SECRETS):
+        return {'client': 'service'}
+    return await get_admin_user(await get_current_user(token))
+
+
+@router.get('/read_current_user', response_model=CurrentUserResponse)
 async def read_current_user(user: dict = Depends(get_current_user)):
-    return {'User': user}
+    return ORJSONResponse({'User': user})
+
 
+def _unverified_claims(token: str) -> dict:
+    # Только чтобы выбрать путь проверки - подпись проверяется дальше
+    try:
+        return jwt.decode(token, options={'verify_signature': False})
+    except jwt.PyJWTError:
+        return {}
 
-@router.post('/logout')
+
+@router.post('/introspect', response_model=IntrospectResponse, response_model_exclude_unset=True,
+             dependencies=[Depends(get_introspection_client)])
+async def introspect(request: IntrospectRequest, db: Annotated[AsyncSession, Depends(get_read_db)]):
+    """Validate a batch of access and refresh tokens in one call (RFC 7662 style).
+
+    Access tokens go through the same checks as ``get_current_user``; refresh
+    tokens through the refresh path. Token versions, revocations and user rows
+    of the whole batch are read in one query each.
+    """
+    if len(request.tokens) > INTROSPECT_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'At most {INTROSPECT_MAX_TOKENS} tokens per request'
+        )
+
+    results: list[dict] = []
+    access_principals: dict[int, tuple[dict, int, dict]] = {}
+    refresh_payloads: dict[int, dict] = {}
+    for position, item in enumerate(request.tokens):
+        claims = _unverified_claims(item.token)
+        results.append({'active': False})
+        try:
+            if claims.get('type') == 'refresh':
+                refresh_payloads[position] = decode_refresh_token(item.token)
+            else:
+                principal, version = _decode_access_token(item.token)
+                access_principals[position] = (principal, version, claims)
+        except HTTPException:
+            continue
+
+    if access_principals:
+        # Версии всех пользователей пачки - одним запросом, а не запросом на токен
+        versions = await token_versions.current_many(
+            principal['id'] for principal, _, _ in access_principals.values()
+        )
+        for position, (principal, version, claims) in access_principals.items():
+            if versions.get(principal['id']) != version:
+                continue
+            results[position] = {
+                'active': True,
+                'token_type': 'access_token',
+                'sub': principal['username'],
+                'username': principal['username'],
+                'user_id': principal['id'],
+                'is_admin': principal['is_admin'],
+                'is_verified': principal['is_verified'],
+                'exp': claims.get('exp'),
+            }
+
+    if refresh_payloads:
+        jtis = {payload['jti'] for payload in refresh_payloads.values()}
+        if revocation_index.loaded:
+            revoked = {jti for jti in jtis if revocation_index.contains(jti)}
+        else:
+            revoked = set(await db.scalars(select(RevokedToken.jti).where(RevokedToken.jti.in_(jtis))))
+
+        users = await principal_cache.get_many({payload['id'] for payload in refresh_payloads.values()})
+
+        for position, payload in refresh_payloads.items():
+            user = users.get(payload['id'])
+            if payload['jti'] in revoked or user is None or not user.is_active:
+                continue
+            if payload.get('ver', 0) != token_versions.observe(user.id, user.token_version):
+                continue
+            results[position] = {
+                'active': True,
+                'token_type': 'refresh_token',
+                'sub': user.username,
+                'username': user.username,
+                'user_id': user.id,
+                'is_admin': user.is_admin,
+                'is_verified': user.is_verified,
+                'exp': payload['exp'],
+                'jti': payload['jti'],
+            }
+
+    return {'results': results}
+
+
+@router.post('/logout', response_model=MessageResponse)
 async def logout(
+        request: Request,
         refresh_token: str,
         db: Annotated[AsyncSession, Depends(get_db)],
         get_user: dict = Depends(get_current_user)
 ):
     try:
-        payload: dict = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload: dict = decode_token(refresh_token)
+        expires_at = datetime.fromtimestamp(payload['exp'], timezone.utc)
 
         await db.execute(insert(RevokedToken).values(
             jti=payload['jti'],
-            user_id=get_user['id']
+            user_id=get_user['id'],
+            expires_at=expires_at
         ))
         await db.commit()
+        revocation_index.add(payload['jti'], expires_at=expires_at)
+        token_cache.invalidate_user(get_user['id'])
+        invalidation_bus.publish(invalidation.JTI_REVOKED, jti=payload['jti'], user_id=get_user['id'],
+                                 exp=payload['exp'])
+        audit_log.record(audit.LOGOUT, user_id=get_user['id'], actor_id=get_user['id'],
+                         username=get_user['username'], ip=client_ip(request), jti=payload['jti'])
 
         return {'message': 'Successfully logged out'}
 
@@ -287,3 +560,40 @@ async def logout(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Invalid token'
         )
+
+
+@router.post('/revoke-all', response_model=MessageResponse)
+async def revoke_all(
+        request: Request,
+        db: Annotated[AsyncSession, Depends(get_db)],
+        get_user: Annotated[dict, Depends(get_current_user)],
+        user_id: Optional[int] = None
+):
+    """Invalidate every access and refresh token of a user at once.
+
+    Without ``user_id`` it logs the caller out everywhere; admins may pass
+    the id of another user.
+    """
+    target_id = get_user['id'] if user_id is None else user_id
+    if target_id != get_user['id'] and not get_user.get('is_admin'):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You don't have admin permission"
+        )
+
+    version = await db.scalar(
+        update(User)
+        .where(User.id == target_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='User not found'
+        )
+    await db.commit()
+    token_versions.bumped(target_id, version)
+    audit_log.record(audit.REVOKE_ALL, user_id=target_id, actor_id=get_user['id'], ip=client_ip(request))
+
+    return {'message': 'Successfully logged out everywhere'}
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, status
+
+from app.backend.responses import ORJSONResponse
+from app.backend.startup import readiness
+from app.schemas import HealthResponse
+
+router = APIRouter(prefix='/health', tags=['health'])
+
+
+@router.get('/live', response_model=HealthResponse)
+async def live():
+    return ORJSONResponse({'status': 'ok'})
+
+
+@router.get('/ready', response_model=HealthResponse, responses={503: {'model': HealthResponse}})
+async def ready():
+    """200 once startup (schema check, pool, keys, warm-up) has finished, 503 before that and while stopping."""
+    # Ничего не проверяет по сети: healthcheck дёргает ручку часто, а пул уже открыт на старте
+    if not readiness.ready:
+        return ORJSONResponse({'status': 'starting'}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return ORJSONResponse({'status': 'ready', 'startup_seconds': readiness.startup_seconds})
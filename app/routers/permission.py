@@ -1,34 +1,54 @@
-from typing import Annotated
+import json
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.backend import audit
+from app.backend.audit import audit_log
+from app.backend.bulk_permissions import ACTIONS, BULK_PERMISSION_MAX_IDS, BulkPermissionUpdater
+from app.backend.db import async_session_maker
 from app.backend.db_depends import get_db
+from app.backend.queries import user_by_id
+from app.backend.throttling import client_ip
+from app.backend.token_versions import token_versions
 from app.models.user import User
-from app.routers.auth import get_current_user
+from app.routers.auth import get_admin_user, get_current_user
+from app.schemas import BulkPermissionRequest, BulkPermissionResponse, PermissionResponse
 
 router = APIRouter(prefix='/permission', tags=['permission'])
 
 
-@router.patch('/set-admin-permission')
-async def set_admin_permission(db: Annotated[AsyncSession, Depends(get_db)],
+@router.patch('/set-admin-permission', response_model=PermissionResponse)
+async def set_admin_permission(request: Request,
+                               db: Annotated[AsyncSession, Depends(get_db)],
                                get_user: Annotated[dict, Depends(get_current_user)], user_id: int):
     if get_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
+        # Условие в WHERE вместо отдельного SELECT: один запрос и нет гонки между проверкой и записью
+        version = await db.scalar(
+            update(User)
+            .where(User.id == user_id, User.is_active, User.is_admin.is_(False))
+            .values(is_admin=True, token_version=User.token_version + 1)
+            .returning(User.token_version)
+        )
+        if version is not None:
+            await db.commit()
+            token_versions.bumped(user_id, version)
+            audit_log.record(audit.ADMIN_GRANTED, user_id=user_id, actor_id=get_user['id'], ip=client_ip(request))
+            return {
+                'status_code': status.HTTP_200_OK,
+                'detail': 'User is now admin'
+            }
 
+        # Ничего не обновили - выясняем почему
+        user = await db.scalar(user_by_id(user_id))
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='User not found'
             )
-        if not user.is_admin:
-            await db.execute(update(User).where(User.id == user_id).values(is_admin=True))
-            await db.commit()
-            return {
-                'status_code': status.HTTP_200_OK,
-                'detail': 'User is now admin'
-            }
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='User is already admin'
@@ -40,23 +60,32 @@ async def set_admin_permission(db: Annotated[AsyncSession, Depends(get_db)],
         )
 
 
-@router.patch('/revoke-admin-permission')
-async def revoke_admin_permission(db: Annotated[AsyncSession, Depends(get_db)],
+@router.patch('/revoke-admin-permission', response_model=PermissionResponse)
+async def revoke_admin_permission(request: Request,
+                                  db: Annotated[AsyncSession, Depends(get_db)],
                                   get_user: Annotated[dict, Depends(get_current_user)], user_id: int):
     if get_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='User not found'
-            )
-        if user.is_admin:
-            await db.execute(update(User).where(User.id == user_id).values(is_admin=False))
+        version = await db.scalar(
+            update(User)
+            .where(User.id == user_id, User.is_active, User.is_admin)
+            .values(is_admin=False, token_version=User.token_version + 1)
+            .returning(User.token_version)
+        )
+        if version is not None:
             await db.commit()
+            token_versions.bumped(user_id, version)
+            audit_log.record(audit.ADMIN_REVOKED, user_id=user_id, actor_id=get_user['id'], ip=client_ip(request))
             return {
                 'status_code': status.HTTP_200_OK,
                 'detail': 'User is not now admin'
             }
+
+        user = await db.scalar(user_by_id(user_id))
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='User not found'
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='User is already not admin'
@@ -68,38 +97,84 @@ async def revoke_admin_permission(db: Annotated[AsyncSession, Depends(get_db)],
         )
 
 
-@router.delete('/delete')
-async def delete_user(db: Annotated[AsyncSession, Depends(get_db)],
+@router.delete('/delete', response_model=PermissionResponse)
+async def delete_user(request: Request,
+                      db: Annotated[AsyncSession, Depends(get_db)],
                       get_user: Annotated[dict, Depends(get_current_user)], user_id: int):
     if get_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
+        version = await db.scalar(
+            update(User)
+            .where(User.id == user_id, User.is_active, User.is_admin.is_(False))
+            .values(is_active=False, token_version=User.token_version + 1)
+            .returning(User.token_version)
+        )
+        if version is not None:
+            await db.commit()
+            token_versions.bumped(user_id, version)
+            audit_log.record(audit.USER_DELETED, user_id=user_id, actor_id=get_user['id'], ip=client_ip(request))
+            return {
+                'status_code': status.HTTP_200_OK,
+                'detail': 'User is deleted'
+            }
 
+        user = await db.scalar(user_by_id(user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='User not found'
             )
-
         if user.is_admin:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You can't delete admin user"
             )
-
-        if user.is_active:
-            await db.execute(update(User).where(User.id == user_id).values(is_active=False))
-            await db.commit()
-            return {
-                'status_code': status.HTTP_200_OK,
-                'detail': 'User is deleted'
-            }
-        else:
-            return {
-                'status_code': status.HTTP_200_OK,
-                'detail': 'User has already been deleted'
-            }
+        return {
+            'status_code': status.HTTP_200_OK,
+            'detail': 'User has already been deleted'
+        }
     else:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="You don't have admin permission"
         )
+
+
+def _bulk_chunks(updater: BulkPermissionUpdater, request: BulkPermissionRequest):
+    if request.user_ids is not None:
+        return updater.run_ids(request.user_ids)
+    return updater.run_filter(request.filter)
+
+
+async def _stream_bulk(action: str, request: BulkPermissionRequest, actor_id: int):
+    # Сессия из зависимости закрывается до отправки тела ответа - открываем свою
+    async with async_session_maker() as db:
+        updater = BulkPermissionUpdater(db, ACTIONS[action], actor_id=actor_id)
+        async for results in _bulk_chunks(updater, request):
+            yield b''.join(json.dumps(result).encode() + b'\n' for result in results)
+        yield json.dumps({'summary': updater.summary}).encode() + b'\n'
+
+
+@router.post('/bulk/{action}', response_model=BulkPermissionResponse)
+async def bulk_permission(action: Literal['set-admin-permission', 'revoke-admin-permission', 'delete'],
+                          request: BulkPermissionRequest,
+                          db: Annotated[AsyncSession, Depends(get_db)],
+                          admin: Annotated[dict, Depends(get_admin_user)],
+                          stream: bool = False):
+    """Apply a permission change to a list of ids or to every user matching a filter.
+
+    Each id gets one of ``changed``, ``already``, ``not_found`` or
+    ``forbidden_admin``. With ``stream=true`` results are sent as NDJSON
+    after every committed chunk, followed by a summary line.
+    """
+    if request.user_ids is not None and len(request.user_ids) > BULK_PERMISSION_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'At most {BULK_PERMISSION_MAX_IDS} user ids per request'
+        )
+
+    if stream:
+        return StreamingResponse(_stream_bulk(action, request, admin['id']), media_type='application/x-ndjson')
+
+    updater = BulkPermissionUpdater(db, ACTIONS[action], actor_id=admin['id'])
+    results = [result async for chunk in _bulk_chunks(updater, request) for result in chunk]
+    return {'results': results, 'summary': updater.summary}
@@ -0,0 +1,47 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.backend.profiler import profiler
+from app.routers.auth import get_admin_user
+from app.schemas import ProfilerSettings, ProfilerStatus
+
+router = APIRouter(prefix='/admin/profiler', tags=['profiler'])
+
+
+@router.get('', response_model=ProfilerStatus)
+async def profiler_status(admin: Annotated[dict, Depends(get_admin_user)]):
+    return profiler.status()
+
+
+@router.post('', response_model=ProfilerStatus)
+async def arm_profiler(settings: ProfilerSettings, admin: Annotated[dict, Depends(get_admin_user)]):
+    """Profile the next ``requests`` requests of this worker, or with ``min_duration_ms`` only slow ones.
+
+    With several workers only the one that got this call is armed.
+    """
+    profiler.arm(settings.requests, settings.min_duration_ms, settings.path, settings.duration_seconds,
+                 settings.interval_ms)
+    return profiler.status()
+
+
+@router.delete('', response_model=ProfilerStatus)
+async def disarm_profiler(admin: Annotated[dict, Depends(get_admin_user)]):
+    profiler.disarm()
+    return profiler.status()
+
+
+@router.get('/profiles/{profile_id}', response_class=PlainTextResponse)
+async def download_profile(profile_id: int, admin: Annotated[dict, Depends(get_admin_user)]):
+    """Collapsed stacks of one profile, for flamegraph.pl or speedscope."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Profile not found'
+        )
+    return PlainTextResponse(
+        profiler.folded(profile),
+        headers={'Content-Disposition': f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -0,0 +1,75 @@
+import tempfile
+from datetime import datetime
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backend.db_depends import get_db, get_read_db
+from app.backend.user_import import UserImporter
+from app.backend.user_search import list_users, SearchNotSupported, USERS_PAGE_MAX, USERS_PAGE_SIZE
+from app.routers.auth import get_admin_user
+from app.schemas import UserFilter, UserListResponse
+
+router = APIRouter(prefix='/users', tags=['users'])
+
+# Отчёт больше этого размера уходит из памяти во временный файл
+IMPORT_REPORT_SPOOL_BYTES = 1024 * 1024
+
+
+def _read_report(report):
+    try:
+        while chunk := report.read(64 * 1024):
+            yield chunk
+    finally:
+        report.close()
+
+
+@router.get('', response_model=UserListResponse)
+async def get_users(db: Annotated[AsyncSession, Depends(get_read_db)],
+                    admin: Annotated[dict, Depends(get_admin_user)],
+                    q: str | None = None,
+                    field: Literal['username', 'email', 'name'] | None = None,
+                    match: Literal['prefix', 'contains'] = 'prefix',
+                    is_active: bool | None = None,
+                    is_admin: bool | None = None,
+                    is_verified: bool | None = None,
+                    inactive_since: datetime | None = None,
+                    after: int | None = None,
+                    limit: Annotated[int, Query(ge=1, le=USERS_PAGE_MAX)] = USERS_PAGE_SIZE):
+    """List users page by page; pass ``next_cursor`` back as ``after`` for the next page.
+
+    ``q`` is a case-insensitive prefix of the username, email, first or last
+    name (or of one ``field``). ``inactive_since`` keeps users not seen since
+    then, or never.
+    """
+    user_filter = UserFilter(is_active=is_active, is_admin=is_admin, is_verified=is_verified,
+                             inactive_since=inactive_since)
+    try:
+        return await list_users(db, user_filter, q=q, field=field, match=match, after=after, limit=limit)
+    except SearchNotSupported as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+
+@router.post('/import')
+async def import_users(request: Request,
+                       db: Annotated[AsyncSession, Depends(get_db)],
+                       admin: Annotated[dict, Depends(get_admin_user)]):
+    """Bulk-create users from an NDJSON or CSV body of ``CreateUser`` records.
+
+    The body is consumed as a stream and inserted in batches. The response
+    is an NDJSON report with one line per input row and a final summary.
+    """
+    content_type = request.headers.get('content-type', '')
+    fmt = 'csv' if 'csv' in content_type else 'ndjson'
+
+    # Загрузка читается целиком до ответа: StreamingResponse слушает receive()
+    # в ожидании разрыва соединения и забрал бы у нас куски тела запроса
+    report = tempfile.SpooledTemporaryFile(max_size=IMPORT_REPORT_SPOOL_BYTES)
+    await UserImporter(db, report).run(request.stream(), fmt)
+    report.seek(0)
+    return StreamingResponse(_read_report(report), media_type='application/x-ndjson')
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from app.backend.keys import keyring, JWKS_MAX_AGE
+
+router = APIRouter(prefix='/.well-known', tags=['well-known'])
+
+
+@router.get('/jwks.json')
+async def jwks(response: Response):
+    # Сервисы проверяют токены сами по публичным ключам, без запроса в auth-service
+    response.headers['Cache-Control'] = f'public, max-age={JWKS_MAX_AGE}'
+    return keyring.jwks()
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, Field, EmailStr
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field, EmailStr, model_validator
 
 
 class CreateUser(BaseModel):
@@ -11,3 +14,159 @@ class CreateUser(BaseModel):
         description="Valid email address"
     )
     password: str
+
+
+class IntrospectToken(BaseModel):
+    token: str
+    token_type_hint: Literal['access_token', 'refresh_token'] | None = None
+
+
+class IntrospectRequest(BaseModel):
+    tokens: list[IntrospectToken]
+
+
+class UserFilter(BaseModel):
+    is_active: bool | None = None
+    is_admin: bool | None = None
+    is_verified: bool | None = None
+    username_prefix: str | None = None
+    email_domain: str | None = None
+    # Не заходившие с этого момента (или ни разу)
+    inactive_since: datetime | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        # Пустые строки фильтр не сужают - как и в filter_clauses
+        return all(value is None or value == '' for value in self.__dict__.values())
+
+
+class BulkPermissionRequest(BaseModel):
+    user_ids: list[int] | None = None
+    filter: UserFilter | None = None
+
+    @model_validator(mode='after')
+    def check_target(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError('Pass either user_ids or filter')
+        # Пустой фильтр означал бы "все пользователи"
+        if self.filter is not None and self.filter.is_empty:
+            raise ValueError('filter needs at least one criterion')
+        return self
+
+
+class CreateUserResponse(BaseModel):
+    status_code: int
+    transaction: str
+    user_id: int
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = 'bearer'
+
+
+class RefreshResponse(BaseModel):
+    access_token: str
+    # Опечатка исторически в контракте - клиенты уже читают это поле
+    token_time: str = 'bearer'
+
+
+class Principal(BaseModel):
+    username: str
+    id: int
+    is_admin: bool | None = None
+    is_verified: bool | None = None
+
+
+class CurrentUserResponse(BaseModel):
+    User: Principal
+
+
+class MessageResponse(BaseModel):
+    message: str
+
+
+class PermissionResponse(BaseModel):
+    status_code: int
+    detail: str
+
+
+class IntrospectResult(BaseModel):
+    active: bool
+    token_type: Literal['access_token', 'refresh_token'] | None = None
+    sub: str | None = None
+    username: str | None = None
+    user_id: int | None = None
+    is_admin: bool | None = None
+    is_verified: bool | None = None
+    exp: int | None = None
+    jti: str | None = None
+
+
+class IntrospectResponse(BaseModel):
+    results: list[IntrospectResult]
+
+
+class BulkPermissionResult(BaseModel):
+    user_id: int
+    outcome: Literal['changed', 'already', 'not_found', 'forbidden_admin']
+
+
+class BulkPermissionResponse(BaseModel):
+    results: list[BulkPermissionResult]
+    summary: dict[str, int]
+
+
+class UserListItem(BaseModel):
+    id: int
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    is_active: bool
+    is_admin: bool
+    is_verified: bool
+    last_login_at: datetime | None = None
+    last_seen_at: datetime | None = None
+
+
+class UserListResponse(BaseModel):
+    users: list[UserListItem]
+    next_cursor: int | None
+
+
+class HealthResponse(BaseModel):
+    status: str
+    startup_seconds: float | None = None
+
+
+class ProfilerSettings(BaseModel):
+    # Следующие N запросов, или с min_duration_ms - до N запросов медленнее порога
+    requests: int = Field(10, ge=1, le=1000)
+    min_duration_ms: float | None = Field(None, ge=0)
+    path: str | None = None
+    duration_seconds: float | None = Field(None, gt=0)
+    interval_ms: float | None = Field(None, ge=1, le=1000)
+
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    status: int
+    started_at: float
+    duration_ms: float
+    samples: int
+    timing: dict[str, dict[str, float]]
+
+
+class ProfilerStatus(BaseModel):
+    armed: bool
+    remaining: int
+    min_duration_ms: float | None
+    path: str | None
+    interval_ms: float
+    in_flight: int
+    discarded: int
+    profiles: list[ProfileSummary]
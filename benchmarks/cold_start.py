@@ -0,0 +1,131 @@
+"""Cold start: time from launching uvicorn to ready, and how fast the first requests are.
+
+Every run starts a fresh server process on a new SQLite database, polls
+``/health/ready`` and then times the first and second signup, login and
+``/auth/read_current_user``.  A first request much slower than the second
+is work that startup left for users to pay for::
+
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --runs 5 --no-warmup
+    python -m benchmarks.cold_start --schema-mode check
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PASSWORD = 'password123'
+
+
+def migrate(database_url: str):
+    from alembic import command
+    from alembic.config import Config
+
+    from app.backend.startup import MIGRATIONS_DIR
+
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS_DIR))
+    os.environ['DATABASE_URL'] = database_url
+    command.upgrade(config, 'head')
+
+
+async def timed(request) -> tuple[float, object]:
+    started = time.perf_counter()
+    response = await request
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000, response
+
+
+async def measure_run(args, run: int) -> dict:
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix='auth-cold-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f'sqlite+aiosqlite:///{workdir}/cold.db'
+    env['JWT_KEYS_DIR'] = os.path.join(workdir, 'keys')
+    env['DB_SCHEMA_MODE'] = args.schema_mode
+    env['STARTUP_WARMUP'] = '1' if args.warmup else '0'
+    env['LOGIN_THROTTLE_ENABLED'] = '0'
+    if args.hash_rounds:
+        env['PASSWORD_HASH_ROUNDS'] = str(args.hash_rounds)
+    if args.schema_mode == 'check':
+        await asyncio.to_thread(migrate, env['DATABASE_URL'])
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(args.port), '--log-level', 'warning'],
+        env=env, start_new_session=True,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f'server exited with code {server.returncode}')
+                try:
+                    if (await client.get('/health/ready')).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.01)
+            result = {'ready_ms': (time.perf_counter() - started) * 1000}
+
+            for attempt in ('first', 'second'):
+                username = f'cold{run}_{attempt}'
+                result[f'{attempt}_signup_ms'], _ = await timed(client.post('/auth/', json={
+                    'first_name': 'Cold', 'last_name': 'Start', 'username': username,
+                    'email': f'{username}@example.com', 'password': PASSWORD,
+                }))
+                result[f'{attempt}_login_ms'], response = await timed(
+                    client.post('/auth/token', data={'username': username, 'password': PASSWORD})
+                )
+                headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+                result[f'{attempt}_me_ms'], _ = await timed(client.get('/auth/read_current_user', headers=headers))
+            return result
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        try:
+            os.killpg(server.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+async def run(args) -> dict:
+    runs = [await measure_run(args, run) for run in range(args.runs)]
+    return {
+        'config': {'runs': args.runs, 'warmup': args.warmup, 'schema_mode': args.schema_mode,
+                   'hash_rounds': args.hash_rounds},
+        'median': {key: statistics.median(run[key] for run in runs) for key in runs[0]},
+        'runs': runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--no-warmup', dest='warmup', action='store_false', help='start with STARTUP_WARMUP=0')
+    parser.add_argument('--schema-mode', choices=['create', 'check'], default='create')
+    parser.add_argument('--hash-rounds', type=int, help='bcrypt cost for the server')
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    config = report['config']
+    print(f"cold start runs={config['runs']} warmup={config['warmup']} schema_mode={config['schema_mode']}")
+    for key, value in report['median'].items():
+        print(f'  {key:>18}: {value:9.1f} ms')
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
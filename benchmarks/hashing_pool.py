@@ -0,0 +1,103 @@
+"""Token-endpoint latency while logins saturate password hashing.
+
+Runs the app in-process against a throwaway SQLite database, keeps a steady
+probe of ``/auth/read_current_user`` going and reports its p50/p99 latency
+alone and under a burst of concurrent ``/auth/token`` logins.  Compare
+executors with::
+
+    python -m benchmarks.hashing_pool --executor inline
+    python -m benchmarks.hashing_pool --executor process
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe(client, headers: dict, stop: asyncio.Event, interval: float) -> list[float]:
+    # Latency is measured from the scheduled send time, so a stalled event loop
+    # shows up in the numbers instead of silently delaying the next probe.
+    samples = []
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        response = await client.get('/auth/read_current_user', headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - scheduled) * 1000)
+        scheduled += interval
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    return samples
+
+
+async def login_loop(client, credentials: dict, stop: asyncio.Event, counters: dict):
+    while not stop.is_set():
+        response = await client.post('/auth/token', data=credentials)
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+async def run(args):
+    import httpx
+    from asgi_lifespan import LifespanManager
+
+    from app.main import app
+
+    credentials = {'username': 'bench', 'password': 'password123'}
+    async with LifespanManager(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            await client.post('/auth/', json={
+                'first_name': 'Bench', 'last_name': 'User', 'username': 'bench',
+                'email': 'bench@example.com', 'password': 'password123',
+            })
+            token = (await client.post('/auth/token', data=credentials)).json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+
+            stop = asyncio.Event()
+            probe_task = asyncio.create_task(probe(client, headers, stop, args.interval))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            idle = await probe_task
+
+            stop = asyncio.Event()
+            counters: dict[int, int] = {}
+            logins = [asyncio.create_task(login_loop(client, credentials, stop, counters))
+                      for _ in range(args.logins)]
+            probe_task = asyncio.create_task(probe(client, headers, stop, args.interval))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            loaded = await probe_task
+            await asyncio.gather(*logins)
+
+    print(f'executor={args.executor} logins={args.logins} duration={args.duration}s')
+    for name, samples in (('idle', idle), ('under login load', loaded)):
+        print(f'  read_current_user {name:>16}: n={len(samples):5d} '
+              f'p50={statistics.median(samples):8.2f}ms p99={percentile(samples, 99):8.2f}ms')
+    print(f'  /auth/token responses: {dict(sorted(counters.items()))}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--executor', choices=['process', 'thread', 'inline'], default='process')
+    parser.add_argument('--logins', type=int, default=32, help='concurrent login loops')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per phase')
+    parser.add_argument('--interval', type=float, default=0.01, help='pause between probes')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='auth-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{workdir}/bench.db'
+    os.environ['PASSWORD_HASH_EXECUTOR'] = args.executor
+    os.environ.setdefault('JWT_KEYS_DIR', os.path.join(workdir, 'keys'))
+    # Все логины идут под одним пользователем - троттлинг превратил бы замер в замер 429
+    os.environ['LOGIN_THROTTLE_ENABLED'] = '0'
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
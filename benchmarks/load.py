@@ -0,0 +1,422 @@
+"""End-to-end throughput and latency under a realistic traffic mix.
+
+Drives the app with a weighted mix of signup, login, refresh,
+read_current_user, logout and permission changes, then reports requests
+per second, latency percentiles and server CPU per request for every
+operation.  The app runs in-process by default; ``--uvicorn`` starts real
+server processes and ``--url`` targets one that is already running::
+
+    python -m benchmarks.load --duration 30 --save-baseline bench.json
+    python -m benchmarks.load --duration 30 --compare bench.json
+    python -m benchmarks.load --uvicorn --workers 4 --database-url postgresql+asyncpg://...
+
+With ``--rate`` arrivals follow a fixed schedule (open loop) and latency
+is measured from the scheduled start, so a stalled server is not hidden
+by the load generator slowing down with it.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from benchmarks.hashing_pool import percentile
+
+PASSWORD = 'password123'
+DEFAULT_MIX = 'me=60,refresh=15,login=10,signup=5,logout=5,permission=5'
+OPERATIONS = ('signup', 'login', 'refresh', 'me', 'logout', 'permission')
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'unknown operation {name!r}, expected one of {OPERATIONS}')
+        mix[name] = float(weight)
+    return mix
+
+
+def process_tree_cpu(pid: int) -> float | None:
+    """User+system CPU seconds of ``pid`` and its live children (Linux /proc only)."""
+    try:
+        ticks = os.sysconf('SC_CLK_TCK')
+        stats = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as stat_file:
+                        fields = stat_file.read().rsplit(')', 1)[1].split()
+                except OSError:
+                    continue
+                stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+    except (OSError, ValueError):
+        return None
+
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += stats.get(current, (0, 0))[1]
+        pending.extend(child for child, (parent, _) in stats.items() if parent == current)
+    return total / ticks
+
+
+class Traffic:
+    """Shared state of the simulated clients: known users and live sessions."""
+
+    def __init__(self, client, admin_headers: dict | None, users: list[str], targets: list[int]):
+        self.client = client
+        self.admin_headers = admin_headers
+        self.users = users
+        self.targets = targets
+        self.sessions: list[dict] = []
+        self.signups = itertools.count()
+        self.run_id = int(time.time())
+        self.admin_flip = itertools.count()
+
+    async def signup(self):
+        username = f'load{self.run_id}_{next(self.signups)}'
+        response = await self.client.post('/auth/', json={
+            'first_name': 'Load', 'last_name': 'User', 'username': username,
+            'email': f'{username}@example.com', 'password': PASSWORD,
+        })
+        if response.status_code == 201:
+            self.users.append(username)
+        return response
+
+    async def login(self):
+        response = await self.client.post('/auth/token', data={'username': random.choice(self.users), 'password': PASSWORD})
+        if response.status_code == 200:
+            self.sessions.append(response.json())
+            if len(self.sessions) > 1000:
+                self.sessions.pop(0)
+        return response
+
+    async def refresh(self):
+        if not self.sessions:
+            return await self.login()
+        session = random.choice(self.sessions)
+        return await self.client.post('/auth/refresh', params={'refresh_token': session['refresh_token']})
+
+    async def me(self):
+        if not self.sessions:
+            return await self.login()
+        session = random.choice(self.sessions)
+        return await self.client.get('/auth/read_current_user',
+                                     headers={'Authorization': f"Bearer {session['access_token']}"})
+
+    async def logout(self):
+        if not self.sessions:
+            return await self.login()
+        session = self.sessions.pop(random.randrange(len(self.sessions)))
+        return await self.client.post('/auth/logout', params={'refresh_token': session['refresh_token']},
+                                      headers={'Authorization': f"Bearer {session['access_token']}"})
+
+    async def permission(self):
+        # Отдельные пользователи-цели: смена прав отзывает их токены и не портит сессии остальных
+        route = 'set-admin-permission' if next(self.admin_flip) % 2 == 0 else 'revoke-admin-permission'
+        return await self.client.patch(f'/permission/{route}', params={'user_id': random.choice(self.targets)},
+                                       headers=self.admin_headers)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[int, int]] = {}
+        self.recording = False
+
+    def add(self, operation: str, elapsed_ms: float, status: int):
+        if not self.recording:
+            return
+        self.latencies.setdefault(operation, []).append(elapsed_ms)
+        counts = self.statuses.setdefault(operation, {})
+        counts[status] = counts.get(status, 0) + 1
+
+
+async def execute(traffic: Traffic, recorder: Recorder, operation: str, started: float):
+    try:
+        response = await getattr(traffic, operation)()
+        status = response.status_code
+    except Exception:
+        status = 0
+    recorder.add(operation, (time.perf_counter() - started) * 1000, status)
+
+
+async def closed_loop(traffic: Traffic, recorder: Recorder, mix: dict, stop: asyncio.Event):
+    names, weights = list(mix), list(mix.values())
+    while not stop.is_set():
+        await execute(traffic, recorder, random.choices(names, weights)[0], time.perf_counter())
+
+
+async def open_loop(traffic: Traffic, recorder: Recorder, mix: dict, stop: asyncio.Event, rate: float, limit: int):
+    names, weights = list(mix), list(mix.values())
+    in_flight = set()
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        if len(in_flight) < limit:
+            task = asyncio.create_task(execute(traffic, recorder, random.choices(names, weights)[0], scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        else:
+            recorder.add('dropped', 0.0, 0)
+        scheduled += 1 / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    await asyncio.gather(*in_flight)
+
+
+async def seed(database_url: str, users: int, targets: int) -> tuple[str, list[str], list[int]]:
+    """Insert an admin and users straight into the database, sharing one password hash."""
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.backend.hashing import crypt_context
+    from app.models.user import User
+
+    # Префикс запуска: можно повторять прогоны на одной и той же базе
+    prefix = f'seed{int(time.time())}'
+    hashed = crypt_context.hash(PASSWORD)
+    rows = [
+        {'first_name': 'Seed', 'last_name': 'User', 'username': f'{prefix}_{i}', 'email': f'{prefix}_{i}@example.com',
+         'hashed_password': hashed, 'is_admin': i == 0}
+        for i in range(users + targets + 1)
+    ]
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(insert(User).returning(User.username, User.id), rows)
+            ids = dict(result.all())
+    finally:
+        await engine.dispose()
+    names = [f'{prefix}_{i}' for i in range(users + targets + 1)]
+    return names[0], names[1:users + 1], [ids[name] for name in names[users + 1:]]
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                if (await client.get('/openapi.json')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'server at {url} did not start')
+            await asyncio.sleep(0.2)
+
+
+@asynccontextmanager
+async def target(args):
+    """Yields ``(client, server pid or None, database url or None)``."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            yield client, None, None
+        return
+
+    if args.uvicorn:
+        port = args.port
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port),
+             '--workers', str(args.workers), '--log-level', 'warning'],
+            env=os.environ.copy(),
+            start_new_session=True,
+        )
+        try:
+            await wait_ready(f'http://127.0.0.1:{port}')
+            async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=60) as client:
+                yield client, server.pid, os.environ['DATABASE_URL']
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            # Процессы пула хеширования переживают воркеров при SIGTERM - добиваем всю группу
+            try:
+                os.killpg(server.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        return
+
+    from asgi_lifespan import LifespanManager
+
+    from app.main import app
+
+    async with LifespanManager(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=60) as client:
+            # В одном процессе с клиентом: CPU включает и генератор нагрузки
+            yield client, os.getpid(), os.environ['DATABASE_URL']
+
+
+async def run(args) -> dict:
+    async with target(args) as (client, server_pid, database_url):
+        if database_url:
+            admin, users, targets = await seed(database_url, args.users, args.targets)
+            login = await client.post('/auth/token', data={'username': admin, 'password': PASSWORD})
+            admin_headers = {'Authorization': f"Bearer {login.json()['access_token']}"}
+        else:
+            users, targets, admin_headers = [], [], None
+            for _ in range(args.users):
+                username = f'seed{int(time.time())}_{len(users)}'
+                await client.post('/auth/', json={
+                    'first_name': 'Load', 'last_name': 'User', 'username': username,
+                    'email': f'{username}@example.com', 'password': PASSWORD,
+                })
+                users.append(username)
+            if args.admin_username:
+                login = await client.post('/auth/token', data={'username': args.admin_username,
+                                                              'password': args.admin_password})
+                admin_headers = {'Authorization': f"Bearer {login.json()['access_token']}"}
+
+        mix = dict(args.mix)
+        if not admin_headers or not targets:
+            mix.pop('permission', None)
+
+        traffic = Traffic(client, admin_headers, users, targets)
+        recorder = Recorder()
+        stop = asyncio.Event()
+        if args.rate:
+            generators = [asyncio.create_task(open_loop(traffic, recorder, mix, stop, args.rate, args.concurrency))]
+        else:
+            generators = [asyncio.create_task(closed_loop(traffic, recorder, mix, stop))
+                          for _ in range(args.concurrency)]
+
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        cpu_before = process_tree_cpu(server_pid) if server_pid else None
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        cpu_after = process_tree_cpu(server_pid) if server_pid else None
+        recorder.recording = False
+        stop.set()
+        await asyncio.gather(*generators)
+
+    total = sum(len(samples) for name, samples in recorder.latencies.items() if name != 'dropped')
+    report = {
+        'config': {
+            'mode': 'url' if args.url else 'uvicorn' if args.uvicorn else 'in-process',
+            'mix': mix, 'concurrency': args.concurrency, 'rate': args.rate,
+            'duration': args.duration, 'workers': args.workers if args.uvicorn else 1,
+            'database': (database_url or args.url or '').split('@')[-1],
+        },
+        'total': {
+            'requests': total,
+            'rps': total / elapsed,
+            'cpu_ms_per_request': ((cpu_after - cpu_before) * 1000 / total)
+            if cpu_before is not None and cpu_after is not None and total else None,
+        },
+        'operations': {},
+    }
+    for name, samples in sorted(recorder.latencies.items()):
+        if name == 'dropped':
+            report['total']['dropped'] = len(samples)
+            continue
+        report['operations'][name] = {
+            'requests': len(samples),
+            'rps': len(samples) / elapsed,
+            'p50_ms': percentile(samples, 50),
+            'p90_ms': percentile(samples, 90),
+            'p99_ms': percentile(samples, 99),
+            'max_ms': max(samples),
+            'statuses': {str(status): count for status, count in sorted(recorder.statuses[name].items())},
+        }
+    return report
+
+
+def print_report(report: dict):
+    config, total = report['config'], report['total']
+    print(f"{config['mode']} concurrency={config['concurrency']} rate={config['rate']} "
+          f"duration={config['duration']}s database={config['database']}")
+    cpu = total['cpu_ms_per_request']
+    print(f"  total: {total['requests']} requests, {total['rps']:.1f} req/s"
+          + (f', {cpu:.2f} ms CPU/request' if cpu is not None else '')
+          + (f", {total['dropped']} dropped arrivals" if total.get('dropped') else ''))
+    for name, stats in report['operations'].items():
+        print(f"  {name:>10}: {stats['rps']:8.1f} req/s  p50={stats['p50_ms']:8.2f}ms  "
+              f"p90={stats['p90_ms']:8.2f}ms  p99={stats['p99_ms']:8.2f}ms  statuses={stats['statuses']}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Operations whose throughput dropped or p99 grew by more than ``tolerance``."""
+    regressions = []
+    for name, stats in report['operations'].items():
+        before = baseline['operations'].get(name)
+        if before is None:
+            continue
+        if stats['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['rps']:.1f} -> {stats['rps']:.1f} req/s")
+        if stats['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']:.2f} -> {stats['p99_ms']:.2f} ms")
+    before_cpu, cpu = baseline['total'].get('cpu_ms_per_request'), report['total']['cpu_ms_per_request']
+    if before_cpu and cpu and cpu > before_cpu * (1 + tolerance):
+        regressions.append(f'CPU per request {before_cpu:.2f} -> {cpu:.2f} ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'operation weights (default {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='simulated clients, or the in-flight cap with --rate')
+    parser.add_argument('--rate', type=float, help='open loop: requests per second on a fixed schedule')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before the run')
+    parser.add_argument('--users', type=int, default=200, help='users to seed before the run')
+    parser.add_argument('--targets', type=int, default=20, help='users reserved for permission changes')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the traffic mix')
+    parser.add_argument('--database-url', help='database for the app (default: a throwaway SQLite file)')
+    parser.add_argument('--uvicorn', action='store_true', help='run the app in uvicorn subprocesses')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers with --uvicorn')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='benchmark an already running server instead')
+    parser.add_argument('--admin-username', help='admin account for permission traffic with --url')
+    parser.add_argument('--admin-password')
+    parser.add_argument('--hash-rounds', type=int, help='bcrypt cost for the app under test')
+    parser.add_argument('--keep-throttle', action='store_true',
+                        help='leave login throttling on (all traffic comes from one address)')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--save-baseline', help='store the report as a baseline')
+    parser.add_argument('--compare', help='baseline to compare against; exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if not args.url:
+        workdir = tempfile.mkdtemp(prefix='auth-load-')
+        os.environ['DATABASE_URL'] = args.database_url or f'sqlite+aiosqlite:///{workdir}/load.db'
+        os.environ.setdefault('JWT_KEYS_DIR', os.path.join(workdir, 'keys'))
+        if not args.keep_throttle:
+            os.environ['LOGIN_THROTTLE_ENABLED'] = '0'
+        if args.hash_rounds:
+            os.environ['PASSWORD_HASH_ROUNDS'] = str(args.hash_rounds)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions beyond {args.tolerance:.0%} against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""Microbenchmarks for the token and password hashing primitives.
+
+Times ``create_access_token``, ``create_refresh_token``, signature checks
+as done by ``get_current_user`` (with and without the token cache),
+response rendering and password hash/verify at several costs, without HTTP
+or the database in the way.  Every case is warmed up, then timed in several rounds; the report
+gives per-call median, mean, stdev and min, plus the encoded token size::
+
+    python -m benchmarks.primitives --algorithms HS256,EdDSA,RS256 --bcrypt-rounds 10,12
+    python -m benchmarks.primitives --save-baseline primitives.json
+    python -m benchmarks.primitives --compare primitives.json --filter token
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+PASSWORD = 'password123'
+
+
+def run_coroutine(coroutine):
+    # Примитивы объявлены async, но ничего не ждут - гоняем корутину без event loop,
+    # чтобы не мерить накладные расходы планировщика
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError('benchmarked coroutine suspended')
+
+
+def measure(fn, repeat: int, min_time: float, warmup: float) -> dict:
+    """Per-call timings of ``fn`` in microseconds.
+
+    The number of calls per round grows until one round takes at least
+    ``min_time`` seconds, so fast and slow primitives get comparable
+    precision; statistics are over the per-round averages.
+    """
+    deadline = time.perf_counter() + warmup
+    while True:
+        fn()
+        if time.perf_counter() >= deadline:
+            break
+
+    # Как timeit.autorange: 1, 2, 5, 10, 20, 50... вызовов, пока раунд не станет достаточно длинным
+    for number in (step * 10 ** power for power in itertools.count() for step in (1, 2, 5)):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+
+    rounds = [elapsed / number * 1e6]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number * 1e6)
+
+    median = statistics.median(rounds)
+    return {
+        'calls_per_round': number,
+        'rounds': len(rounds),
+        'median_us': median,
+        'mean_us': statistics.fmean(rounds),
+        'stdev_us': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        'min_us': min(rounds),
+        'ops_per_sec': 1e6 / median,
+    }
+
+
+@contextmanager
+def signing_with(algorithm: str, keys_dir: str):
+    """Point the app's keyring at a fresh one for ``algorithm``."""
+    from app.backend import keys
+
+    original = keys.keyring
+    keys.keyring = keys.KeyRing(os.path.join(keys_dir, algorithm), algorithm, activation_delay=0)
+    keys.keyring.load()
+    try:
+        yield
+    finally:
+        keys.keyring = original
+
+
+@contextmanager
+def token_cache_enabled(enabled: bool):
+    from app.backend.token_cache import token_cache
+
+    original = token_cache.enabled
+    token_cache.enabled = enabled
+    token_cache.clear()
+    try:
+        yield
+    finally:
+        token_cache.enabled = original
+        token_cache.clear()
+
+
+def token_cases(algorithm: str):
+    """``(name, fn, extra)`` for every token primitive under one algorithm."""
+    from app.backend.keys import decode_token
+    from app.routers.auth import _decode_access_token, create_access_token, create_refresh_token
+
+    access_ttl, refresh_ttl = timedelta(minutes=20), timedelta(days=7)
+
+    def access():
+        return run_coroutine(create_access_token('bench', 1, False, True, access_ttl))
+
+    def refresh():
+        return run_coroutine(create_refresh_token('bench', 1, refresh_ttl))
+
+    access_token, refresh_token = access(), refresh()
+    yield f'create_access_token[{algorithm}]', access, {'token_bytes': len(access_token)}
+    yield f'create_refresh_token[{algorithm}]', refresh, {'token_bytes': len(refresh_token)}
+    yield f'decode_token[{algorithm}]', lambda: decode_token(access_token), {}
+    with token_cache_enabled(False):
+        yield f'verify_access_token[{algorithm}, uncached]', lambda: _decode_access_token(access_token), {}
+    with token_cache_enabled(True):
+        _decode_access_token(access_token)
+        yield f'verify_access_token[{algorithm}, cached]', lambda: _decode_access_token(access_token), {}
+
+
+def hashing_cases(scheme: str, rounds: int):
+    from app.backend.hashing import build_context, default_settings
+
+    context = build_context({**default_settings(), 'scheme': scheme, 'bcrypt_rounds': rounds})
+    hashed = context.hash(PASSWORD)
+    label = f'{scheme}, rounds={rounds}' if scheme == 'bcrypt' else scheme
+    yield f'hash_password[{label}]', lambda: context.hash(PASSWORD), {}
+    yield f'verify_password[{label}]', lambda: context.verify(PASSWORD, hashed), {}
+
+
+def serialization_cases():
+    """Rendering route results: an untyped dict through ``jsonable_encoder``
+    (how every route answered before response models), validation against the
+    route's response model, and a dict handed straight to ``ORJSONResponse``."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+
+    from app.routers.auth import router
+
+    fields = {route.path: route.response_field for route in router.routes}
+    principal = {'username': 'bench', 'id': 1, 'is_admin': False, 'is_verified': True}
+    payloads = {
+        'token': ('/auth/token', {'access_token': 'a' * 290, 'refresh_token': 'r' * 320, 'token_type': 'bearer'}),
+        'current_user': ('/auth/read_current_user', {'User': principal}),
+        'introspect': ('/auth/introspect', {'results': [
+            {'active': True, 'token_type': 'access_token', 'sub': 'bench', 'username': 'bench', 'user_id': 1,
+             'is_admin': False, 'is_verified': True, 'exp': 1_900_000_000},
+        ] * 100}),
+    }
+    for name, (path, payload) in payloads.items():
+        yield f'serialize[{name}, jsonable_encoder]', lambda payload=payload: JSONResponse(jsonable_encoder(payload)), {}
+        yield f'serialize[{name}, response_model]', lambda path=path, payload=payload: ORJSONResponse(run_coroutine(
+            serialize_response(field=fields[path], response_content=payload, exclude_unset=True)
+        )), {}
+        yield f'serialize[{name}, orjson]', lambda payload=payload: ORJSONResponse(payload), {}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    import cryptography
+    import jwt
+
+    keys_dir = tempfile.mkdtemp(prefix='auth-primitives-')
+    results = {}
+
+    def record(cases):
+        for name, fn, extra in cases:
+            if args.filter and not any(pattern in name for pattern in args.filter):
+                continue
+            results[name] = {**measure(fn, args.repeat, args.min_time, args.warmup), **extra}
+            if not args.quiet:
+                print_result(name, results[name])
+
+    for algorithm in args.algorithms:
+        with signing_with(algorithm, keys_dir):
+            record(token_cases(algorithm))
+    if args.serialization:
+        record(serialization_cases())
+    for rounds in args.bcrypt_rounds:
+        record(hashing_cases('bcrypt', rounds))
+    if args.argon2:
+        record(hashing_cases('argon2', 0))
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pyjwt': jwt.__version__,
+            'cryptography': cryptography.__version__,
+            'repeat': args.repeat,
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }
+
+
+def print_result(name: str, stats: dict):
+    size = f"  {stats['token_bytes']} bytes" if 'token_bytes' in stats else ''
+    print(f"{name:>45}: median={format_us(stats['median_us'])}  mean={format_us(stats['mean_us'])}"
+          f"  stdev={stats['stdev_us'] / stats['mean_us']:6.1%}  {stats['ops_per_sec']:10.0f} ops/s{size}")
+
+
+def format_us(value: float) -> str:
+    if value >= 1000:
+        return f'{value / 1000:8.2f}ms'
+    return f'{value:8.2f}us'
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Primitives whose median time grew by more than ``tolerance``."""
+    regressions = []
+    for name, stats in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if stats['median_us'] > before['median_us'] * (1 + tolerance):
+            regressions.append(f"{name}: {format_us(before['median_us']).strip()} -> "
+                               f"{format_us(stats['median_us']).strip()}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithms', type=lambda text: text.split(','), default=['HS256', 'EdDSA'],
+                        help='JWT algorithms to compare (HS256, EdDSA, RS256)')
+    parser.add_argument('--bcrypt-rounds', type=lambda text: [int(part) for part in text.split(',')],
+                        default=[10, 12], help='bcrypt costs to time')
+    parser.add_argument('--no-serialization', dest='serialization', action='store_false',
+                        help='skip response rendering cases')
+    parser.add_argument('--argon2', action='store_true', help='also time argon2 with the configured cost')
+    parser.add_argument('--filter', action='append', help='only cases whose name contains this (repeatable)')
+    parser.add_argument('--repeat', type=int, default=7, help='timed rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per round')
+    parser.add_argument('--warmup', type=float, default=0.2, help='untimed seconds before each case')
+    parser.add_argument('--quiet', action='store_true', help='print only the JSON report')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--save-baseline', help='store the report as a baseline')
+    parser.add_argument('--compare', help='baseline to compare against; exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative slowdown of the median')
+    args = parser.parse_args()
+
+    os.environ.setdefault('JWT_KEYS_DIR', tempfile.mkdtemp(prefix='auth-primitives-keys-'))
+    report = run(args)
+    if args.quiet:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr if args.quiet else sys.stdout)
+        if regressions:
+            sys.exit(1)
+        if not args.quiet:
+            print(f'No regressions beyond {args.tolerance:.0%} against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
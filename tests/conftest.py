@@ -0,0 +1,76 @@
+import asyncio
+import os
+import tempfile
+
+import httpx
+import pytest_asyncio
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Юнит-тесты не должны генерировать ключи подписи в рабочей копии
+os.environ.setdefault('JWT_KEYS_DIR', tempfile.mkdtemp(prefix='auth-test-keys-'))
+
+from app.backend.db import Base  # noqa: E402
+from app.backend.startup import MIGRATIONS_DIR  # noqa: E402
+from app.models import audit, tokens, user  # noqa: E402,F401 - регистрируют таблицы в Base.metadata
+
+
+@pytest_asyncio.fixture
+async def make_session_maker(tmp_path):
+    """Factory of session makers, each on its own SQLite file with every table created."""
+    engines = []
+
+    async def make(name: str = 'test') -> async_sessionmaker:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/{name}.db')
+        engines.append(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    yield make
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_maker(make_session_maker):
+    return await make_session_maker()
+
+
+@pytest_asyncio.fixture
+async def migrated_session_maker(tmp_path, monkeypatch):
+    """Session maker on a SQLite file built by ``alembic upgrade head`` instead of ``create_all``."""
+    url = f'sqlite+aiosqlite:///{tmp_path}/migrated.db'
+    # env.py берёт адрес базы из окружения и сам запускает event loop - поэтому отдельный поток
+    monkeypatch.setenv('DATABASE_URL', url)
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS_DIR))
+    await asyncio.to_thread(command.upgrade, config, 'head')
+    engine = create_async_engine(url)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(session_maker, monkeypatch):
+    """The whole application over ASGI, on the ``session_maker`` database and with cheap inline hashing."""
+    from app.backend import db_depends, hashing, principal_cache, token_cache, token_versions
+    from app.main import app
+    from app.routers import auth, permission
+
+    monkeypatch.setattr(hashing.hasher, 'executor', 'inline')
+    monkeypatch.setattr(hashing, 'crypt_context', hashing.build_context(
+        dict(hashing.default_settings(), bcrypt_rounds=4)
+    ))
+    monkeypatch.setattr(hashing, '_dummy_hash', None)
+    for module in (db_depends, principal_cache, token_versions, auth, permission):
+        for name in ('async_session_maker', 'async_read_session_maker'):
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, session_maker)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+    # Кеши - синглтоны процесса: следующий тест начинает с чистого листа
+    principal_cache.principal_cache.clear()
+    token_versions.token_versions.clear()
+    token_cache.token_cache.clear()
@@ -97,3 +97,21 @@ def test_duplicate_username(client):
     r2 = client.post("/auth/", json=user_data)
 
     assert r2.status_code in {400, 409, 422}
+
+
+def test_introspect_requires_authorization(client):
+    user_data = generate_random_user_data()
+    client.post("/auth/", json=user_data)
+    tokens = client.post("/auth/token", data={
+        "username": user_data["username"],
+        "password": user_data["password"],
+    }).json()
+    body = {"tokens": [{"token": tokens["access_token"]}]}
+
+    anonymous = client.post("/auth/introspect", json=body)
+    # Обычный пользователь не может проверять чужие (и свои) токены
+    as_user = client.post("/auth/introspect", json=body,
+                          headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+    assert anonymous.status_code == 401
+    assert as_user.status_code == 401
@@ -0,0 +1,122 @@
+# tests/unit/test_activity.py
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+
+from app.backend import activity as activity_module
+from app.backend.activity import ActivityTracker
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker, monkeypatch):
+    async with session_maker() as db:
+        await db.execute(insert(User), [
+            {'id': user_id, 'first_name': 'A', 'last_name': 'B', 'username': f'user{user_id}',
+             'email': f'user{user_id}@example.com', 'hashed_password': 'x'}
+            for user_id in (1, 2, 3)
+        ])
+        await db.commit()
+    monkeypatch.setattr(activity_module, 'async_session_maker', session_maker)
+    return session_maker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_800_000_000.0]
+    monkeypatch.setattr(activity_module.time, 'time', lambda: now[0])
+    return now
+
+
+async def activity_of(maker) -> dict[int, tuple]:
+    async with maker() as db:
+        rows = (await db.execute(select(User.id, User.last_login_at, User.last_seen_at))).all()
+    return {row.id: (_epoch(row.last_login_at), _epoch(row.last_seen_at)) for row in rows}
+
+
+def _epoch(value: datetime | None) -> float | None:
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else None
+
+
+def tracker(**kwargs) -> ActivityTracker:
+    return ActivityTracker(**{'flush_interval': 60, 'max_pending': 1000, 'chunk_size': 2, **kwargs})
+
+
+class TestActivityTracker:
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_latest_stamp_per_user(self, session_maker, clock):
+        activity = tracker()
+        activity.login(1)
+        clock[0] += 10
+        activity.seen(1)
+        activity.seen(2)
+        activity.seen(3)
+        await activity.flush()
+
+        start = 1_800_000_000.0
+        assert await activity_of(session_maker) == {
+            1: (start, start + 10),
+            2: (None, start + 10),
+            3: (None, start + 10),
+        }
+        assert activity.stats()['rows'] == 3
+        assert activity.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_older_stamp_does_not_overwrite_newer(self, session_maker, clock):
+        # Другой воркер успел записать более позднюю отметку
+        activity = tracker()
+        activity.login(1)
+        await activity.flush()
+        clock[0] -= 100
+        activity.login(1)
+        await activity.flush()
+
+        assert await activity_of(session_maker) == {
+            1: (1_800_000_000.0, 1_800_000_000.0), 2: (None, None), 3: (None, None),
+        }
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_stamps(self, session_maker, clock, monkeypatch):
+        activity = tracker()
+        activity.seen(1)
+        monkeypatch.setattr(activity_module, 'async_session_maker', None)
+        await activity.flush()
+
+        assert activity.write_failures == 1
+        assert activity.pending == 1
+
+        monkeypatch.setattr(activity_module, 'async_session_maker', session_maker)
+        await activity.flush()
+        assert (await activity_of(session_maker))[1] == (None, 1_800_000_000.0)
+
+    @pytest.mark.asyncio
+    async def test_many_pending_users_flush_early(self, session_maker):
+        activity = tracker(max_pending=2)
+        activity.start()
+        activity.seen(1)
+        activity.seen(2)
+        await asyncio.sleep(0.1)
+
+        assert activity.flushes == 1
+        await activity.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending(self, session_maker):
+        activity = tracker()
+        activity.start()
+        activity.login(3)
+        await activity.close()
+
+        assert (await activity_of(session_maker))[3][0] is not None
+
+    def test_disabled_tracker_records_nothing(self):
+        activity = tracker(enabled=False)
+        activity.login(1)
+        activity.seen(1)
+
+        assert activity.pending == 0
@@ -0,0 +1,109 @@
+# tests/unit/test_audit.py
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.backend import audit
+from app.backend.audit import AuditLog, insert_events
+from app.models.audit import AuditEvent
+
+
+class FakeSink:
+
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+        self.fail = False
+        self.closed = False
+
+    async def write(self, events: list[dict]):
+        if self.fail:
+            raise ConnectionError('sink is down')
+        self.batches.append(events)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def sink():
+    return FakeSink()
+
+
+class TestAuditLog:
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_without_waiting_for_interval(self, sink):
+        log = AuditLog(sink, capacity=100, batch_size=3, flush_interval=60)
+        log.start()
+        for user_id in range(3):
+            log.record(audit.LOGIN, user_id=user_id, ip='10.0.0.1')
+        await asyncio.sleep(0.05)
+
+        assert [[event['user_id'] for event in batch] for batch in sink.batches] == [[0, 1, 2]]
+        await log.close()
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_written_after_interval(self, sink):
+        log = AuditLog(sink, capacity=100, batch_size=100, flush_interval=0.05)
+        log.start()
+        log.record(audit.LOGOUT, user_id=1, jti='abc')
+        await asyncio.sleep(0.15)
+
+        assert len(sink.batches) == 1
+        assert sink.batches[0][0]['detail'] == {'jti': 'abc'}
+        await log.close()
+
+    def test_full_buffer_drops_events(self, sink):
+        log = AuditLog(sink, capacity=2, batch_size=10, flush_interval=60)
+        for user_id in range(5):
+            log.record(audit.LOGIN, user_id=user_id)
+
+        assert log.pending == 2
+        assert log.stats()['dropped_queue_full'] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_kept_for_next_flush(self, sink):
+        log = AuditLog(sink, capacity=10, batch_size=2, flush_interval=60)
+        for user_id in range(3):
+            log.record(audit.LOGIN, user_id=user_id)
+
+        sink.fail = True
+        await log.flush()
+        assert log.pending == 3
+        assert log.write_failures == 1
+
+        sink.fail = False
+        await log.flush()
+        assert [event['user_id'] for batch in sink.batches for event in batch] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_close_writes_pending_events(self, sink):
+        log = AuditLog(sink, capacity=100, batch_size=100, flush_interval=60)
+        log.start()
+        log.record(audit.SIGNUP, user_id=7, username='bob')
+        await log.close()
+
+        assert sink.batches[0][0]['username'] == 'bob'
+        assert sink.closed
+        assert log.pending == 0
+
+    def test_disabled_log_records_nothing(self, sink):
+        log = AuditLog(sink, capacity=100, batch_size=100, flush_interval=60, enabled=False)
+        log.record(audit.LOGIN, user_id=1)
+
+        assert log.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_insert_events_writes_batch_in_one_statement(session_maker):
+    log = AuditLog(FakeSink(), capacity=10, batch_size=10, flush_interval=60)
+    log.record(audit.LOGIN, user_id=1, ip='10.0.0.1')
+    log.record(audit.LOGIN_FAILED, username='eve', reason='bad_password')
+
+    async with session_maker() as db:
+        await db.execute(insert_events(list(log._buffer)))
+        rows = (await db.scalars(select(AuditEvent).order_by(AuditEvent.id))).all()
+
+    assert [row.event for row in rows] == [audit.LOGIN, audit.LOGIN_FAILED]
+    assert rows[1].detail == {'reason': 'bad_password'}
@@ -0,0 +1,50 @@
+# tests/unit/test_batching.py
+import asyncio
+
+import pytest
+
+from app.backend.batching import BatchFlusher
+
+
+class CountingFlusher(BatchFlusher):
+    def __init__(self, flush_interval: float, enabled: bool = True):
+        super().__init__(flush_interval, enabled)
+        self.flushes = 0
+
+    async def flush(self):
+        self.flushes += 1
+
+
+class TestBatchFlusher:
+
+    @pytest.mark.asyncio
+    async def test_wake_flushes_before_interval(self):
+        flusher = CountingFlusher(flush_interval=60)
+        flusher.start()
+        try:
+            flusher.wake()
+            await asyncio.sleep(0.05)
+
+            assert flusher.flushes == 1
+        finally:
+            await flusher.close()
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval_and_on_close(self):
+        flusher = CountingFlusher(flush_interval=0.02)
+        flusher.start()
+        await asyncio.sleep(0.1)
+        await flusher.close()
+
+        assert flusher.flushes >= 3
+        assert flusher._task is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_flusher_does_not_start(self):
+        flusher = CountingFlusher(flush_interval=0.01, enabled=False)
+        flusher.start()
+        flusher.wake()
+        await asyncio.sleep(0.03)
+
+        assert flusher._task is None
+        assert flusher.flushes == 0
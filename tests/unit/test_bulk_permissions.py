@@ -0,0 +1,77 @@
+# tests/unit/test_bulk_permissions.py
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from app.backend.bulk_permissions import ACTIONS, BulkPermissionUpdater
+from app.models.user import User
+from app.schemas import BulkPermissionRequest, UserFilter
+
+
+@pytest_asyncio.fixture
+async def db(session_maker):
+    async with session_maker() as session:
+        await session.execute(insert(User), [
+            {'id': 1, 'first_name': 'A', 'last_name': 'A', 'username': 'root', 'email': 'root@example.com',
+             'hashed_password': 'x', 'is_admin': True},
+            {'id': 2, 'first_name': 'B', 'last_name': 'B', 'username': 'bob', 'email': 'bob@corp.io',
+             'hashed_password': 'x'},
+            {'id': 3, 'first_name': 'C', 'last_name': 'C', 'username': 'carol', 'email': 'carol@corp.io',
+             'hashed_password': 'x', 'is_active': False},
+            {'id': 4, 'first_name': 'D', 'last_name': 'D', 'username': 'dave', 'email': 'dave@corp.io',
+             'hashed_password': 'x'},
+        ])
+        await session.commit()
+        yield session
+
+
+async def collect(chunks) -> list[dict]:
+    return [result async for chunk in chunks for result in chunk]
+
+
+class TestBulkPermissionUpdater:
+
+    @pytest.mark.asyncio
+    async def test_delete_reports_outcome_per_id(self, db):
+        updater = BulkPermissionUpdater(db, ACTIONS['delete'], chunk_size=2)
+
+        results = await collect(updater.run_ids([1, 2, 2, 3, 404]))
+
+        assert results == [
+            {'user_id': 1, 'outcome': 'forbidden_admin'},
+            {'user_id': 2, 'outcome': 'changed'},
+            {'user_id': 3, 'outcome': 'already'},
+            {'user_id': 404, 'outcome': 'not_found'},
+        ]
+        assert updater.summary == {'changed': 1, 'already': 1, 'not_found': 1, 'forbidden_admin': 1}
+        assert await db.scalar(select(User.is_active).where(User.id == 2)) is False
+
+    @pytest.mark.asyncio
+    async def test_set_admin_treats_inactive_as_not_found(self, db):
+        updater = BulkPermissionUpdater(db, ACTIONS['set-admin-permission'])
+
+        results = await collect(updater.run_ids([1, 3, 4]))
+
+        assert [result['outcome'] for result in results] == ['already', 'not_found', 'changed']
+        assert await db.scalar(select(User.is_admin).where(User.id == 4)) is True
+
+    @pytest.mark.asyncio
+    async def test_filter_walks_matching_users_in_chunks(self, db):
+        updater = BulkPermissionUpdater(db, ACTIONS['delete'], chunk_size=1)
+
+        results = await collect(updater.run_filter(UserFilter(email_domain='corp.io', is_active=True)))
+
+        assert results == [{'user_id': 2, 'outcome': 'changed'}, {'user_id': 4, 'outcome': 'changed'}]
+        assert await db.scalar(select(User.is_active).where(User.id == 1)) is True
+
+    @pytest.mark.asyncio
+    async def test_empty_filter_is_rejected(self, db):
+        for empty in ({}, {'username_prefix': '', 'is_admin': None}):
+            with pytest.raises(ValidationError, match='at least one criterion'):
+                BulkPermissionRequest.model_validate({'filter': empty})
+
+        updater = BulkPermissionUpdater(db, ACTIONS['delete'])
+        with pytest.raises(ValueError):
+            await collect(updater.run_filter(UserFilter()))
+        assert await db.scalar(select(User.is_active).where(User.id == 2)) is True
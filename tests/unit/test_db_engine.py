@@ -0,0 +1,142 @@
+# tests/unit/test_db_engine.py
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.backend import db_depends
+from app.backend.db import Base, InstrumentedPool, create_engine
+from app.backend.queries import user_by_username
+from app.models.user import User
+from app.routers import auth
+
+
+class TestEngineFactory:
+
+    @pytest.mark.asyncio
+    async def test_file_database_gets_instrumented_pool(self, tmp_path):
+        engine = create_engine(f'sqlite+aiosqlite:///{tmp_path}/pool.db')
+        waits = []
+        engine.pool.wait_observers.append(waits.append)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+                assert engine.pool.checkedout() == 1
+
+            assert isinstance(engine.pool, InstrumentedPool)
+            assert engine.pool.checkouts == 1
+            assert len(waits) == 1
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_in_memory_database_keeps_default_pool(self):
+        engine = create_engine('sqlite+aiosqlite:///:memory:')
+        try:
+            assert not isinstance(engine.pool, InstrumentedPool)
+        finally:
+            await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    # Два файла SQLite вместо основной базы и отстающей реплики
+    engines = [create_engine(f'sqlite+aiosqlite:///{tmp_path}/{name}.db') for name in ('primary', 'replica')]
+    makers = [async_sessionmaker(engine, expire_on_commit=False) for engine in engines]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User).values(
+                first_name='Old', last_name='User', username='old', email='old@example.com', hashed_password='x'
+            ))
+    async with makers[0]() as db:
+        await db.execute(insert(User).values(
+            first_name='New', last_name='User', username='new', email='new@example.com', hashed_password='x'
+        ))
+        await db.commit()
+
+    monkeypatch.setattr(db_depends, 'async_session_maker', makers[0])
+    yield makers
+    for engine in engines:
+        await engine.dispose()
+
+
+class TestReadYourWrites:
+
+    @pytest.mark.asyncio
+    async def test_row_on_replica_is_read_there(self, primary_and_replica):
+        primary, replica = primary_and_replica
+        async with replica() as read_db:
+            user = await db_depends.scalar_read_your_writes(read_db, user_by_username('old'))
+
+        assert user.username == 'old'
+
+    @pytest.mark.asyncio
+    async def test_row_missing_on_replica_falls_back_to_primary(self, primary_and_replica):
+        primary, replica = primary_and_replica
+        async with replica() as read_db:
+            assert await read_db.scalar(user_by_username('new')) is None
+            user = await db_depends.scalar_read_your_writes(read_db, user_by_username('new'))
+
+        assert user.username == 'new'
+
+    @pytest.mark.asyncio
+    async def test_missing_everywhere_is_none(self, primary_and_replica):
+        primary, replica = primary_and_replica
+        async with replica() as read_db:
+            assert await db_depends.scalar_read_your_writes(read_db, user_by_username('ghost')) is None
+
+    def test_recent_writes_expire(self):
+        assert 'new' in self._recent(60, 'new')
+        assert 'new' not in self._recent(0, 'new')
+        assert 'old' not in self._recent(60, 'new')
+
+    @staticmethod
+    def _recent(window: float, *keys) -> db_depends.RecentWrites:
+        recent = db_depends.RecentWrites(window, maxsize=10)
+        for key in keys:
+            recent.add(key)
+        return recent
+
+
+class TestLoginLookup:
+
+    @pytest_asyncio.fixture
+    async def replica(self, primary_and_replica, monkeypatch):
+        primary, replica = primary_and_replica
+        primary_reads = []
+        event.listen(primary.kw['bind'].sync_engine, 'before_cursor_execute',
+                     lambda *args: primary_reads.append(args[2]))
+
+        async def accept_any(password, hashed_password):
+            return True
+
+        async def reject(password):
+            return False
+
+        monkeypatch.setattr(auth, 'verify_password', accept_any)
+        monkeypatch.setattr(auth, 'verify_dummy_password', reject)
+        monkeypatch.setattr(auth, 'recent_signups', db_depends.RecentWrites(60, maxsize=10))
+        async with replica() as read_db:
+            yield read_db, primary_reads
+
+    @pytest.mark.asyncio
+    async def test_unknown_username_does_not_query_the_primary(self, replica):
+        read_db, primary_reads = replica
+
+        with pytest.raises(HTTPException) as exc_info:
+            await auth.authenticate_user(read_db, 'ghost', 'password')
+
+        assert exc_info.value.status_code == 401
+        assert primary_reads == []
+
+    @pytest.mark.asyncio
+    async def test_fresh_signup_is_read_from_the_primary(self, replica):
+        read_db, primary_reads = replica
+        auth.recent_signups.add('new')
+
+        user = await auth.authenticate_user(read_db, 'new', 'password')
+
+        assert user.username == 'new'
+        assert len(primary_reads) == 1
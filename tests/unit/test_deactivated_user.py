@@ -0,0 +1,111 @@
+# tests/unit/test_deactivated_user.py
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+
+from app.backend import hashing
+from app.backend import principal_cache as principal_cache_module
+from app.backend import token_versions as token_versions_module
+from app.backend.principal_cache import principal_cache
+from app.backend.token_versions import token_versions
+from app.models.user import User
+from app.routers.auth import authenticate_user, create_refresh_token, introspect, refresh_token
+from app.schemas import IntrospectRequest
+
+
+@pytest_asyncio.fixture
+async def db(session_maker, monkeypatch):
+    monkeypatch.setattr(hashing.hasher, 'executor', 'inline')
+    monkeypatch.setattr(hashing, 'crypt_context', hashing.build_context(
+        dict(hashing.default_settings(), bcrypt_rounds=4)
+    ))
+    monkeypatch.setattr(principal_cache_module, 'async_read_session_maker', session_maker)
+    monkeypatch.setattr(principal_cache_module, 'async_session_maker', session_maker)
+    monkeypatch.setattr(token_versions_module, 'async_read_session_maker', session_maker)
+    async with session_maker() as session:
+        await session.execute(insert(User).values(
+            id=1, first_name='A', last_name='B', username='alice', email='alice@example.com',
+            hashed_password=hashing.crypt_context.hash('password123'),
+        ))
+        await session.commit()
+        yield session
+    principal_cache.clear()
+    token_versions.clear()
+
+
+async def deactivate(db, user_id: int):
+    # То же, что делает /permission/delete
+    version = await db.scalar(
+        update(User).where(User.id == user_id)
+        .values(is_active=False, token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )
+    await db.commit()
+    token_versions.changed(user_id, version)
+
+
+class TestDeactivatedUser:
+
+    @pytest.mark.asyncio
+    async def test_cannot_log_in(self, db):
+        assert (await authenticate_user(db, 'alice', 'password123')).id == 1
+        await deactivate(db, 1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await authenticate_user(db, 'alice', 'password123')
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == 'Invalid authentication credentials'
+
+    @pytest.mark.asyncio
+    async def test_cannot_refresh(self, db):
+        token = await create_refresh_token('alice', 1, timedelta(days=1), token_version=0)
+        await principal_cache.get(1)
+        await deactivate(db, 1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await refresh_token(None, token, db)
+
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_inactive_user_cannot_refresh_a_current_token(self, db):
+        token = await create_refresh_token('alice', 1, timedelta(days=1), token_version=0)
+        await db.execute(update(User).where(User.id == 1).values(is_active=False))
+        await db.commit()
+        principal_cache.invalidate(1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await refresh_token(None, token, db)
+
+        assert exc_info.value.detail == 'Inactive user'
+
+    @pytest.mark.asyncio
+    async def test_refresh_checks_newest_known_version(self, db):
+        token = await create_refresh_token('alice', 1, timedelta(days=1), token_version=0)
+        await principal_cache.get(1)
+        # Этот воркер уже знает о bump, а в principal_cache - строка со старой версией
+        token_versions.observe(1, 1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await refresh_token(None, token, db)
+
+        assert exc_info.value.detail == 'Token revoked'
+
+    @pytest.mark.asyncio
+    async def test_introspect_rejects_inactive_user_and_stale_version(self, db):
+        current = await create_refresh_token('alice', 1, timedelta(days=1), token_version=0)
+        request = IntrospectRequest(tokens=[{'token': current}])
+        assert (await introspect(request, db))['results'][0]['active'] is True
+
+        token_versions.observe(1, 1)
+        assert (await introspect(request, db))['results'] == [{'active': False}]
+
+        token_versions.clear()
+        await db.execute(update(User).where(User.id == 1).values(is_active=False))
+        await db.commit()
+        principal_cache.invalidate(1)
+        assert (await introspect(request, db))['results'] == [{'active': False}]
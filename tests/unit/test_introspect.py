@@ -0,0 +1,96 @@
+# tests/unit/test_introspect.py
+import pytest
+from sqlalchemy import update
+
+from app.models.user import User
+from app.routers import auth
+
+
+async def signup_and_login(client, username: str) -> dict:
+    await client.post('/auth/', json={
+        'first_name': 'Test', 'last_name': 'User', 'username': username,
+        'email': f'{username}@example.com', 'password': 'password123',
+    })
+    response = await client.post('/auth/token', data={'username': username, 'password': 'password123'})
+    return response.json()
+
+
+def bearer(token: str) -> dict:
+    return {'Authorization': f'Bearer {token}'}
+
+
+class TestIntrospect:
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_callers_are_rejected(self, client, monkeypatch):
+        monkeypatch.setattr(auth, 'INTROSPECT_CLIENT_SECRETS', ['service-secret'])
+        tokens = await signup_and_login(client, 'alice')
+        body = {'tokens': [{'token': tokens['access_token']}]}
+
+        assert (await client.post('/auth/introspect', json=body)).status_code == 401
+        assert (await client.post('/auth/introspect', json=body, headers=bearer('wrong-secret'))).status_code == 401
+        assert (await client.post('/auth/introspect', json=body,
+                                  headers=bearer(tokens['access_token']))).status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_admin_may_introspect(self, client, session_maker):
+        await signup_and_login(client, 'root')
+        async with session_maker() as db:
+            await db.execute(update(User).where(User.username == 'root').values(is_admin=True))
+            await db.commit()
+        # Флаг админа попадает в токен при логине
+        admin_token = (await signup_and_login(client, 'root'))['access_token']
+
+        response = await client.post('/auth/introspect', json={'tokens': [{'token': admin_token}]},
+                                     headers=bearer(admin_token))
+
+        assert response.status_code == 200
+        assert response.json()['results'][0]['is_admin'] is True
+
+    @pytest.mark.asyncio
+    async def test_batch_with_service_secret(self, client, monkeypatch):
+        monkeypatch.setattr(auth, 'INTROSPECT_CLIENT_SECRETS', ['service-secret'])
+        tokens = await signup_and_login(client, 'bob')
+        revoked = await client.post('/auth/token', data={'username': 'bob', 'password': 'password123'})
+        revoked = revoked.json()
+        await client.post('/auth/logout', params={'refresh_token': revoked['refresh_token']},
+                          headers=bearer(tokens['access_token']))
+
+        response = await client.post('/auth/introspect', headers=bearer('service-secret'), json={'tokens': [
+            {'token': tokens['access_token']},
+            {'token': tokens['refresh_token'], 'token_type_hint': 'refresh_token'},
+            {'token': revoked['refresh_token']},
+            {'token': 'not-a-token'},
+        ]})
+
+        assert response.status_code == 200
+        access, refresh, revoked_refresh, garbage = response.json()['results']
+        assert access['active'] is True
+        assert access['token_type'] == 'access_token'
+        assert access['username'] == 'bob'
+        assert refresh['active'] is True
+        assert refresh['token_type'] == 'refresh_token'
+        assert revoked_refresh == {'active': False}
+        assert garbage == {'active': False}
+
+    @pytest.mark.asyncio
+    async def test_access_token_versions_are_read_in_one_query(self, client, monkeypatch):
+        monkeypatch.setattr(auth, 'INTROSPECT_CLIENT_SECRETS', ['service-secret'])
+        tokens = [(await signup_and_login(client, name))['access_token'] for name in ('carol', 'dave', 'erin')]
+        auth.token_versions.clear()
+        loads = []
+        load_many = auth.token_versions._load_many
+
+        async def counting_load_many(user_ids):
+            loads.append(sorted(user_ids))
+            return await load_many(user_ids)
+
+        monkeypatch.setattr(auth.token_versions, '_load_many', counting_load_many)
+        monkeypatch.setattr(auth.token_versions, '_load', None)
+
+        response = await client.post('/auth/introspect', headers=bearer('service-secret'),
+                                     json={'tokens': [{'token': token} for token in tokens]})
+
+        assert [result['active'] for result in response.json()['results']] == [True] * 3
+        assert len(loads) == 1
+        assert len(loads[0]) == 3
@@ -0,0 +1,120 @@
+# tests/unit/test_invalidation.py
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.backend.invalidation import InvalidationBus, SocketTransport, JTI_REVOKED, USER_CHANGED
+
+
+async def settle():
+    # Датаграмма, чтение из сокета и обработчик - несколько проходов цикла событий
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def buses(tmp_path):
+    started = [InvalidationBus(SocketTransport(str(tmp_path))) for _ in range(2)]
+    for bus in started:
+        await bus.start()
+    yield started
+    for bus in started:
+        await bus.close()
+
+
+@pytest_asyncio.fixture
+async def bus():
+    # Без транспорта: сообщения подаются в _received напрямую
+    bus = InvalidationBus()
+    bus._inbox = asyncio.Queue()
+    bus.subscribed_at = time.time()
+    bus._tasks = [asyncio.create_task(bus._dispatch_loop())]
+    yield bus
+    bus._tasks[0].cancel()
+    await asyncio.gather(*bus._tasks, return_exceptions=True)
+
+
+def message(seq: int, origin: str = 'other', started: float = 0.0, **data) -> str:
+    return json.dumps({'origin': origin, 'started': started, 'seq': seq, 'type': USER_CHANGED, **data})
+
+
+class TestInvalidationBus:
+
+    @pytest.mark.asyncio
+    async def test_event_reaches_other_worker_only(self, buses):
+        publisher, subscriber = buses
+        received = {bus: [] for bus in buses}
+        for bus in buses:
+            bus.subscribe(JTI_REVOKED, received[bus].append)
+
+        publisher.publish(JTI_REVOKED, jti='abc', user_id=1)
+        await settle()
+
+        assert [event['jti'] for event in received[subscriber]] == ['abc']
+        assert received[publisher] == []
+        assert subscriber.stats()['gaps'] == 0
+
+    @pytest.mark.asyncio
+    async def test_publish_once_without_subscribing(self, buses, tmp_path):
+        received = []
+        buses[0].subscribe(USER_CHANGED, received.append)
+
+        await InvalidationBus(SocketTransport(str(tmp_path))).publish_once(USER_CHANGED, user_id=5, version=2)
+        await settle()
+
+        assert [event['user_id'] for event in received] == [5]
+
+    @pytest.mark.asyncio
+    async def test_gap_in_sequence_triggers_one_resync(self, bus):
+        applied, resyncs = [], []
+        bus.subscribe(USER_CHANGED, lambda event: applied.append(event['seq']))
+        bus.on_resync(lambda: resyncs.append(1))
+
+        for seq in (1, 2, 5, 6, 6):
+            bus._received(message(seq))
+        await settle()
+
+        assert applied == [1, 2, 5, 6]
+        assert resyncs == [1]
+        assert bus.stats()['gaps'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_origin_started_earlier_is_not_a_gap(self, bus):
+        resyncs = []
+        bus.on_resync(lambda: resyncs.append(1))
+
+        bus._received(message(40, origin='old', started=bus.subscribed_at - 60))
+        bus._received(message(3, origin='new', started=bus.subscribed_at + 1))
+        await settle()
+
+        assert resyncs == [1]
+
+    @pytest.mark.asyncio
+    async def test_failing_handler_does_not_stop_dispatch(self, bus):
+        applied = []
+        bus.subscribe(USER_CHANGED, lambda event: 1 / 0)
+        bus.subscribe(USER_CHANGED, lambda event: applied.append(event['seq']))
+
+        async def resync():
+            applied.append('resync')
+
+        bus.on_resync(resync)
+        bus._received(message(1))
+        bus._request_resync()
+        await settle()
+
+        assert applied == [1, 'resync']
+        assert bus.handler_errors == 1
+
+    @pytest.mark.asyncio
+    async def test_dead_peer_socket_is_removed(self, buses, tmp_path):
+        stale = tmp_path / 'stale.sock'
+        stale.touch()
+
+        buses[0].publish(USER_CHANGED, user_id=1, version=1)
+        await settle()
+
+        assert not stale.exists()
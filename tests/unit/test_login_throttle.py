@@ -0,0 +1,109 @@
+# tests/unit/test_login_throttle.py
+import pytest
+
+from app.backend import throttling
+from app.backend.throttling import LoginThrottle, LoginThrottled, MemoryThrottleBackend, SqliteThrottleBackend
+
+
+class FrozenClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    frozen = FrozenClock(1_000_000.0)
+    monkeypatch.setattr(throttling.time, 'time', frozen.time)
+    return frozen
+
+
+class TestLoginThrottle:
+
+    @pytest.mark.asyncio
+    async def test_rejects_username_over_limit(self, clock):
+        throttle = LoginThrottle(MemoryThrottleBackend(), window=60, username_limit=3, ip_limit=100)
+        for _ in range(3):
+            await throttle.check('alice', '10.0.0.1')
+
+        with pytest.raises(LoginThrottled) as exc_info:
+            await throttle.check('Alice', '10.0.0.2')
+
+        assert exc_info.value.scope == 'username'
+        assert exc_info.value.retry_after >= 1
+        assert throttle.rejected['username'] == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_ip_across_usernames(self, clock):
+        throttle = LoginThrottle(MemoryThrottleBackend(), window=60, username_limit=10, ip_limit=2)
+        await throttle.check('alice', '10.0.0.1')
+        await throttle.check('bob', '10.0.0.1')
+
+        with pytest.raises(LoginThrottled) as exc_info:
+            await throttle.check('carol', '10.0.0.1')
+        assert exc_info.value.scope == 'ip'
+
+        await throttle.check('carol', '10.0.0.2')
+
+    @pytest.mark.asyncio
+    async def test_previous_window_decays(self, clock):
+        throttle = LoginThrottle(MemoryThrottleBackend(), window=60, username_limit=4, ip_limit=0)
+        clock.now = 60 * 1000
+        for _ in range(4):
+            await throttle.check('alice', None)
+
+        # Середина следующего окна: прошлые 4 попытки весят как 2
+        clock.now += 90
+        await throttle.check('alice', None)
+        await throttle.check('alice', None)
+        with pytest.raises(LoginThrottled):
+            await throttle.check('alice', None)
+
+        # Через два окна счётчики забыты полностью
+        clock.now += 120
+        await throttle.check('alice', None)
+
+    @pytest.mark.asyncio
+    async def test_reset_clears_username(self, clock):
+        throttle = LoginThrottle(MemoryThrottleBackend(), window=60, username_limit=1, ip_limit=0)
+        await throttle.check('alice', None)
+        await throttle.reset('alice')
+
+        await throttle.check('alice', None)
+
+    @pytest.mark.asyncio
+    async def test_disabled_throttle_allows_everything(self, clock):
+        throttle = LoginThrottle(MemoryThrottleBackend(), window=60, username_limit=1, ip_limit=1, enabled=False)
+        for _ in range(5):
+            await throttle.check('alice', '10.0.0.1')
+
+
+class TestThrottleBackends:
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_evicts_oldest_key(self):
+        backend = MemoryThrottleBackend(max_keys=2)
+        await backend.hit('a', 1)
+        await backend.hit('b', 1)
+        await backend.hit('a', 1)
+        await backend.hit('c', 1)
+
+        assert backend.stats()['keys'] == 2
+        assert await backend.hit('b', 1) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_sqlite_backend_is_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / 'throttle.sqlite3')
+        first, second = SqliteThrottleBackend(path), SqliteThrottleBackend(path)
+        try:
+            await first.hit('user:alice', 10)
+            await first.hit('user:alice', 11)
+            assert await second.hit('user:alice', 11) == (1, 2)
+
+            await second.clear('user:alice')
+            assert await first.hit('user:alice', 11) == (0, 1)
+        finally:
+            await first.close()
+            await second.close()
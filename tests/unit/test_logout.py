@@ -0,0 +1,45 @@
+# tests/unit/test_logout.py
+from datetime import datetime, timezone
+
+import jwt
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, select
+
+from app.models.tokens import RevokedToken
+
+
+@pytest_asyncio.fixture
+async def session_maker(migrated_session_maker):
+    # revoked_tokens.expires_at и jti длиной 36 приходят из миграции 0002, а не из create_all
+    return migrated_session_maker
+
+
+class TestLogout:
+
+    @pytest.mark.asyncio
+    async def test_revokes_refresh_token_with_its_expiry(self, client, session_maker):
+        await client.post('/auth/', json={
+            'first_name': 'Test', 'last_name': 'User', 'username': 'alice',
+            'email': 'alice@example.com', 'password': 'password123',
+        })
+        tokens = (await client.post('/auth/token', data={'username': 'alice', 'password': 'password123'})).json()
+        claims = jwt.decode(tokens['refresh_token'], options={'verify_signature': False})
+
+        response = await client.post('/auth/logout', params={'refresh_token': tokens['refresh_token']},
+                                     headers={'Authorization': f"Bearer {tokens['access_token']}"})
+
+        assert response.status_code == 200
+        async with session_maker() as db:
+            row = await db.scalar(select(RevokedToken).where(RevokedToken.jti == claims['jti']))
+        assert row.expires_at.replace(tzinfo=timezone.utc) == datetime.fromtimestamp(claims['exp'], timezone.utc)
+        refreshed = await client.post('/auth/refresh', params={'refresh_token': tokens['refresh_token']})
+        assert refreshed.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_jti_column_fits_a_uuid(self, session_maker):
+        async with session_maker() as db:
+            columns = await db.run_sync(lambda session: inspect(session.connection()).get_columns('revoked_tokens'))
+
+        jti = next(column for column in columns if column['name'] == 'jti')
+        assert jti['type'].length == 36
@@ -0,0 +1,66 @@
+# tests/unit/test_metrics.py
+import httpx
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.backend.metrics import StatsCollector
+
+
+async def scrape(client: httpx.AsyncClient) -> dict[tuple, float]:
+    response = await client.get('/metrics')
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def delta(before: dict, after: dict, name: str, **labels) -> float:
+    key = (name, tuple(sorted(labels.items())))
+    return after.get(key, 0) - before.get(key, 0)
+
+
+class TestStatsCollector:
+
+    def test_numeric_stats_become_gauges(self):
+        collector = StatsCollector()
+        collector.add('token_cache', lambda: {'enabled': True, 'hits': 3, 'last_sync': None, 'mode': 'lru'})
+
+        samples = {
+            metric.name: metric.samples[0].value
+            for metric in collector.collect()
+        }
+
+        assert samples == {'auth_token_cache_enabled': 1.0, 'auth_token_cache_hits': 3.0}
+
+
+class TestMetricsEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_requests_and_logins_are_exposed(self, client):
+        await client.post('/auth/', json={
+            'first_name': 'Metrics', 'last_name': 'User', 'username': 'metrics_user',
+            'email': 'metrics@example.com', 'password': 'password123',
+        })
+        before = await scrape(client)
+
+        await client.post('/auth/token', data={'username': 'metrics_user', 'password': 'password123'})
+        await client.post('/auth/token', data={'username': 'metrics_user', 'password': 'wrong'})
+        await client.post('/auth/token', data={'username': 'nobody', 'password': 'password123'})
+        await client.post('/permission/bulk/delete', json={'user_ids': [1]})
+        await client.get('/no-such-page')
+        after = await scrape(client)
+
+        assert delta(before, after, 'auth_logins_total', result='success', reason='') == 1
+        assert delta(before, after, 'auth_logins_total', result='failure', reason='invalid_password') == 1
+        assert delta(before, after, 'auth_logins_total', result='failure', reason='unknown_user') == 1
+        assert delta(before, after, 'auth_http_requests_total', method='POST', route='/auth/token', status='200') == 1
+        assert delta(before, after, 'auth_http_requests_total', method='POST', route='/auth/token', status='401') == 2
+        # Метка - шаблон маршрута, а не конкретный путь
+        assert delta(before, after, 'auth_http_requests_total',
+                     method='POST', route='/permission/bulk/{action}', status='401') == 1
+        assert delta(before, after, 'auth_http_requests_total', method='GET', route='unmatched', status='404') == 1
+        assert delta(before, after, 'auth_http_request_duration_seconds_count',
+                     method='POST', route='/auth/token') == 3
+        assert ('auth_password_hash_capacity', ()) in after
@@ -0,0 +1,130 @@
+# tests/unit/test_password_hashing.py
+import asyncio
+import threading
+
+import pytest
+import pytest_asyncio
+from passlib.hash import bcrypt
+from sqlalchemy import select, update
+
+from app.backend.hashing import (
+    MIN_BCRYPT_ROUNDS,
+    PasswordHasher,
+    PasswordHashingOverloaded,
+    _hash,
+    _verify,
+    build_context,
+    calibrate,
+    default_settings,
+)
+from app.models.user import User
+
+
+class TestPasswordHasher:
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_roundtrip(self):
+        hasher = PasswordHasher('thread', workers=1, queue_size=1)
+        try:
+            hashed = await hasher.run(_hash, 'password123')
+
+            assert await hasher.run(_verify, 'password123', hashed) is True
+            assert await hasher.run(_verify, 'wrong', hashed) is False
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self):
+        hasher = PasswordHasher('thread', workers=1, queue_size=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.create_task(hasher.run(release.wait))
+            await asyncio.sleep(0.05)
+
+            with pytest.raises(PasswordHashingOverloaded):
+                await hasher.run(_hash, 'password123')
+
+            release.set()
+            await busy
+            assert hasher.pending == 0
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+    @pytest.mark.asyncio
+    async def test_background_jobs_leave_workers_for_logins(self):
+        hasher = PasswordHasher('thread', workers=2, queue_size=0, background_workers=1)
+        release = threading.Event()
+        try:
+            batch = [asyncio.create_task(hasher.run_background(release.wait)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+
+            # Импорт занял один воркер, второй свободен - логин не получает отказ
+            assert hasher.pending == 1
+            hashed = await hasher.run(_hash, 'password123')
+            assert await hasher.run(_verify, 'password123', hashed) is True
+
+            release.set()
+            assert await asyncio.gather(*batch) == [True] * 3
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+class TestHashingCost:
+
+    def test_outdated_cost_needs_rehash(self):
+        context = build_context(dict(default_settings(), bcrypt_rounds=12))
+
+        assert context.needs_update(bcrypt.using(rounds=4).hash('password123')) is True
+        assert context.needs_update(bcrypt.using(rounds=12).hash('password123')) is False
+
+    def test_calibrate_respects_minimum_rounds(self):
+        calibrated, elapsed = calibrate(budget_ms=1, base=dict(default_settings(), scheme='bcrypt'))
+
+        assert calibrated['bcrypt_rounds'] == MIN_BCRYPT_ROUNDS
+        assert elapsed > 0
+
+
+class TestRehashOnLogin:
+
+    @pytest_asyncio.fixture
+    async def stored_hash(self, client, session_maker, monkeypatch):
+        """Signs up ``alice`` with a 4-round hash, then raises the configured cost past the tolerance."""
+        from app.backend import hashing
+        await client.post('/auth/', json={
+            'first_name': 'A', 'last_name': 'B', 'username': 'alice',
+            'email': 'alice@example.com', 'password': 'password123',
+        })
+        monkeypatch.setattr(hashing, 'crypt_context', build_context(dict(default_settings(), bcrypt_rounds=6)))
+
+        async def read():
+            async with session_maker() as db:
+                return await db.scalar(select(User.hashed_password).where(User.username == 'alice'))
+        return read
+
+    @pytest.mark.asyncio
+    async def test_login_upgrades_outdated_hash(self, client, stored_hash):
+        assert bcrypt.from_string(await stored_hash()).rounds == 4
+
+        response = await client.post('/auth/token', data={'username': 'alice', 'password': 'password123'})
+
+        assert response.status_code == 200
+        upgraded = await stored_hash()
+        assert bcrypt.from_string(upgraded).rounds == 6
+        assert await asyncio.to_thread(bcrypt.verify, 'password123', upgraded)
+
+    @pytest.mark.asyncio
+    async def test_rehash_skips_password_changed_meanwhile(self, client, stored_hash, session_maker):
+        from app.routers.auth import rehash_user_password
+        outdated = await stored_hash()
+        async with session_maker() as db:
+            user_id = await db.scalar(select(User.id).where(User.username == 'alice'))
+            # Пароль сменили, пока шёл рехеш старого
+            await db.execute(update(User).where(User.id == user_id).values(hashed_password='changed'))
+            await db.commit()
+
+        await rehash_user_password(user_id, 'password123', outdated)
+
+        assert await stored_hash() == 'changed'
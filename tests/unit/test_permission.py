@@ -0,0 +1,133 @@
+# tests/unit/test_permission.py
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from app.models.user import User
+
+
+async def signup(client, username: str) -> int:
+    response = await client.post('/auth/', json={
+        'first_name': 'Test', 'last_name': 'User', 'username': username,
+        'email': f'{username}@example.com', 'password': 'password123',
+    })
+    assert response.status_code == 201
+    return await user_id(client, username)
+
+
+async def login(client, username: str) -> str:
+    response = await client.post('/auth/token', data={'username': username, 'password': 'password123'})
+    return response.json()['access_token']
+
+
+async def user_id(client, username: str) -> int:
+    token = await login(client, username)
+    response = await client.get('/auth/read_current_user', headers={'Authorization': f'Bearer {token}'})
+    return response.json()['User']['id']
+
+
+@pytest_asyncio.fixture
+async def users(client, session_maker):
+    """An admin's auth headers and the ids of a plain, an admin and an inactive user."""
+    ids = {name: await signup(client, name) for name in ('root', 'plain', 'other_admin', 'gone')}
+    async with session_maker() as db:
+        await db.execute(update(User).where(User.username.in_(['root', 'other_admin'])).values(is_admin=True))
+        await db.execute(update(User).where(User.username == 'gone').values(is_active=False))
+        await db.commit()
+    ids['headers'] = {'Authorization': f"Bearer {await login(client, 'root')}"}
+    return ids
+
+
+class TestCreateUserConflicts:
+
+    @pytest.mark.asyncio
+    async def test_duplicate_username(self, client):
+        await signup(client, 'alice')
+
+        response = await client.post('/auth/', json={
+            'first_name': 'Test', 'last_name': 'User', 'username': 'alice',
+            'email': 'another@example.com', 'password': 'password123',
+        })
+
+        assert response.status_code == 409
+        assert response.json() == {'detail': {'error': {
+            'code': 'user_already_exists',
+            'message': 'Пользователь с указанным именем уже существует.',
+            'target': 'username',
+        }}}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_email(self, client):
+        await signup(client, 'alice')
+
+        response = await client.post('/auth/', json={
+            'first_name': 'Test', 'last_name': 'User', 'username': 'bob',
+            'email': 'alice@example.com', 'password': 'password123',
+        })
+
+        assert response.status_code == 409
+        assert response.json() == {'detail': {'error': {
+            'code': 'user_already_exists',
+            'message': 'Пользователь с указанным email уже зарегистрирован.',
+            'target': 'email',
+        }}}
+
+
+class TestPermissionResponses:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('target, status_code, detail', [
+        ('plain', 200, 'User is now admin'),
+        ('other_admin', 400, 'User is already admin'),
+        ('gone', 404, 'User not found'),
+        (None, 404, 'User not found'),
+    ])
+    async def test_set_admin(self, client, users, target, status_code, detail):
+        response = await client.patch('/permission/set-admin-permission', headers=users['headers'],
+                                      params={'user_id': users.get(target, 404)})
+
+        assert response.status_code == status_code
+        assert response.json().get('detail') == detail
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('target, status_code, detail', [
+        ('other_admin', 200, 'User is not now admin'),
+        ('plain', 400, 'User is already not admin'),
+        ('gone', 404, 'User not found'),
+        (None, 404, 'User not found'),
+    ])
+    async def test_revoke_admin(self, client, users, target, status_code, detail):
+        response = await client.patch('/permission/revoke-admin-permission', headers=users['headers'],
+                                      params={'user_id': users.get(target, 404)})
+
+        assert response.status_code == status_code
+        assert response.json().get('detail') == detail
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('target, status_code, detail', [
+        ('plain', 200, 'User is deleted'),
+        ('gone', 200, 'User has already been deleted'),
+        ('other_admin', 403, "You can't delete admin user"),
+        (None, 404, 'User not found'),
+    ])
+    async def test_delete(self, client, users, target, status_code, detail):
+        response = await client.delete('/permission/delete', headers=users['headers'],
+                                       params={'user_id': users.get(target, 404)})
+
+        assert response.status_code == status_code
+        assert response.json().get('detail') == detail
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('method, path', [
+        ('PATCH', '/permission/set-admin-permission'),
+        ('PATCH', '/permission/revoke-admin-permission'),
+        ('DELETE', '/permission/delete'),
+    ])
+    async def test_non_admin_is_rejected(self, client, users, method, path):
+        token = await login(client, 'plain')
+
+        response = await client.request(method, path, headers={'Authorization': f'Bearer {token}'},
+                                        params={'user_id': users['plain']})
+
+        assert response.status_code == 401
+        assert response.json()['detail'] == "You don't have admin permission"
@@ -0,0 +1,134 @@
+# tests/unit/test_principal_cache.py
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, update
+
+from app.backend import principal_cache as principal_cache_module
+from app.backend.principal_cache import PrincipalCache, UserPrincipal
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker, monkeypatch):
+    async with session_maker() as db:
+        await db.execute(insert(User), [
+            {'id': user_id, 'first_name': 'A', 'last_name': 'B', 'username': f'user{user_id}',
+             'email': f'user{user_id}@example.com', 'hashed_password': 'x'}
+            for user_id in (1, 2, 3)
+        ])
+        await db.commit()
+    monkeypatch.setattr(principal_cache_module, 'async_read_session_maker', session_maker)
+    monkeypatch.setattr(principal_cache_module, 'async_session_maker', session_maker)
+    return session_maker
+
+
+async def make_admin(maker, user_id: int):
+    async with maker() as db:
+        await db.execute(update(User).where(User.id == user_id).values(is_admin=True, token_version=1))
+        await db.commit()
+
+
+class TestPrincipalCache:
+
+    @pytest.mark.asyncio
+    async def test_second_lookup_is_served_from_memory(self, session_maker):
+        cache = PrincipalCache(ttl=60, maxsize=10)
+
+        first = await cache.get(1)
+        await make_admin(session_maker, 1)
+        second = await cache.get(1)
+
+        assert first == second == UserPrincipal(1, 'user1', True, False, False, 0)
+        assert cache.stats()['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads_changed_user(self, session_maker):
+        cache = PrincipalCache(ttl=60, maxsize=10)
+        await cache.get(1)
+        await make_admin(session_maker, 1)
+
+        cache.invalidate(1)
+        principal = await cache.get(1)
+
+        assert principal.is_admin and principal.token_version == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_reloaded(self, session_maker):
+        cache = PrincipalCache(ttl=0, maxsize=10)
+        await cache.get(1)
+        await make_admin(session_maker, 1)
+
+        assert (await cache.get(1)).is_admin
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_query(self, session_maker, monkeypatch):
+        cache = PrincipalCache(ttl=60, maxsize=10)
+        queries = []
+        load = cache._load
+
+        async def counting_load(user_ids):
+            queries.append(user_ids)
+            return await load(user_ids)
+
+        monkeypatch.setattr(cache, '_load', counting_load)
+        results = await asyncio.gather(*(cache.get(2) for _ in range(5)))
+
+        assert {principal.username for principal in results} == {'user2'}
+        assert queries == [[2]]
+
+    @pytest.mark.asyncio
+    async def test_get_many_loads_only_misses(self, session_maker):
+        cache = PrincipalCache(ttl=60, maxsize=10)
+        await cache.get(1)
+
+        principals = await cache.get_many({1, 2, 404})
+
+        assert set(principals) == {1, 2}
+        assert cache.stats()['hits'] == 1
+        assert len(cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_row_read_before_invalidation_is_not_cached(self, session_maker, monkeypatch):
+        cache = PrincipalCache(ttl=60, maxsize=10)
+        maker = principal_cache_module.async_read_session_maker
+
+        def invalidating_maker():
+            # Пользователя меняют, пока его строка читается
+            cache.invalidate(1)
+            return maker()
+
+        monkeypatch.setattr(principal_cache_module, 'async_read_session_maker', invalidating_maker)
+        invalidating_maker.kw = maker.kw
+        await cache.get(1)
+
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_row_older_than_known_version_is_reread_from_primary(self, session_maker, make_session_maker,
+                                                                       monkeypatch):
+        replica_maker = await make_session_maker('replica')
+        async with replica_maker() as db:
+            # Реплика ещё не получила bump
+            await db.execute(insert(User).values(
+                id=1, first_name='A', last_name='B', username='user1', email='user1@example.com', hashed_password='x'
+            ))
+            await db.commit()
+        monkeypatch.setattr(principal_cache_module, 'async_read_session_maker', replica_maker)
+        cache = PrincipalCache(ttl=60, maxsize=10)
+        await make_admin(session_maker, 1)
+
+        cache.invalidate(1, version=1)
+        principal = await cache.get(1)
+
+        assert principal.is_admin and principal.token_version == 1
+        assert cache._cached(1) == principal
+
+    def test_lru_eviction(self):
+        cache = PrincipalCache(ttl=60, maxsize=2)
+        for user_id in (1, 2, 3):
+            cache.put(UserPrincipal(user_id, f'user{user_id}', True, False, False, 0))
+
+        assert len(cache) == 2
+        assert cache._cached(1) is None
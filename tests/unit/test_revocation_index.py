@@ -0,0 +1,129 @@
+# tests/unit/test_revocation_index.py
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.backend import revocation
+from app.backend.revocation import BloomFilter, RevocationIndex, RevokedTokenSweeper
+from app.models.tokens import RevokedToken
+
+
+class TestBloomFilter:
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+        items = [str(uuid.uuid4()) for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate_close_to_target(self):
+        bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+        for _ in range(1000):
+            bloom.add(str(uuid.uuid4()))
+
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10_000))
+
+        assert false_positives / 10_000 < 0.03
+        assert bloom.estimated_fp_rate < 0.02
+
+
+class TestRevocationIndex:
+
+    def test_unloaded_index_defers_to_database(self):
+        index = RevocationIndex(capacity=10, fp_rate=0.01)
+
+        assert index.contains('some-jti') is None
+
+    def test_lookups_after_load(self):
+        index = RevocationIndex(capacity=10, fp_rate=0.01)
+        index.loaded = True
+        index.add('revoked-jti')
+
+        assert index.contains('revoked-jti') is True
+        assert index.contains('active-jti') is False
+        assert index.stats()['entries'] == 1
+
+    def test_filter_grows_past_capacity(self):
+        index = RevocationIndex(capacity=10, fp_rate=0.01)
+        index.loaded = True
+        jtis = [str(uuid.uuid4()) for _ in range(50)]
+        for jti in jtis:
+            index.add(jti)
+
+        assert all(index.contains(jti) for jti in jtis)
+        assert index.stats()['bloom_bits'] > BloomFilter(10, 0.01).size
+
+    def test_prune_drops_only_expired_tokens(self):
+        index = RevocationIndex(capacity=10, fp_rate=0.01)
+        index.loaded = True
+        now = datetime.now(timezone.utc)
+        index.add('expired', expires_at=now - timedelta(seconds=1))
+        index.add('active', expires_at=now + timedelta(days=1))
+        # Без срока (старые строки) - не истекает
+        index.add('legacy')
+        # Срок дошёл позже, чем сам jti (событие шины без exp)
+        index.add('late')
+        index.add('late', expires_at=(now - timedelta(seconds=1)).replace(tzinfo=None))
+
+        assert index.prune(now) == 2
+        assert index.contains('expired') is False
+        assert index.contains('late') is False
+        assert index.contains('active') is True
+        assert index.contains('legacy') is True
+
+
+@pytest.fixture
+def session_maker(session_maker, monkeypatch):
+    monkeypatch.setattr(revocation, 'async_session_maker', session_maker)
+    return session_maker
+
+
+class TestRevokedTokenSweeper:
+
+    @pytest.mark.asyncio
+    async def test_deletes_only_expired_rows_in_batches(self, session_maker):
+        now = datetime.now(timezone.utc)
+        async with session_maker() as db:
+            await db.execute(insert(RevokedToken), [
+                {'jti': f'expired-{i}', 'user_id': 1, 'expires_at': now - timedelta(days=1)} for i in range(5)
+            ] + [
+                {'jti': 'active', 'user_id': 1, 'expires_at': now + timedelta(days=1)},
+            ])
+            await db.commit()
+
+        sweeper = RevokedTokenSweeper(batch_size=2, pause=0)
+        deleted = await sweeper.sweep()
+
+        async with session_maker() as db:
+            remaining = (await db.scalars(select(RevokedToken.jti))).all()
+        assert deleted == 5
+        assert remaining == ['active']
+        assert sweeper.stats()['runs'] == 1
+        assert sweeper.stats()['deleted_total'] == 5
+
+    @pytest.mark.asyncio
+    async def test_sync_drops_rows_swept_by_another_worker(self, session_maker):
+        now = datetime.now(timezone.utc)
+        async with session_maker() as db:
+            await db.execute(insert(RevokedToken), [
+                {'jti': 'expiring', 'user_id': 1, 'revoked_at': now, 'expires_at': now + timedelta(seconds=0.2)},
+                {'jti': 'active', 'user_id': 1, 'revoked_at': now, 'expires_at': now + timedelta(days=1)},
+            ])
+            await db.commit()
+        index = RevocationIndex(capacity=10, fp_rate=0.01)
+        await index.load()
+        assert len(index) == 2
+
+        await asyncio.sleep(0.3)
+        # Строку удаляет сборщик другого воркера - этот узнаёт о ней только по сроку
+        await RevokedTokenSweeper(batch_size=10, pause=0).sweep()
+        await index.sync()
+
+        assert index.contains('expiring') is False
+        assert index.contains('active') is True
+        assert len(index) == 1
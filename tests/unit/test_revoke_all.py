@@ -0,0 +1,57 @@
+# tests/unit/test_revoke_all.py
+import pytest
+import pytest_asyncio
+
+
+@pytest_asyncio.fixture
+async def session_maker(migrated_session_maker):
+    # users.token_version приходит из миграции 0004, а не из create_all
+    return migrated_session_maker
+
+
+async def signup_and_login(client, username: str) -> dict:
+    await client.post('/auth/', json={
+        'first_name': 'Test', 'last_name': 'User', 'username': username,
+        'email': f'{username}@example.com', 'password': 'password123',
+    })
+    response = await client.post('/auth/token', data={'username': username, 'password': 'password123'})
+    return response.json()
+
+
+def bearer(token: str) -> dict:
+    return {'Authorization': f'Bearer {token}'}
+
+
+class TestRevokeAll:
+
+    @pytest.mark.asyncio
+    async def test_rejects_tokens_issued_before(self, client):
+        first = await signup_and_login(client, 'alice')
+        second = await client.post('/auth/token', data={'username': 'alice', 'password': 'password123'})
+        second = second.json()
+        assert (await client.get('/auth/read_current_user', headers=bearer(second['access_token']))).status_code == 200
+
+        response = await client.post('/auth/revoke-all', headers=bearer(first['access_token']))
+        assert response.status_code == 200
+
+        for tokens in (first, second):
+            current_user = await client.get('/auth/read_current_user', headers=bearer(tokens['access_token']))
+            refreshed = await client.post('/auth/refresh', params={'refresh_token': tokens['refresh_token']})
+            assert current_user.status_code == 401
+            assert refreshed.status_code == 401
+
+        fresh = await client.post('/auth/token', data={'username': 'alice', 'password': 'password123'})
+        current_user = await client.get('/auth/read_current_user', headers=bearer(fresh.json()['access_token']))
+        assert current_user.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_only_admin_may_revoke_another_user(self, client):
+        alice = await signup_and_login(client, 'alice')
+        bob = await signup_and_login(client, 'bob')
+        bob_id = (await client.get('/auth/read_current_user', headers=bearer(bob['access_token']))).json()['User']['id']
+
+        response = await client.post('/auth/revoke-all', params={'user_id': bob_id},
+                                     headers=bearer(alice['access_token']))
+
+        assert response.status_code == 401
+        assert (await client.get('/auth/read_current_user', headers=bearer(bob['access_token']))).status_code == 200
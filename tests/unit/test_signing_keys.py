@@ -0,0 +1,80 @@
+# tests/unit/test_signing_keys.py
+import os
+import time
+
+import jwt
+import pytest
+
+from app.backend.keys import KeyRing
+
+
+def age_key(ring: KeyRing, kid: str, seconds: float):
+    path = ring.keys_dir / f'{kid}.pem'
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+class TestKeyRing:
+
+    def test_generates_key_and_signs_with_kid(self, tmp_path):
+        ring = KeyRing(str(tmp_path), 'EdDSA', activation_delay=0)
+
+        token = ring.encode({'sub': 'testuser'})
+
+        header = jwt.get_unverified_header(token)
+        assert header['alg'] == 'EdDSA'
+        assert header['kid'] == ring.active_kid
+        assert ring.decode(token)['sub'] == 'testuser'
+
+    def test_jwks_publishes_public_keys_only(self, tmp_path):
+        ring = KeyRing(str(tmp_path), 'EdDSA', activation_delay=0)
+
+        keys = ring.jwks()['keys']
+
+        assert len(keys) == 1
+        assert keys[0]['kid'] == ring.active_kid
+        assert keys[0]['kty'] == 'OKP'
+        assert 'd' not in keys[0]
+
+    def test_rotated_key_waits_for_activation_delay(self, tmp_path):
+        ring = KeyRing(str(tmp_path), 'EdDSA', activation_delay=300)
+        ring.load()
+        first = ring.active_kid
+        age_key(ring, first, 3600)
+
+        second = ring.rotate()
+
+        assert ring.active_kid == first
+        assert {key['kid'] for key in ring.jwks()['keys']} == {first, second}
+
+        age_key(ring, second, 301)
+        ring.reload()
+        assert ring.active_kid == second
+
+    def test_old_key_keeps_verifying_until_pruned(self, tmp_path):
+        ring = KeyRing(str(tmp_path), 'EdDSA', activation_delay=0)
+        old_token = ring.encode({'sub': 'testuser'})
+        old_kid = ring.active_kid
+        age_key(ring, old_kid, 7200)
+
+        ring.rotate()
+
+        assert ring.active_kid != old_kid
+        assert ring.decode(old_token)['sub'] == 'testuser'
+        assert ring.prune(max_age=3600) == []
+
+        new_kid = ring.active_kid
+        age_key(ring, new_kid, 7200)
+        ring.reload()
+        assert ring.prune(max_age=3600) == [old_kid]
+        with pytest.raises(jwt.PyJWTError):
+            ring.decode(old_token)
+
+    def test_rs256_keys(self, tmp_path):
+        ring = KeyRing(str(tmp_path), 'RS256', activation_delay=0)
+
+        token = ring.encode({'sub': 'testuser'})
+
+        assert jwt.get_unverified_header(token)['alg'] == 'RS256'
+        assert ring.jwks()['keys'][0]['kty'] == 'RSA'
+        assert ring.decode(token)['sub'] == 'testuser'
@@ -0,0 +1,127 @@
+# tests/unit/test_timing.py
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.backend.metrics import TimingMiddleware
+from app.backend.profiler import Profiler
+from app.backend import metrics
+from app.backend.timing import RequestTiming, Span, current_timing, record
+
+
+async def slow_endpoint(scope, receive, send):
+    with Span('jwt'):
+        time.sleep(0.002)
+    record('db', 0.001)
+    if scope['path'] == '/slow':
+        await asyncio.sleep(0.05)
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'ok'})
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    profiler = Profiler(interval_ms=1, max_profiles=10)
+    monkeypatch.setattr(metrics, 'profiler', profiler)
+    yield profiler
+    profiler.disarm()
+
+
+@pytest_asyncio.fixture
+async def client_factory():
+    clients = []
+
+    def make(server_timing: bool):
+        app = TimingMiddleware(slow_endpoint, server_timing=server_timing)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t')
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+class TestRequestTiming:
+
+    def test_span_without_timed_request_is_noop(self):
+        with Span('jwt'):
+            pass
+        record('db', 1.0)
+
+        assert current_timing.get() is None
+
+    def test_spans_accumulate_per_stage(self):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            record('db', 0.002)
+            record('db', 0.001)
+            with Span('jwt'):
+                pass
+        finally:
+            current_timing.reset(token)
+
+        breakdown = timing.breakdown()
+        assert breakdown['db']['count'] == 2
+        assert breakdown['db']['ms'] == pytest.approx(3)
+        assert timing.header().startswith('db;dur=3.00;desc="database queries x2", jwt;dur=')
+
+
+class TestTimingMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_server_timing_header(self, client_factory, profiler):
+        response = await client_factory(server_timing=True).get('/fast')
+
+        header = response.headers['server-timing']
+        assert header.startswith('jwt;dur=')
+        assert 'db;dur=1.00' in header
+        assert 'total;dur=' in header
+
+    @pytest.mark.asyncio
+    async def test_no_header_when_disabled(self, client_factory, profiler):
+        response = await client_factory(server_timing=False).get('/fast')
+
+        assert 'server-timing' not in response.headers
+
+
+class TestProfiler:
+
+    @pytest.mark.asyncio
+    async def test_profiles_next_requests_then_disarms(self, client_factory, profiler):
+        client = client_factory(server_timing=False)
+        profiler.arm(2)
+        for _ in range(3):
+            await client.get('/slow')
+
+        assert not profiler.armed
+        assert len(profiler.profiles) == 2
+        folded = profiler.folded(profiler.profiles[0])
+        assert 'slow_endpoint (tests/unit/test_timing.py' in folded
+        assert profiler.profiles[0]['timing']['db']['count'] == 1
+
+    @pytest.mark.asyncio
+    async def test_threshold_keeps_only_slow_requests(self, client_factory, profiler):
+        client = client_factory(server_timing=False)
+        profiler.arm(1, min_duration_ms=30)
+        await client.get('/fast')
+        await client.get('/slow')
+
+        assert [profile['path'] for profile in profiler.profiles] == ['/slow']
+        assert profiler.discarded == 1
+        assert not profiler.armed
+
+    @pytest.mark.asyncio
+    async def test_path_filter_and_excluded_paths(self, client_factory, profiler):
+        client = client_factory(server_timing=False)
+        profiler.arm(5, path='/slow')
+        await client.get('/fast')
+        await client.get('/metrics')
+        await client.get('/slow')
+
+        assert [profile['path'] for profile in profiler.profiles] == ['/slow']
+        assert profiler.remaining == 4
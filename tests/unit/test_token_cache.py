@@ -0,0 +1,66 @@
+# tests/unit/test_token_cache.py
+import time
+
+from app.backend.token_cache import TokenCache
+
+
+def principal(user_id: int) -> dict:
+    return {'username': f'user{user_id}', 'id': user_id, 'is_admin': False, 'is_verified': True}
+
+
+class TestTokenCache:
+
+    def test_hit_and_miss_counters(self):
+        cache = TokenCache(maxsize=10)
+        cache.put('token-a', principal(1), int(time.time()) + 60)
+
+        assert cache.get('token-a')['id'] == 1
+        assert cache.get('token-b') is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_entry_expires_with_token(self):
+        cache = TokenCache(maxsize=10)
+        cache.put('token-a', principal(1), int(time.time()) - 1)
+
+        assert cache.get('token-a') is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TokenCache(maxsize=2)
+        expire = int(time.time()) + 60
+        cache.put('token-a', principal(1), expire)
+        cache.put('token-b', principal(2), expire)
+        cache.get('token-a')
+        cache.put('token-c', principal(3), expire)
+
+        assert cache.get('token-b') is None
+        assert cache.get('token-a') is not None
+        assert cache.evictions == 1
+
+    def test_invalidate_user_drops_all_their_tokens(self):
+        cache = TokenCache(maxsize=10)
+        expire = int(time.time()) + 60
+        cache.put('token-a', principal(1), expire)
+        cache.put('token-b', principal(1), expire)
+        cache.put('token-c', principal(2), expire)
+
+        cache.invalidate_user(1)
+
+        assert cache.get('token-a') is None
+        assert cache.get('token-b') is None
+        assert cache.get('token-c') is not None
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = TokenCache(maxsize=10, enabled=False)
+        cache.put('token-a', principal(1), int(time.time()) + 60)
+
+        assert cache.get('token-a') is None
+        assert len(cache) == 0
+
+    def test_version_is_kept_with_principal(self):
+        cache = TokenCache(maxsize=10)
+        cache.put('token-a', principal(1), int(time.time()) + 60, version=3)
+
+        cached_principal, version = cache.get_versioned('token-a')
+        assert cached_principal['id'] == 1
+        assert version == 3
@@ -0,0 +1,143 @@
+# tests/unit/test_token_versions.py
+import asyncio
+import time
+
+import pytest
+
+from app.backend import token_versions as token_versions_module
+from app.backend.invalidation import USER_CHANGED
+from app.backend.token_cache import token_cache
+from app.backend.token_versions import TokenVersions
+
+
+class CountingLoader:
+    def __init__(self, versions: dict[int, int]):
+        self.versions = versions
+        self.calls = 0
+
+    async def __call__(self, user_id: int) -> int | None:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.versions.get(user_id)
+
+
+class CountingBulkLoader:
+    def __init__(self, versions: dict[int, int]):
+        self.versions = versions
+        self.calls: list[list[int]] = []
+
+    async def __call__(self, user_ids: list[int]) -> dict[int, int]:
+        self.calls.append(sorted(user_ids))
+        await asyncio.sleep(0.01)
+        return {user_id: self.versions[user_id] for user_id in user_ids if user_id in self.versions}
+
+
+class TestTokenVersions:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_query(self, monkeypatch):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        loader = CountingLoader({1: 4})
+        monkeypatch.setattr(versions, '_load', loader)
+
+        results = await asyncio.gather(*(versions.current(1) for _ in range(5)))
+
+        assert results == [4] * 5
+        assert loader.calls == 1
+        assert await versions.current(1) == 4
+        assert loader.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_is_none(self, monkeypatch):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        monkeypatch.setattr(versions, '_load', CountingLoader({}))
+
+        assert await versions.current(404) is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_reloaded(self, monkeypatch):
+        versions = TokenVersions(ttl=0, maxsize=10)
+        loader = CountingLoader({1: 0})
+        monkeypatch.setattr(versions, '_load', loader)
+
+        await versions.current(1)
+        await versions.current(1)
+
+        assert loader.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_current_many_reads_misses_in_one_query(self, monkeypatch):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        versions.observe(1, 3)
+        loader = CountingBulkLoader({1: 0, 2: 5, 3: 7})
+        monkeypatch.setattr(versions, '_load_many', loader)
+
+        result = await versions.current_many([1, 2, 3, 3, 404])
+
+        assert result == {1: 3, 2: 5, 3: 7, 404: None}
+        assert loader.calls == [[2, 3, 404]]
+        assert await versions.current_many([2, 3]) == {2: 5, 3: 7}
+        assert len(loader.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_current_many_shares_inflight_single_lookups(self, monkeypatch):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        single = CountingLoader({1: 2})
+        bulk = CountingBulkLoader({1: 2, 2: 0})
+        monkeypatch.setattr(versions, '_load', single)
+        monkeypatch.setattr(versions, '_load_many', bulk)
+
+        one, many = await asyncio.gather(versions.current(1), versions.current_many([1, 2]))
+
+        assert one == 2
+        assert many == {1: 2, 2: 0}
+        assert single.calls == 1
+        assert bulk.calls == [[2]]
+
+    def test_stale_read_does_not_roll_back_a_bump(self):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        versions.bumped(1, 5)
+        versions.observe(1, 4)
+
+        assert versions._versions[1][0] == 5
+
+    def test_bump_drops_cached_access_tokens(self):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        token_cache.put('token-a', {'username': 'a', 'id': 7, 'is_admin': False, 'is_verified': True},
+                        int(time.time()) + 60)
+
+        versions.bumped(7, 1)
+
+        assert token_cache.get('token-a') is None
+
+    def test_bumped_many_publishes_one_event_per_batch(self, monkeypatch):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        published = []
+        monkeypatch.setattr(token_versions_module, 'USER_CHANGED_BATCH_SIZE', 2)
+        monkeypatch.setattr(token_versions_module.invalidation_bus, 'publish',
+                            lambda event_type, **data: published.append((event_type, data)))
+
+        versions.bumped_many({1: 3, 2: 4, 3: 5})
+
+        assert published == [(USER_CHANGED, {'users': [(1, 3), (2, 4)]}), (USER_CHANGED, {'users': [(3, 5)]})]
+        assert {user_id: versions._versions[user_id][0] for user_id in (1, 2, 3)} == {1: 3, 2: 4, 3: 5}
+
+    def test_user_changed_event_applies_single_and_batched_forms(self):
+        versions = TokenVersions(ttl=60, maxsize=10)
+        token_cache.put('token-b', {'username': 'b', 'id': 8, 'is_admin': False, 'is_verified': True},
+                        int(time.time()) + 60)
+
+        versions.on_user_changed({'user_id': 1, 'version': 2})
+        # Так событие приходит после JSON: пары - списки
+        versions.on_user_changed({'users': [[8, 1], [9, 6]]})
+
+        assert {user_id: versions._versions[user_id][0] for user_id in (1, 8, 9)} == {1: 2, 8: 1, 9: 6}
+        assert token_cache.get('token-b') is None
+
+    def test_least_recently_used_is_evicted(self):
+        versions = TokenVersions(ttl=60, maxsize=2)
+        for user_id in (1, 2, 3):
+            versions.observe(user_id, 0)
+
+        assert len(versions) == 2
+        assert 1 not in versions._versions
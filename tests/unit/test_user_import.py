@@ -0,0 +1,71 @@
+# tests/unit/test_user_import.py
+import io
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.backend import hashing
+from app.backend.user_import import UserImporter
+from app.models.user import User
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def user_line(username: str, email: str | None = None) -> bytes:
+    return json.dumps({
+        'first_name': 'Test', 'last_name': 'User', 'username': username,
+        'email': email or f'{username}@example.com', 'password': 'password123',
+    }).encode() + b'\n'
+
+
+def read_report(report: io.BytesIO) -> list[dict]:
+    return [json.loads(line) for line in report.getvalue().splitlines()]
+
+
+@pytest_asyncio.fixture
+async def db(session_maker, monkeypatch):
+    monkeypatch.setattr(hashing.hasher, 'executor', 'inline')
+    monkeypatch.setattr(hashing, 'crypt_context', hashing.build_context(
+        dict(hashing.default_settings(), bcrypt_rounds=4)
+    ))
+    async with session_maker() as session:
+        yield session
+
+
+class TestUserImporter:
+
+    @pytest.mark.asyncio
+    async def test_ndjson_rows_are_reported_individually(self, db):
+        body = user_line('alice') + user_line('bob') + b'not json\n' + user_line('alice', 'other@example.com') \
+            + b'{"username": "incomplete"}\n' + user_line('carol')
+        report = io.BytesIO()
+
+        # Строки режутся на куски произвольно - разбор не должен от этого зависеть
+        summary = await UserImporter(db, report, batch_size=2).run(stream(body[:7], body[7:50], body[50:]), 'ndjson')
+
+        results = read_report(report)
+        statuses = {row['line']: row['status'] for row in results if 'line' in row}
+        assert statuses == {1: 'created', 2: 'created', 3: 'invalid', 4: 'duplicate', 5: 'invalid', 6: 'created'}
+        assert results[-1] == {'summary': {'created': 3, 'duplicate': 1, 'invalid': 2}}
+        assert summary['created'] == await db.scalar(select(func.count()).select_from(User))
+
+    @pytest.mark.asyncio
+    async def test_csv_with_header(self, db):
+        body = (
+            b'first_name,last_name,username,email,password\r\n'
+            b'Test,User,dave,dave@example.com,password123\r\n'
+            b'Test,User,erin,not-an-email,password123\r\n'
+        )
+        report = io.BytesIO()
+
+        await UserImporter(db, report).run(stream(body), 'csv')
+
+        results = {row['line']: row for row in read_report(report) if 'line' in row}
+        assert results[2]['status'] == 'created'
+        assert results[3]['status'] == 'invalid'
+        assert results[3]['errors'][0]['loc'] == ['email']
@@ -0,0 +1,72 @@
+# tests/unit/test_user_search.py
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+
+from app.backend.user_search import SearchNotSupported, list_users, prefix_condition
+from app.models.user import User
+from app.schemas import UserFilter
+
+USERS = [
+    ('Alice_1', 'Alice', 'Smith', True),
+    ('alina', 'Alina', 'Jones', False),
+    ('bob', 'Bob', 'Alison', False),
+    ('al%x', 'X', 'Y', False),
+    ('carol', 'Carol', 'Brown', False),
+]
+
+
+@pytest_asyncio.fixture
+async def db(session_maker):
+    async with session_maker() as session:
+        await session.execute(insert(User), [
+            {'first_name': first_name, 'last_name': last_name, 'username': username,
+             'email': f'{username.lower()}@example.com', 'hashed_password': 'x', 'is_admin': is_admin}
+            for username, first_name, last_name, is_admin in USERS
+        ])
+        await session.commit()
+        yield session
+
+
+def usernames(page: dict) -> list[str]:
+    return [user['username'] for user in page['users']]
+
+
+class TestListUsers:
+
+    @pytest.mark.asyncio
+    async def test_prefix_matches_any_field_case_insensitively(self, db):
+        page = await list_users(db, UserFilter(), q='ALI')
+
+        assert usernames(page) == ['Alice_1', 'alina', 'bob']
+        assert page['next_cursor'] is None
+
+    @pytest.mark.asyncio
+    async def test_prefix_on_one_field_with_filter(self, db):
+        page = await list_users(db, UserFilter(is_admin=False), q='ali', field='username')
+
+        assert usernames(page) == ['alina']
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages_cover_every_user_once(self, db):
+        seen, cursor = [], None
+        while True:
+            page = await list_users(db, UserFilter(), after=cursor, limit=2)
+            seen += usernames(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        assert seen == [username for username, *_ in USERS]
+
+    @pytest.mark.asyncio
+    async def test_substring_search_requires_trigram_indexes(self, db):
+        with pytest.raises(SearchNotSupported):
+            await list_users(db, UserFilter(), q='li', match='contains')
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('dialect', ['sqlite', 'postgresql'])
+    async def test_wildcards_in_prefix_are_literal(self, db, dialect):
+        found = await db.scalars(select(User.username).where(prefix_condition(dialect, User.username, 'al%')))
+
+        assert found.all() == ['al%x']